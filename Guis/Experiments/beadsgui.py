@@ -2,9 +2,9 @@ from pathlib import Path
 
 from PyQt6.QtWidgets import QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QDialog, QGridLayout, QSlider
 from PyQt6.QtGui import QFont, QPixmap
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QDir
+from PyQt6.QtCore import Qt, pyqtSignal, QDir
 
-from Guis.Experiments import gui
+from Guis.Experiments import gui, stimuli
 
 
 class BeadsConfidence(QDialog):
@@ -94,8 +94,7 @@ class BeadsInventory(QDialog):
         # go through the beadlist and make a list of pixmaps from each bead (or empty string) in the list
         for index, bead in enumerate(beadlist):
             pixmaplist.append(QLabel(''))
-            pixmap = QPixmap(bead)
-            pixmaplist[index].setPixmap(pixmap.scaled(100, 100, Qt.AspectRatioMode.KeepAspectRatio))
+            pixmaplist[index].setPixmap(stimuli.stimuluscache.get(bead, 100, 100))
 
         # Make the 5x6 grid for the inventory
         for row in range(0, 4):
@@ -109,8 +108,8 @@ class BeadsInventory(QDialog):
 class BeadsExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # create variables to represent the number of beads drawn and the (currently empty) list of beads drawn
         self.beadsdrawn = 0
@@ -177,17 +176,22 @@ class BeadsExp(gui.Experiment):
         self.instquitlayout.addLayout(quitinvlayout)
 
         # Make timer for jitter screen
-        self.jittertimer = QTimer()
+        self.jittertimer = self.scheduler.timer('jitter')
         self.jittertimer.timeout.connect(self.newround)
 
         # Make timer for jitter screen
-        self.starttimer = QTimer()
+        self.starttimer = self.scheduler.timer('start')
         self.starttimer.timeout.connect(self.startround)
 
         # Attach left and right to functions
         self.left.mousePressEvent = self.choseleftjar
         self.right.mousePressEvent = self.choserightjar
 
+        # load and scale the beads (for the middle and the inventory) and the jars now so rounds don't have to
+        self.stimuli.preload(['BeadsTask_*Bead.png'], 50, 50)
+        self.stimuli.preload(['BeadsTask_*Bead.png'], 100, 100)
+        self.stimuli.preload(['BeadsTask_*Jar.png'], 300, folder='../../Assets')
+
     def choseleftjar(self, event):
         """
         Function that launches the confidence window, takes the output of that, and then sends it to the participant
@@ -279,13 +283,9 @@ class BeadsExp(gui.Experiment):
         self.starttimer.stop()
         self.middle.setText('')
 
-        # put the jars into pixmaps
-        leftpixmap = QPixmap('../../Assets/BeadsTask_RedJar.png')
-        rightpixmap = QPixmap('../../Assets/BeadsTask_BlueJar.png')
-
-        # set the left and right to the pixmaps
-        self.left.setPixmap(leftpixmap.scaledToWidth(300, Qt.TransformationMode.SmoothTransformation))
-        self.right.setPixmap(rightpixmap.scaledToWidth(300, Qt.TransformationMode.SmoothTransformation))
+        # set the left and right to the preloaded jar pixmaps
+        self.left.setPixmap(self.stimuli.get('../../Assets/BeadsTask_RedJar.png', 300))
+        self.right.setPixmap(self.stimuli.get('../../Assets/BeadsTask_BlueJar.png', 300))
 
         # set beadsdrawn back to 0
         self.beadsdrawn = 0
@@ -323,9 +323,8 @@ class BeadsExp(gui.Experiment):
         # add the bead to the list
         self.beadlist[self.beadsdrawn] = newbead
 
-        # set the center label to the new bead pixmap
-        pixmap = QPixmap(newbead)
-        self.middle.setPixmap(pixmap.scaled(50, 50, Qt.AspectRatioMode.KeepAspectRatio))
+        # set the center label to the preloaded bead pixmap
+        self.middle.setPixmap(self.stimuli.get(newbead, 50, 50))
 
         # increase the total number of beads drawn
         self.beadsdrawn += 1
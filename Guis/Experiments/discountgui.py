@@ -1,9 +1,8 @@
 import random
-import time
 
 from PyQt6.QtWidgets import QLabel, QHBoxLayout, QProgressBar
 from PyQt6.QtGui import QFont
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal
 
 from Guis.Experiments import gui
 
@@ -11,8 +10,8 @@ from Guis.Experiments import gui
 class DDiscountExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # Instructions
         self.instructions.setText('Press ' + self.person.leftkey[0] + ' for the left option and ' +
@@ -58,8 +57,8 @@ class DDiscountExp(gui.Experiment):
         self.left.setStyleSheet('border: 0px;')
 
         # if-then statement to determine whether the amount of trials completed is less than the number of trials the
-        # user wants
-        if self.trialsdone < self.person.get_trials():
+        # user wants (and the stopping rule hasn't ended the task)
+        if (self.trialsdone < self.person.get_trials()) & (not self.person.stopping()):
 
             # get trial text
             strings = self.person.get_design_text()
@@ -71,8 +70,8 @@ class DDiscountExp(gui.Experiment):
             # set the middle to or
             self.middle.setText('OR')
 
-            # log the trial onset time
-            self.starttime = time.time() - self.overallstart
+            # paint the trial and log the trial onset time
+            self.starttime = self.flip()
 
             # start the trial timer
             self.timer.start(5000)
@@ -95,6 +94,10 @@ class DDiscountExp(gui.Experiment):
             self.roundsdone += 1
             self.trialsdone = 0
 
+            # if the stopping rule ended the task, skip the rest of the blocks
+            if self.person.stopreason is not None:
+                self.roundsdone = self.person.rounds
+
             # set the middle text to the appropriate text from the participant class
             self.middle.setText(self.person.nextround(self.roundsdone))
 
@@ -217,7 +220,7 @@ class DDiscountExp(gui.Experiment):
             # sense
             if (self.trialsdone == 0) & (self.roundsdone == 0):
 
-                self.overallstart = time.time()
+                self.clock.reset()
 
             # set the window to the iti screen
             self.iti()
@@ -232,9 +235,8 @@ class DDiscountExp(gui.Experiment):
             # increment the trial counter
             self.trialsdone += 1
 
-            # use time.time and the start time variable to compute rt
-            endtime = time.time() - self.overallstart
-            rt = endtime - self.starttime
+            # use the time the key press arrived and the time the trial was painted to compute rt
+            rt = self.responsetime(self.starttime)
 
             # if the key was the right key...
             if key in self.person.rightkey:
@@ -257,6 +259,9 @@ class DDiscountExp(gui.Experiment):
             # send the trial data to the participant class
             self.person.updateoutput(self.trialsdone, self.starttime, rt, response)
 
+            # send the response to the engine so the next design gets worked out during the iti
+            self.person.engineupdate(response)
+
             self.iti()
 
         # if someone presses the i key and the participant is between rounds...
@@ -278,8 +283,8 @@ class DDiscountExp(gui.Experiment):
 class PDiscountExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # Instructions
         self.instructions.setText('Press ' + self.person.leftkey[0] + ' for the left option and ' +
@@ -345,8 +350,8 @@ class PDiscountExp(gui.Experiment):
         self.left.setStyleSheet('border: 0px;')
 
         # if-then statement to determine whether the amount of trials completed is less than the number of trials the
-        # user wants
-        if self.trialsdone < self.person.get_trials():
+        # user wants (and the stopping rule hasn't ended the task)
+        if (self.trialsdone < self.person.get_trials()) & (not self.person.stopping()):
 
             # get trial text
             info = self.person.get_design_text()
@@ -361,8 +366,8 @@ class PDiscountExp(gui.Experiment):
             # set the middle to or
             self.middle.setText('OR')
 
-            # log the trial onset time
-            self.starttime = time.time() - self.overallstart
+            # paint the trial and log the trial onset time
+            self.starttime = self.flip()
 
             # start the trial timer
             self.timer.start(5000)
@@ -385,6 +390,10 @@ class PDiscountExp(gui.Experiment):
             self.roundsdone += 1
             self.trialsdone = 0
 
+            # if the stopping rule ended the task, skip the rest of the blocks
+            if self.person.stopreason is not None:
+                self.roundsdone = self.person.rounds
+
             # set the middle text to the appropriate text from the participant class
             self.middle.setText(self.person.nextround(self.roundsdone))
 
@@ -517,7 +526,7 @@ class PDiscountExp(gui.Experiment):
             # sense
             if (self.trialsdone == 0) & (self.roundsdone == 0):
 
-                self.overallstart = time.time()
+                self.clock.reset()
 
             # set the window to the iti screen
             self.iti()
@@ -532,9 +541,8 @@ class PDiscountExp(gui.Experiment):
             # increment the trial counter
             self.trialsdone += 1
 
-            # use time.time and the start time variable to compute rt
-            endtime = time.time() - self.overallstart
-            rt = endtime - self.starttime
+            # use the time the key press arrived and the time the trial was painted to compute rt
+            rt = self.responsetime(self.starttime)
 
             # if the key was the right key...
             if key in self.person.rightkey:
@@ -557,6 +565,10 @@ class PDiscountExp(gui.Experiment):
             # send the trial data to the participant class
             self.person.updateoutput(self.trialsdone, self.starttime, rt, response)
 
+            # send the response to the engine (with the adaptive design) so the next design gets worked out during the
+            # iti
+            self.person.engineupdate(response)
+
             self.iti()
 
         # if someone presses the i key and the participant is between rounds...
@@ -578,8 +590,8 @@ class PDiscountExp(gui.Experiment):
 class CEDiscountExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # Instructions
         self.instructions.setText('Press ' + self.person.leftkey[0] + ' for the left option and ' +
@@ -618,7 +630,7 @@ class CEDiscountExp(gui.Experiment):
             self.extradelay = [0, 1000, 2000, 3000]
 
         # Make timer for second half of trial to appear on screen
-        self.secondhalftimer = QTimer()
+        self.secondhalftimer = self.scheduler.timer('second half')
         self.secondhalftimer.timeout.connect(self.displaysecondhalf)
 
     def generatenext(self):
@@ -657,8 +669,8 @@ class CEDiscountExp(gui.Experiment):
             # set the middle to blank
             self.middle.setText('')
 
-            # log the trial onset time
-            self.starttime = time.time() - self.overallstart
+            # paint the trial and log the trial onset time
+            self.starttime = self.flip()
 
             # get extra delay to add to the 1 second between seeing the first half and seeing the second
             extra = random.choice(self.extradelay)
@@ -757,8 +769,8 @@ class CEDiscountExp(gui.Experiment):
         # set the middle to or
         self.middle.setText('OR')
 
-        # get the onset of the trial
-        self.full = time.time() - self.overallstart
+        # paint the trial and get the onset of the trial
+        self.full = self.flip()
 
         # start the trial timer
         self.timer.start(5000)
@@ -836,7 +848,7 @@ class CEDiscountExp(gui.Experiment):
             # sense
             if (self.trialsdone == 0) & (self.roundsdone == 0):
 
-                self.overallstart = time.time()
+                self.clock.reset()
 
             # set the window to the iti screen
             self.iti()
@@ -851,9 +863,8 @@ class CEDiscountExp(gui.Experiment):
             # increment the trial counter
             self.trialsdone += 1
 
-            # use time.time and the start time variable to compute rt
-            endtime = time.time() - self.overallstart
-            rt = endtime - self.full
+            # use the time the key press arrived and the time the trial was painted to compute rt
+            rt = self.responsetime(self.full)
 
             # if the key was the right key...
             if key in self.person.rightkey:
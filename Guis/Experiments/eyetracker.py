@@ -0,0 +1,571 @@
+import numpy as np
+
+import gzip
+import json
+import logging
+import queue
+import socket
+import struct
+import threading
+import time
+
+# where the gaze samples come from: a simulated tracker that looks around the screen, or a tracker (or its bridge
+# program) that streams samples over UDP to 'host:port'
+SOURCES = ['Simulated', 'UDP']
+
+# how a sample is kept: the raw perf_counter_ns time, where the eyes were on the screen (in pixels, NaN when the tracker
+# lost them), the pupil size, the block and trial the sample is in, whether the trial's stimulus was up and waiting for
+# a response (phase 1), and the marker that happened at that sample (0 for none)
+SAMPLE = np.dtype([('time', '<i8'), ('x', '<f4'), ('y', '<f4'), ('pupil', '<f4'), ('block', '<i2'), ('trial', '<i4'),
+                   ('phase', '<i1'), ('marker', '<i1')])
+
+# the markers the experiment puts into the samples
+MARKERS = {'onset': 1, 'response': 2, 'timeout': 3}
+
+# how many seconds of samples the ring buffer holds (enough for a long block at the highest rate)
+BUFFERSECONDS = 600
+
+# how long a read waits for samples before checking whether the tracker was stopped, in seconds
+POLL = .01
+
+# a UDP packet is any number of samples, each of them the x, y, and pupil size as little-endian 32-bit floats
+PACKETFORMAT = '<3f'
+PACKETSIZE = struct.calcsize(PACKETFORMAT)
+
+# the first line of a spool file, followed by a line with the sample layout and then the samples
+SPOOLHEADER = b'TASKMASTER GAZE 1\n'
+
+
+class RingBuffer(object):
+    """
+    A preallocated array of samples that the newest samples overwrite the oldest in, so taking in samples never
+    allocates. Samples are counted from the start of the session, so a stretch of them can be asked for by that count
+    even after the buffer went around
+    """
+
+    def __init__(self, capacity, dtype=SAMPLE):
+
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.capacity = capacity
+
+        # how many samples have ever been put in, which also says where the next one goes
+        self.count = 0
+
+        # the reading thread puts samples in while the gui thread takes them out
+        self.lock = threading.Lock()
+
+    def push(self, samples):
+        """
+        Puts samples in, overwriting the oldest ones once the buffer is full
+        :param samples: a structured array of samples
+        """
+
+        # only the newest samples fit if there are more than the buffer holds
+        if len(samples) > self.capacity:
+            skipped = len(samples) - self.capacity
+            samples = samples[skipped:]
+
+        else:
+            skipped = 0
+
+        with self.lock:
+
+            start = (self.count + skipped) % self.capacity
+            first = min(len(samples), self.capacity - start)
+
+            self.data[start:start + first] = samples[:first]
+            self.data[:len(samples) - first] = samples[first:]
+
+            self.count += skipped + len(samples)
+
+    def since(self, index):
+        """
+        Copies the samples that came in since a point in the session
+        :param index: integer for the count of the first sample wanted
+        :return: a structured array of the samples that are still in the buffer, and the count of the first of them
+        """
+
+        with self.lock:
+
+            start = max(index, self.count - self.capacity)
+            positions = np.arange(start, self.count) % self.capacity
+
+            return self.data[positions], start
+
+
+class GazeSource(object):
+    """
+    Where the samples come from. Each kind of tracker opens, reads, and closes differently, but every read gives back
+    a structured array of SAMPLE with the times, positions, and pupil sizes filled in
+    """
+
+    def __init__(self, rate):
+
+        # the sampling rate in Hz
+        self.rate = rate
+
+    def open(self):
+        """
+        Opens the tracker. Nothing to open by default
+        """
+
+    def close(self):
+        """
+        Closes the tracker. Nothing to close by default
+        """
+
+    def read(self):
+        """
+        Waits up to POLL seconds for samples
+        :return: a structured array of samples (empty if none came in)
+        """
+
+        return np.zeros(0, dtype=SAMPLE)
+
+
+class SimulatedTracker(GazeSource):
+    """
+    A tracker for testing that looks around the screen at the sampling rate, going through the same thread, buffer,
+    and spool as a real tracker. The eyes rest on the left, middle, or right of the screen for a few hundred
+    milliseconds at a time, with a bit of noise, and now and then a blink loses them
+    """
+
+    def __init__(self, rate, screen, seed=None):
+        super().__init__(rate)
+
+        # the screen as [left, top, width, height], and the points the eyes move between
+        left, top, width, height = screen
+        self.points = np.array([[left + width * spot, top + height / 2] for spot in [.25, .5, .75]])
+
+        self.rng = np.random.default_rng(seed)
+
+        # the raw time of the next sample, and the point being looked at and until when
+        self.due = None
+        self.point = 1
+        self.until = 0
+
+    def open(self):
+
+        self.due = time.perf_counter_ns()
+
+    def read(self):
+
+        time.sleep(POLL)
+
+        now = time.perf_counter_ns()
+        period = 1e9 / self.rate
+
+        if now < self.due:
+            return np.zeros(0, dtype=SAMPLE)
+
+        # every sample that was due since the last read, all at once
+        samples = np.zeros(int((now - self.due) // period) + 1, dtype=SAMPLE)
+        samples['time'] = self.due + (np.arange(len(samples)) * period).astype(np.int64)
+
+        self.due = int(samples['time'][-1] + period)
+
+        # where the eyes rest for each sample, moving to a new point whenever the last fixation is over
+        points = np.empty(len(samples), dtype=int)
+        start = 0
+
+        while start < len(samples):
+
+            if samples['time'][start] >= self.until:
+                self.point = self.rng.integers(len(self.points))
+                self.until = samples['time'][start] + int(self.rng.uniform(.15, .6) * 1e9)
+
+            end = start + int(np.searchsorted(samples['time'][start:], self.until))
+            points[start:end] = self.point
+            start = end
+
+        samples['x'] = self.points[points, 0] + self.rng.normal(0, 15, len(samples))
+        samples['y'] = self.points[points, 1] + self.rng.normal(0, 15, len(samples))
+        samples['pupil'] = self.rng.normal(4, .1, len(samples))
+
+        # blinks
+        lost = self.rng.random(len(samples)) < .01
+        samples['x'][lost] = np.nan
+        samples['y'][lost] = np.nan
+
+        return samples
+
+
+class UdpTracker(GazeSource):
+    """
+    Reads a tracker that streams samples over UDP (e.g., through the bridge program that comes with the tracker). Each
+    packet is one or more samples of PACKETFORMAT. The samples are timestamped when the packet is read, spaced back
+    from there at the sampling rate
+    """
+
+    def __init__(self, rate, address):
+        super().__init__(rate)
+
+        # where to listen, as 'host:port'
+        host, port = address.rsplit(':', 1) if ':' in address else ['', address]
+        self.address = (host, int(port))
+        self.socket = None
+
+    def open(self):
+
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(self.address)
+        self.socket.settimeout(POLL)
+
+    def close(self):
+
+        if self.socket is not None:
+            self.socket.close()
+
+    def read(self):
+
+        try:
+            packet = self.socket.recv(65536)
+
+        except socket.timeout:
+            return np.zeros(0, dtype=SAMPLE)
+
+        stamp = time.perf_counter_ns()
+
+        values = np.frombuffer(packet[:len(packet) // PACKETSIZE * PACKETSIZE], dtype='<f4').reshape(-1, 3)
+
+        samples = np.zeros(len(values), dtype=SAMPLE)
+        samples['time'] = stamp - (np.arange(len(values))[::-1] * 1e9 / self.rate).astype(np.int64)
+        samples['x'] = values[:, 0]
+        samples['y'] = values[:, 1]
+        samples['pupil'] = values[:, 2]
+
+        return samples
+
+
+class GazeSpool(object):
+    """
+    Writes every sample to a gzip-compressed binary file from a background thread, so the samples are saved while the
+    task runs without the reading thread or the gui waiting on compression or the disk. The file starts with
+    SPOOLHEADER and a line with the sample layout, and read_spool gets the samples back out
+    """
+
+    def __init__(self, path):
+
+        self.path = path
+
+        # chunks of samples waiting to be written; None tells the writer to stop
+        self.chunks = queue.Queue()
+
+        # how many samples were written
+        self.written = 0
+
+        self.writer = threading.Thread(target=self.writeloop, daemon=True)
+        self.writer.start()
+
+    def write(self, samples):
+        """
+        Hands samples to the background writer
+        :param samples: a structured array of samples
+        """
+
+        self.chunks.put(samples)
+
+    def writeloop(self):
+        """
+        Runs in the background thread until the spool is closed
+        """
+
+        with gzip.open(self.path, 'wb', compresslevel=1) as file:
+
+            file.write(SPOOLHEADER)
+            file.write(json.dumps(SAMPLE.descr).encode('ascii') + b'\n')
+
+            while True:
+
+                samples = self.chunks.get()
+
+                if samples is None:
+                    break
+
+                file.write(samples.tobytes())
+                self.written += len(samples)
+
+    def close(self):
+        """
+        Writes whatever is waiting and closes the file
+        """
+
+        self.chunks.put(None)
+        self.writer.join()
+
+
+class EyeTracker(object):
+    """
+    Takes in the gaze samples in its own thread. The samples go into a ring buffer and the spool file, and the markers
+    the experiment puts in (trial onsets and responses) are tied to the first sample at or after the time they
+    happened, which also tags every sample with its block, trial, and phase. At the end of each block, the trials' gaze
+    is summarized from the buffer all at once
+    """
+
+    def __init__(self, source, spoolpath=None):
+
+        self.source = source
+        self.ring = RingBuffer(int(BUFFERSECONDS * source.rate))
+        self.spool = None if spoolpath is None else GazeSpool(spoolpath)
+
+        # markers waiting to be tied to a sample, as [raw time, marker code, block, trial], and the ones that are due
+        # after the samples read so far
+        self.markers = queue.Queue()
+        self.pending = []
+
+        # the block, trial, and phase the newest sample is in
+        self.state = [0, 0, 0]
+
+        # the areas of interest of each trial, as {(block, trial): {name: [left, top, right, bottom]}}
+        self.areas = {}
+
+        # the count of the first sample that hasn't been summarized, and how many were lost to the buffer going around
+        # before they could be
+        self.summarized = 0
+        self.overrun = 0
+
+        self.reader = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        """
+        Opens the tracker and starts reading it in the background
+        """
+
+        self.source.open()
+
+        self.reader = threading.Thread(target=self.readloop, daemon=True)
+        self.reader.start()
+
+    def stop(self, person=None):
+        """
+        Stops reading, and closes the tracker and the spool
+        :param person: the participant class (so this can be one of its finished callbacks)
+        """
+
+        self.stopped.set()
+
+        if self.reader is not None:
+            self.reader.join()
+
+        self.source.close()
+
+        if self.spool is not None:
+            self.spool.close()
+
+        self.report()
+
+    def readloop(self):
+        """
+        Runs in the reading thread until the tracker is stopped
+        """
+
+        while not self.stopped.is_set():
+
+            try:
+                samples = self.source.read()
+
+            except OSError as err:
+
+                logging.exception(err, exc_info=True)
+                logging.info('Stopped reading the eyetracker')
+
+                break
+
+            if len(samples) == 0:
+                continue
+
+            self.tag(samples)
+            self.ring.push(samples)
+
+            if self.spool is not None:
+                self.spool.write(samples)
+
+    def mark(self, name, stamp, block, trial, areas=None):
+        """
+        Puts a marker in the samples. This only hands the marker to the reading thread, so it is safe to call from the
+        gui at any time
+        :param name: string from MARKERS
+        :param stamp: integer for the raw perf_counter_ns time it happened
+        :param block: integer for the block, counting from 1
+        :param trial: integer for the trial, counting from 1
+        :param areas: with an onset, a dictionary of the trial's areas of interest as [left, top, right, bottom]
+        """
+
+        if areas is not None:
+            self.areas[(block, trial)] = areas
+
+        self.markers.put([stamp, MARKERS[name], block, trial])
+
+    def tag(self, samples):
+        """
+        Ties the markers that happened during a batch of samples to them, and tags each sample with the block, trial,
+        and phase it is in
+        :param samples: a structured array of samples, in time order
+        """
+
+        while not self.markers.empty():
+            self.pending.append(self.markers.get())
+
+        self.pending.sort(key=lambda marker: marker[0])
+
+        # only the markers that happened by the last sample can be tied to this batch
+        due = [marker for marker in self.pending if marker[0] <= samples['time'][-1]]
+        self.pending = self.pending[len(due):]
+
+        start = 0
+
+        for stamp, code, block, trial in due:
+
+            at = int(np.searchsorted(samples['time'], stamp))
+
+            samples['block'][start:at], samples['trial'][start:at], samples['phase'][start:at] = self.state
+            samples['marker'][at] = code
+
+            # an onset starts a trial's phase 1, and a response or timeout ends it
+            if code == MARKERS['onset']:
+                self.state = [block, trial, 1]
+
+            else:
+                self.state = [self.state[0], self.state[1], 0]
+
+            start = at
+
+        samples['block'][start:], samples['trial'][start:], samples['phase'][start:] = self.state
+
+    def summarize(self):
+        """
+        Summarizes the trials since the last summary: how many samples each trial had, how many of them found the eyes,
+        how long the eyes stayed on each of the trial's areas of interest while it was waiting for a response, and the
+        mean pupil size. Every sample is checked against every area at once
+        :return: a list of dictionaries, one per trial
+        """
+
+        samples, first = self.ring.since(self.summarized)
+
+        self.overrun += first - self.summarized
+        self.summarized = first + len(samples)
+
+        samples = samples[samples['phase'] == 1]
+
+        if len(samples) == 0:
+            return []
+
+        # the block and trial of each sample, as an index into the trials
+        keys, which = np.unique(samples['block'].astype(np.int64) * 2 ** 32 + samples['trial'], return_inverse=True)
+        keys = np.column_stack([keys // 2 ** 32, keys % 2 ** 32])
+
+        # each sample counts for the time until the next one, capped so that a gap in the samples doesn't count
+        period = 1 / self.source.rate
+        durations = np.minimum(np.diff(samples['time'], append=samples['time'][-1] + int(period * 1e9)) / 1e9,
+                               2 * period)
+
+        valid = ~(np.isnan(samples['x']) | np.isnan(samples['y']))
+
+        # the areas as one array of [trial, area, edge], with an empty area where a trial didn't have one
+        trialareas = [self.areas.get((int(key[0]), int(key[1])), {}) for key in keys]
+        names = sorted(set(name for areas in trialareas for name in areas))
+        bounds = np.full((len(keys), len(names), 4), np.nan)
+
+        for row, areas in enumerate(trialareas):
+
+            for column, name in enumerate(names):
+                bounds[row, column] = areas.get(name, [np.nan] * 4)
+
+        # which area each sample is in (NaN positions and areas compare as False)
+        x = samples['x'][:, None]
+        y = samples['y'][:, None]
+        edges = bounds[which]
+
+        inside = (x >= edges[:, :, 0]) & (y >= edges[:, :, 1]) & (x < edges[:, :, 2]) & (y < edges[:, :, 3])
+
+        dwell = np.zeros((len(keys), len(names)))
+        np.add.at(dwell, which, inside * durations[:, None])
+
+        counts = np.bincount(which, minlength=len(keys))
+        validcounts = np.bincount(which, weights=valid, minlength=len(keys))
+        pupils = np.bincount(which[valid], weights=samples['pupil'][valid], minlength=len(keys))
+
+        summaries = []
+
+        for row, key in enumerate(keys):
+
+            summary = {'block': int(key[0]), 'trial': int(key[1]), 'gaze samples': int(counts[row]),
+                       'valid gaze (%)': 100 * validcounts[row] / counts[row],
+                       'mean pupil': pupils[row] / validcounts[row] if validcounts[row] > 0 else None}
+
+            for column, name in enumerate(names):
+                summary['dwell ' + name] = dwell[row, column]
+
+            summaries.append(summary)
+
+        return summaries
+
+    def report(self):
+        """
+        Logs how many samples came in, the rate they came in at, and how many were lost before being summarized
+        """
+
+        samples, first = self.ring.since(0)
+
+        if len(samples) > 1:
+            rate = (len(samples) - 1) / ((samples['time'][-1] - samples['time'][0]) / 1e9)
+
+        else:
+            rate = 0
+
+        logging.info('Eyetracker: ' + str(self.ring.count) + ' samples at ' + str(round(rate, 1)) + ' Hz, ' +
+                     str(self.overrun) + ' lost to the buffer before being summarized' +
+                     ('' if self.spool is None else ', ' + str(self.spool.written) + ' spooled to ' + self.spool.path))
+
+
+def make_tracker(kind, rate, path='', screen=None):
+    """
+    Makes the source of the gaze samples
+    :param kind: string from SOURCES
+    :param rate: integer for the sampling rate in Hz
+    :param path: string for where a UDP tracker streams to, as 'host:port'
+    :param screen: the screen as [left, top, width, height], for the simulated tracker
+    :return: the gaze source
+    """
+
+    match kind:
+
+        case 'UDP':
+            return UdpTracker(rate, path)
+
+        case _:
+            return SimulatedTracker(rate, screen if screen is not None else [0, 0, 1920, 1080])
+
+
+def read_spool(path):
+    """
+    Reads the samples back out of a spool file, leaving out a last sample that was cut off by a crash
+    :param path: string for the path to the spool file
+    :return: a structured array of samples
+    """
+
+    with gzip.open(path, 'rb') as file:
+
+        if file.readline() != SPOOLHEADER:
+            raise ValueError(path + ' isn\'t a gaze spool file.')
+
+        dtype = np.dtype([tuple(field) for field in json.loads(file.readline())])
+
+        chunks = []
+
+        # read in chunks, so a file that was still being written when the task crashed gives back what it has
+        try:
+
+            chunk = file.read(2 ** 20)
+
+            while chunk:
+                chunks.append(chunk)
+                chunk = file.read(2 ** 20)
+
+        except EOFError:
+            pass
+
+        data = b''.join(chunks)
+
+    return np.frombuffer(data[:len(data) // dtype.itemsize * dtype.itemsize], dtype=dtype)
@@ -1,5 +1,4 @@
 import random
-import time
 
 from PyQt6.QtWidgets import QLabel, QVBoxLayout, QHBoxLayout
 from PyQt6.QtGui import QFont, QPixmap
@@ -11,8 +10,8 @@ from Guis.Experiments import gui
 class ARTTExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # Instructions
         self.instructions.setText('Press ' + self.person.leftkey[0] + ' for the left option and ' +
@@ -60,6 +59,10 @@ class ARTTExp(gui.Experiment):
         self.instquitlayout.addStretch(1)
         self.instquitlayout.addWidget(self.quitbutton)
 
+        # load the pictures for the trials and the instructions now so trials don't have to
+        self.stimuli.preload(['ARTT_*.png'])
+        self.stimuli.preload(['ARTT_risk_25.png', 'ARTT_ambig_50.png'], 250, 250)
+
     def generatenext(self):
         """
         Generate the info for the next trial and put it on screen. if the final trial was just completed, then the next
@@ -75,8 +78,8 @@ class ARTTExp(gui.Experiment):
         self.left.setStyleSheet('border: 0px;')
 
         # if-then statement to determine whether the amount of trials completed is less than the number of trials the
-        # user wants
-        if self.trialsdone < self.person.get_trials():
+        # user wants (and the stopping rule hasn't ended the task)
+        if (self.trialsdone < self.person.get_trials()) & (not self.person.stopping()):
 
             # get trial text
             info = self.person.get_design_text()
@@ -84,7 +87,7 @@ class ARTTExp(gui.Experiment):
             # set the left and right side using the trial text
             self.left.setText(info[0])
             pixmap = 'Assets/' + info[2]
-            self.rightpic.setPixmap(QPixmap(pixmap))
+            self.rightpic.setPixmap(self.stimuli.get(pixmap))
 
             if info[3] == 1:
                 self.righttoptext.setText(info[1])
@@ -97,8 +100,8 @@ class ARTTExp(gui.Experiment):
             # set the middle to or
             self.middle.setText('OR')
 
-            # log the trial onset time
-            self.starttime = time.time() - self.overallstart
+            # paint the trial and log the trial onset time
+            self.starttime = self.flip()
 
             # start the trial timer
             self.timer.start(5000)
@@ -122,6 +125,10 @@ class ARTTExp(gui.Experiment):
             self.roundsdone += 1
             self.trialsdone = 0
 
+            # if the stopping rule ended the task, skip the rest of the blocks
+            if self.person.stopreason is not None:
+                self.roundsdone = self.person.rounds
+
             # set the middle text to the appropriate text from the participant class
             self.middle.setText(self.person.nextround(self.roundsdone))
 
@@ -227,7 +234,7 @@ class ARTTExp(gui.Experiment):
 
         # get the picture for the right
         pixmap = 'Assets/' + info[2]
-        self.rightpic.setPixmap(QPixmap(pixmap))
+        self.rightpic.setPixmap(self.stimuli.get(pixmap))
 
         # set the right text depending on if the trial is a risk or an ambiguous one
         if info[3] == 1:
@@ -260,7 +267,7 @@ class ARTTExp(gui.Experiment):
             # sense
             if (self.trialsdone == 0) & (self.roundsdone == 0):
 
-                self.overallstart = time.time()
+                self.clock.reset()
 
             # set the window to the iti screen
             self.iti()
@@ -275,9 +282,8 @@ class ARTTExp(gui.Experiment):
             # increment the trial counter
             self.trialsdone += 1
 
-            # use time.time and the start time variable to compute rt
-            endtime = time.time() - self.overallstart
-            rt = endtime - self.starttime
+            # use the time the key press arrived and the time the trial was painted to compute rt
+            rt = self.responsetime(self.starttime)
 
             # if the key was the right key...
             if key in self.person.rightkey:
@@ -301,6 +307,9 @@ class ARTTExp(gui.Experiment):
             # send the trial data to the participant class
             self.person.updateoutput(self.trialsdone, self.starttime, rt, response)
 
+            # send the response to the engine so the next design gets worked out during the iti
+            self.person.engineupdate(response)
+
             self.iti()
 
         # if someone presses the i key and the participant is between rounds...
@@ -312,14 +321,12 @@ class ARTTExp(gui.Experiment):
             # if the instruction index is five, then load the relevant picture
             if self.inst == 5:
 
-                pixmap = QPixmap('Assets/ARTT_risk_25.png')
-                self.middle.setPixmap(pixmap.scaled(250, 250, Qt.AspectRatioMode.KeepAspectRatio))
+                self.middle.setPixmap(self.stimuli.get('Assets/ARTT_risk_25.png', 250, 250))
 
             # if the instruction index is eleven, then load the relevant picture
             elif self.inst == 11:
 
-                pixmap = QPixmap('Assets/ARTT_ambig_50.png')
-                self.middle.setPixmap(pixmap.scaled(250, 250, Qt.AspectRatioMode.KeepAspectRatio))
+                self.middle.setPixmap(self.stimuli.get('Assets/ARTT_ambig_50.png', 250, 250))
 
             else:
                 # get the associated text
@@ -335,8 +342,8 @@ class ARTTExp(gui.Experiment):
 class RAExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # Instructions
         self.instructions.setText('Press ' + self.person.leftkey[0] + ' for the left option and ' +
@@ -393,8 +400,8 @@ class RAExp(gui.Experiment):
         self.left.setStyleSheet('border: 0px;')
 
         # if-then statement to determine whether the amount of trials completed is less than the number of trials the
-        # user wants
-        if self.trialsdone < self.person.get_trials():
+        # user wants (and the stopping rule hasn't ended the task)
+        if (self.trialsdone < self.person.get_trials()) & (not self.person.stopping()):
 
             # get trial text
             info = self.person.get_design_text()
@@ -407,8 +414,8 @@ class RAExp(gui.Experiment):
             # set the middle to or
             self.middle.setText('OR')
 
-            # log the trial onset time
-            self.starttime = time.time() - self.overallstart
+            # paint the trial and log the trial onset time
+            self.starttime = self.flip()
 
             # start the trial timer
             self.timer.start(5000)
@@ -432,6 +439,10 @@ class RAExp(gui.Experiment):
             self.roundsdone += 1
             self.trialsdone = 0
 
+            # if the stopping rule ended the task, skip the rest of the blocks
+            if self.person.stopreason is not None:
+                self.roundsdone = self.person.rounds
+
             # set the middle text to the appropriate text from the participant class
             self.middle.setText(self.person.nextround(self.roundsdone))
 
@@ -560,7 +571,7 @@ class RAExp(gui.Experiment):
             # sense
             if (self.trialsdone == 0) & (self.roundsdone == 0):
 
-                self.overallstart = time.time()
+                self.clock.reset()
 
             # set the window to the iti screen
             self.iti()
@@ -575,9 +586,8 @@ class RAExp(gui.Experiment):
             # increment the trial counter
             self.trialsdone += 1
 
-            # use time.time and the start time variable to compute rt
-            endtime = time.time() - self.overallstart
-            rt = endtime - self.starttime
+            # use the time the key press arrived and the time the trial was painted to compute rt
+            rt = self.responsetime(self.starttime)
 
             # if the key was the right key...
             if key in self.person.rightkey:
@@ -601,6 +611,10 @@ class RAExp(gui.Experiment):
             # send the trial data to the participant class
             self.person.updateoutput(self.trialsdone, self.starttime, rt, response)
 
+            # send the response to the engine (with the adaptive design) so the next design gets worked out during the
+            # iti
+            self.person.engineupdate(response)
+
             self.iti()
 
         # if someone presses the i key and the participant is between rounds...
@@ -622,8 +636,8 @@ class RAExp(gui.Experiment):
 class FrameExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # Instructions
         self.instructions.setText('Press ' + self.person.leftkey[0] + ' for the left option and ' +
@@ -680,8 +694,8 @@ class FrameExp(gui.Experiment):
         self.left.setStyleSheet('border: 0px;')
 
         # if-then statement to determine whether the amount of trials completed is less than the number of trials the
-        # user wants
-        if self.trialsdone < self.person.get_trials():
+        # user wants (and the stopping rule hasn't ended the task)
+        if (self.trialsdone < self.person.get_trials()) & (not self.person.stopping()):
 
             # get the trial text
             info = self.person.get_design_text()
@@ -694,8 +708,8 @@ class FrameExp(gui.Experiment):
             # set middle to or
             self.middle.setText('OR')
 
-            # get the time that the trial starts
-            self.starttime = time.time() - self.overallstart
+            # paint the trial and get the time that the trial starts
+            self.starttime = self.flip()
 
             # start the response timer
             self.timer.start(5000)
@@ -719,6 +733,10 @@ class FrameExp(gui.Experiment):
             self.roundsdone += 1
             self.trialsdone = 0
 
+            # if the stopping rule ended the task, skip the rest of the blocks
+            if self.person.stopreason is not None:
+                self.roundsdone = self.person.rounds
+
             # set the middle text to the appropriate text from the participant class
             self.middle.setText(self.person.nextround(self.roundsdone))
 
@@ -839,7 +857,7 @@ class FrameExp(gui.Experiment):
             # if this is the first trial of the first round, set the global start time to make the onset time make more
             # sense
             if (self.trialsdone == 0) & (self.roundsdone == 0):
-                self.overallstart = time.time()
+                self.clock.reset()
 
             # set the window to the iti screen
             self.iti()
@@ -854,9 +872,8 @@ class FrameExp(gui.Experiment):
             # increment the trial counter
             self.trialsdone += 1
 
-            # use time.time and the start time variable to compute rt
-            endtime = time.time() - self.overallstart
-            rt = endtime - self.starttime
+            # use the time the key press arrived and the time the trial was painted to compute rt
+            rt = self.responsetime(self.starttime)
 
             # if the key was the right key...
             if key in self.person.rightkey:
@@ -880,6 +897,10 @@ class FrameExp(gui.Experiment):
             # send the trial data to the participant class
             self.person.updateoutput(self.trialsdone, self.starttime, rt, response)
 
+            # send the response to the engine (with the adaptive design) so the next design gets worked out during the
+            # iti
+            self.person.engineupdate(response)
+
             self.iti()
 
         # if someone presses the i key and the participant is between rounds...
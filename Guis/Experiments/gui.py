@@ -2,13 +2,255 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 
+from Guis.Experiments import stimuli, presenter, inputdevices, scanner, eyetracker
+
 from pathlib import Path
 
+import logging
+import time
+
+# the color behind everything in the experiment windows
+BACKGROUND = '#C2CAD0'
+
+
+class Clock(object):
+    """
+    Timing service shared by the experiments. It uses time.perf_counter_ns, which is monotonic (it never jumps when the
+    system clock gets adjusted) and has the best resolution the computer offers. Times are given in seconds since the
+    clock was last reset, which the experiments do when the participant starts the task. In fmri mode, time zero is the
+    first pulse of the scanner's run instead
+    """
+
+    def __init__(self):
+
+        # the nanosecond count that counts as time zero, and whether it was set to an outside event
+        self.zero = time.perf_counter_ns()
+        self.anchored = False
+
+    def reset(self):
+        """
+        Sets time zero to right now, unless it was set to an outside event (e.g., the scanner's first pulse)
+        """
+
+        if not self.anchored:
+            self.zero = time.perf_counter_ns()
+
+    def anchor(self, stamp):
+        """
+        Sets time zero to an outside event, which a reset doesn't move
+        :param stamp: integer for the raw perf_counter_ns time of the event
+        """
+
+        self.zero = stamp
+        self.anchored = True
+
+    def now(self):
+        """
+        Gets the current time
+        :return: float for the seconds since time zero
+        """
+
+        return (time.perf_counter_ns() - self.zero) / 1e9
+
+
+class Scheduler(object):
+    """
+    Keeps the experiment timers on absolute deadlines. A timer that is started while another timer's event is being
+    handled counts from the time that event was supposed to happen, not from when it actually got handled, so lateness
+    never adds up from one event to the next (e.g., the onsets of an fMRI run stay on the grid they started on). Timers
+    started anywhere else (e.g., after a key press) count from right now. Every event's intended and actual times are
+    kept with the block and trial it belongs to: the last trial that was shown when it happened (e.g., the iti after a
+    trial, or the reset after its timeout), or trial 0 before the first trial
+    """
+
+    def __init__(self, clock):
+
+        # the experiment clock, which gets reset when the task starts. Deadlines are kept in raw perf_counter seconds so
+        # that a reset doesn't move them, and are only put on the experiment clock for the output
+        self.clock = clock
+
+        # the deadline of the event being handled right now, or None if no timer event is being handled
+        self.anchor = None
+
+        # the participant class that gets the times, and how late each event was (in seconds)
+        self.person = None
+        self.lateness = []
+
+        # the block and trial that the events belong to, which the experiment sets whenever it shows a trial
+        self.block = 1
+        self.trial = 0
+
+    def now(self):
+        """
+        :return: float for the raw time in seconds
+        """
+
+        return time.perf_counter_ns() / 1e9
+
+    def get_anchor(self):
+        """
+        :return: the time a timer that is being started now counts from
+        """
+
+        return self.now() if self.anchor is None else self.anchor
+
+    def timer(self, name):
+        """
+        Makes a timer that runs on this scheduler
+        :param name: string for the timer, which is used for its columns in the output (e.g., 'iti')
+        :return: the timer
+        """
+
+        return DeadlineTimer(name, self)
+
+    def shown(self, block, trial):
+        """
+        Sets the trial that the events from now on belong to
+        :param block: integer for the block, counting from 1
+        :param trial: integer for the trial in the block, counting from 1
+        """
+
+        self.block = block
+        self.trial = trial
+
+    def record(self, name, deadline, actual):
+        """
+        Keeps the intended and actual time of an event with the block and trial it belongs to
+        :param name: string for the timer
+        :param deadline: float for the raw time the event was supposed to happen
+        :param actual: float for the raw time it happened
+        """
+
+        self.lateness.append(actual - deadline)
+
+        if self.person is not None:
+
+            zero = self.clock.zero / 1e9
+
+            self.person.set_timer({'block': self.block, 'trial': self.trial, 'timer': name,
+                                   'intended': deadline - zero, 'actual': actual - zero,
+                                   'lateness (ms)': (actual - deadline) * 1000})
+
+    def report(self, person=None):
+        """
+        Logs how close the timer events were to their deadlines over the task
+        :param person: the participant class (so this can be one of its finished callbacks)
+        """
+
+        if not self.lateness:
+            return
+
+        lateness = [late * 1000 for late in self.lateness]
+
+        logging.info('Timer events: ' + str(len(lateness)) + ', mean lateness ' +
+                     str(round(sum(lateness) / len(lateness), 3)) + ' ms, max ' + str(round(max(lateness), 3)) +
+                     ' ms, last ' + str(round(lateness[-1], 3)) + ' ms')
+
+
+class DeadlineTimer(QObject):
+    """
+    Stands in for a QTimer (start, stop, isActive, and timeout work the same way, including repeating until stopped),
+    but each start sets an absolute deadline with the scheduler and the precise timer underneath is only used to wake up
+    at that deadline
+    """
+
+    timeout = pyqtSignal()
+
+    def __init__(self, name, scheduler):
+        super().__init__()
+
+        self.name = name
+        self.scheduler = scheduler
+
+        # the interval in seconds and the deadline the timer is waiting for (None when it is stopped)
+        self.interval = 0.0
+        self.deadline = None
+
+        # the precise timer that wakes up at the deadline
+        self.timer = QTimer()
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.fire)
+
+    def start(self, msec):
+        """
+        Starts (or restarts) the timer
+        :param msec: integer for the milliseconds from the anchor (the deadline of the event being handled, or now)
+        """
+
+        self.interval = msec / 1000
+        self.arm(self.scheduler.get_anchor() + self.interval)
+
+    def arm(self, deadline):
+        """
+        Waits for a deadline, or fires as soon as possible if the deadline already passed
+        :param deadline: float for the raw time
+        """
+
+        self.deadline = deadline
+        self.timer.start(max(0, round((deadline - self.scheduler.now()) * 1000)))
+
+    def stop(self):
+        """
+        Stops the timer
+        """
+
+        self.timer.stop()
+        self.deadline = None
+
+    def isActive(self):
+        """
+        :return: whether the timer is waiting for a deadline
+        """
+
+        return self.deadline is not None
+
+    def fire(self):
+        """
+        Records the event and hands it to whatever is connected to timeout, with the event's deadline as the anchor for
+        any timers started while it is handled
+        """
+
+        deadline = self.deadline
+        self.scheduler.record(self.name, deadline, self.scheduler.now())
+
+        # keep repeating from this deadline like a QTimer would, unless the handler stops or restarts the timer
+        self.arm(deadline + self.interval)
+
+        self.scheduler.anchor = deadline
+
+        try:
+            self.timeout.emit()
+
+        finally:
+            self.scheduler.anchor = None
+
 
 class Experiment(QWidget):
-    def __init__(self, person):
+    """
+    The window that runs a task for a participant class. The hardware it runs with comes with it: whether the middle is
+    drawn with OpenGL on the screen's vertical refresh (presenter 'Yes'), which measures the onset and duration of every
+    stimulus, or is a plain label ('No'); where the responses come from (one of inputdevices.DEVICES) and the event
+    device or serial port to read; in fmri mode, where the scanner's pulses come from (one of scanner.SOURCES), the
+    trigger box's device or port, and the repetition time of the pulse generator in seconds; and with an eyetracker,
+    where its samples come from (one of eyetracker.SOURCES), where a UDP tracker streams to, and the rate in Hz
+    """
+
+    def __init__(self, person, presenter='No', inputdevice='Keyboard', inputpath='', triggersource='Keyboard',
+                 triggerpath='', tr=2.0, trackersource='Simulated', trackerpath='', trackerrate=1000):
         super().__init__()
 
+        # the hardware the window was made with, which belongs to this window only
+        self.presenter = presenter
+        self.inputdevice = inputdevice
+        self.inputpath = inputpath
+        self.triggersource = triggersource
+        self.triggerpath = triggerpath
+        self.tr = tr
+        self.trackersource = trackersource
+        self.trackerpath = trackerpath
+        self.trackerrate = trackerrate
+
         # Set defaults for starting variables for the majority of tasks
         self.response = 0
         self.person = person
@@ -18,13 +260,37 @@ class Experiment(QWidget):
         self.responseenabled = 0
         self.betweenrounds = 1
 
-        # eyetracking setup
+        # the clock for onsets and reaction times, plus the time and raw event timestamp of the last key press
+        self.clock = Clock()
+        self.keytime = 0.0
+        self.keystamp = 0
+
+        # the scheduler that puts the timers on absolute deadlines and keeps their intended and actual times with the
+        # trials, and reports how they did once the task is over
+        self.scheduler = Scheduler(self.clock)
+        self.scheduler.person = self.person
+        self.person.finished.append(self.scheduler.report)
+
+        # eyetracking setup: read the samples in the background, spool them next to the output, and summarize each
+        # block's trials once it is over (the last block right before the output is written)
+        self.tracker = None
+
         if self.person.eyetracking == 'Yes':
-            print('eyetracking time yay')
+
+            screen = self.screen().geometry()
+            ratio = self.screen().devicePixelRatio()
+            source = eyetracker.make_tracker(self.trackersource, self.trackerrate, self.trackerpath,
+                                             [screen.x() * ratio, screen.y() * ratio, screen.width() * ratio,
+                                              screen.height() * ratio])
+
+            self.tracker = eyetracker.EyeTracker(source, self.person.get_gazename())
+            self.tracker.start()
+            self.person.ending.append(self.gazesummary)
+            self.person.finished.append(self.tracker.stop)
 
         # Window title
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
-        self.setStyleSheet('background-color: #C2CAD0; color: black;')
+        self.setStyleSheet('background-color: ' + BACKGROUND + '; color: black;')
 
         # center window
         self.centerscreen()
@@ -36,24 +302,55 @@ class Experiment(QWidget):
         toassets = str(Path('../../..').resolve())
         QDir.addSearchPath('Assets', toassets)
 
+        # the shared cache of preloaded and prescaled pictures
+        self.stimuli = stimuli.stimuluscache
+
         # Prepare all the elements that most/all tasks have
         self.defaultelements()
 
         # Attach keyboard keys to the keyaction function
         self.keyPressed.connect(self.keyaction)
 
+        # read the response keys from their own device in the background, if there is one (the experimenter's keys
+        # still come from the keyboard through Qt), and how long the last press waited to be handed over
+        self.device = inputdevices.make_device(self.inputdevice, self.inputpath,
+                                               self.person.leftkey + self.person.rightkey)
+        self.keydelay = 0.0
+
+        if self.device is not None:
+
+            self.device.pressed.connect(self.devicepress)
+            self.device.start()
+            self.person.finished.append(self.device.stop)
+
+        # in fmri mode, keep the pulses and start each run on the scanner's first pulse
+        self.sync = None
+
+        if self.person.fmri == 'Yes':
+            self.sync = scanner.ScannerSync(self.person, self.triggersource, self.triggerpath, self.tr)
+
         # Make timer to indicate when someone to start a new trial
-        self.ititimer = QTimer()
+        self.ititimer = self.scheduler.timer('iti')
         self.ititimer.timeout.connect(self.generatenext)
 
         # Make timer to indicate when someone took too long
-        self.timer = QTimer()
+        self.timer = self.scheduler.timer('timeout')
         self.timer.timeout.connect(self.timeout)
 
+        if self.tracker is not None:
+            self.timer.timeout.connect(self.gazetimeout)
+
         # Make timer for resetting after the above warning (only in non-fmri experiments)
-        self.trialresettimer = QTimer()
+        self.trialresettimer = self.scheduler.timer('reset')
         self.trialresettimer.timeout.connect(self.responsereset)
 
+        # the swap time and frame of the current stimulus' onset with the frame presenter (None until there is one), and
+        # a report of the dropped frames once the task is over
+        self.onsetswap = None
+
+        if self.presenter == 'Yes':
+            self.person.finished.append(self.framereport)
+
     def centerscreen(self):
         """
         All this does is get the geometry of the screen and then make the window that size
@@ -67,11 +364,228 @@ class Experiment(QWidget):
 
     def keyPressEvent(self, keyevent):
         """
-        This tells PyQt to return the text of a key when a key is pressed
+        This tells PyQt to return the text of a key when a key is pressed. The time the key press arrived and the
+        timestamp that came with the key event (in milliseconds) are kept for the reaction time
         """
 
+        # timestamp the key press before anything else is done with it
+        stamp = time.perf_counter_ns()
+        keytime = self.clock.now()
+
+        # leave out the repeats from holding a key down, and the response keys if they come from their own device
+        if keyevent.isAutoRepeat():
+            return
+
+        # the block that just ended gets its gaze summaries before the next one starts
+        if (self.tracker is not None) & (keyevent.text() in ['g', 'G']) & (self.betweenrounds == 1):
+            self.gazesummary()
+
+        if self.sync is not None:
+
+            # the scanner's pulses typed by the trigger box are kept away from the task
+            if (self.sync.source == 'Keyboard') & (keyevent.text() == scanner.TRIGGER):
+
+                self.sync.pulse(keyevent.text(), stamp)
+
+                return
+
+            # starting a run waits for the scanner, and pressing g again while it waits does nothing (starting the
+            # block without a pulse would move time zero partway through the run once the pulse came)
+            if keyevent.text() in ['g', 'G']:
+
+                if self.sync.waiting():
+                    return
+
+                if self.betweenrounds == 1:
+
+                    self.sync.wait(self.scannerstart)
+                    self.middle.setText('Waiting for the scanner...')
+
+                    return
+
+        if (self.device is not None) and (keyevent.text() in self.person.leftkey + self.person.rightkey):
+            return
+
+        self.keytime = keytime
+        self.keystamp = keyevent.timestamp()
+
         self.keyPressed.emit(keyevent.text())
 
+    def devicepress(self, key, stamp):
+        """
+        Takes a press from the input device, with the time the device read it, and handles it the same way as a key
+        press from Qt
+        :param key: string for the key
+        :param stamp: integer for the raw perf_counter_ns time the press was read
+        """
+
+        # the press happened when it was read, not when it got here
+        self.keytime = (stamp - self.clock.zero) / 1e9
+        self.keystamp = stamp / 1e6
+        self.keydelay = self.clock.now() - self.keytime
+
+        self.keyPressed.emit(key)
+
+    def scannerstart(self, stamp):
+        """
+        Starts the run that was waiting for the scanner on its first pulse. The pulse becomes time zero of the clock and
+        the anchor of the timers that get started, so the onsets are in scanner time and stay on the grid from the pulse
+        :param stamp: integer for the raw perf_counter_ns time of the pulse
+        """
+
+        self.clock.anchor(stamp)
+        self.scheduler.anchor = stamp / 1e9
+
+        try:
+            self.keyPressed.emit('g')
+
+        finally:
+            self.scheduler.anchor = None
+
+    def flip(self, name='onset'):
+        """
+        Makes the window paint whatever was just put on it right away, instead of whenever the event loop gets to it,
+        and then gets the time. That way, onsets are the time the trial was actually drawn. With the frame presenter,
+        the time is the buffer swap that showed it, and its frame index and dropped frames are kept with the trial
+        :param name: string for the event in the timing columns (e.g., 'signal onset')
+        :return: float for the time the window was painted, in seconds since the clock was reset
+        """
+
+        self.repaint()
+
+        onset = self.clock.now()
+
+        # the timer events from now on belong to this trial
+        if name == 'onset':
+            self.scheduler.shown(self.roundsdone + 1, self.trialsdone + 1)
+
+        # in fmri mode, keep the run the trial is in and how many volumes of it the scanner had started by then
+        if (self.sync is not None) and (name == 'onset'):
+            self.person.set_timing({'scanner run': self.sync.run, 'volume': self.sync.volumes})
+
+        if self.presenter == 'Yes':
+
+            # the onset is the swap that showed this change, even if it comes after repaint returns
+            swap = self.middle.waitswap()
+
+            # the swap can't be measured without an OpenGL context (e.g., on a headless computer), or if it never came
+            if swap is None:
+
+                if self.middle.zero is not None:
+                    logging.info('No buffer swap showed the ' + name + ', so it was timed with the clock instead')
+
+            else:
+
+                self.person.set_timing({name + ' frame': swap[1], name + ' dropped frames': swap[2]})
+
+                if name == 'onset':
+                    self.onsetswap = swap
+
+                onset = swap[0]
+
+        # mark the trial's onset in the gaze samples, with where its options are on the screen
+        if (self.tracker is not None) and (name == 'onset'):
+            self.tracker.mark('onset', self.clock.zero + int(onset * 1e9), self.roundsdone + 1, self.trialsdone + 1,
+                              self.gazeareas())
+
+        return onset
+
+    def stimulusoff(self):
+        """
+        With the frame presenter, paints the end of the stimulus right away and keeps how long the stimulus was actually
+        on screen (in seconds and in frames) with the trial. Without it, the end is painted whenever the event loop gets
+        to it, as always
+        """
+
+        if (self.presenter != 'Yes') | (self.onsetswap is None):
+            return
+
+        self.repaint()
+
+        swap = self.middle.waitswap()
+
+        if swap is not None:
+            self.person.set_timing({'offset frame': swap[1], 'offset dropped frames': swap[2],
+                                    'stimulus duration': swap[0] - self.onsetswap[0],
+                                    'stimulus frames': swap[1] - self.onsetswap[1]})
+
+        self.onsetswap = None
+
+    def framereport(self, person=None):
+        """
+        Logs how many stimulus changes the frame presenter showed and how many frames they missed
+        :param person: the participant class (so this can be one of its finished callbacks)
+        """
+
+        logging.info('Frame presenter: ' + str(self.middle.changes) + ' changes, ' + str(self.middle.dropped) +
+                     ' dropped frames at ' + str(round(1 / self.middle.get_period(), 2)) + ' Hz, ' +
+                     str(self.middle.missed) + ' flips without a swap')
+
+    def responsetime(self, onset):
+        """
+        Computes the reaction time from the last key press and sends the key timing to the participant class so that it
+        is saved with the trial
+        :param onset: float for the time the trial was painted
+        :return: float for the reaction time in seconds
+        """
+
+        self.person.set_timing({'key time': self.keytime, 'key timestamp (ms)': self.keystamp})
+
+        # with an input device, also keep how long the press waited between being read and being handled
+        if self.device is not None:
+            self.person.set_timing({'key delay': self.keydelay})
+
+        # mark the response in the gaze samples, which ends the trial's gaze summary
+        if self.tracker is not None:
+            self.tracker.mark('response', self.clock.zero + int(self.keytime * 1e9), self.roundsdone + 1,
+                              self.trialsdone)
+
+        return self.keytime - onset
+
+    def gazeareas(self):
+        """
+        Gets where the left option, the middle, and the right option are on the screen, for the gaze summaries. Tasks
+        that don't have one of them just leave it out
+        :return: a dictionary of the areas as [left, top, right, bottom] in the screen's pixels
+        """
+
+        areas = {}
+        ratio = self.devicePixelRatioF()
+
+        # text that was just put up may not have been laid out yet
+        if self.layout() is not None:
+            self.layout().activate()
+
+        for name in ['left', 'middle', 'right']:
+
+            widget = getattr(self, name, None)
+
+            if isinstance(widget, QWidget) and widget.isVisible():
+
+                corner = widget.mapToGlobal(QPoint(0, 0))
+                areas[name] = [corner.x() * ratio, corner.y() * ratio, (corner.x() + widget.width()) * ratio,
+                               (corner.y() + widget.height()) * ratio]
+
+        return areas
+
+    def gazetimeout(self):
+        """
+        Marks a timeout in the gaze samples, which ends the trial's gaze summary like a response
+        """
+
+        self.tracker.mark('timeout', time.perf_counter_ns(), self.roundsdone + 1, self.trialsdone + 1)
+
+    def gazesummary(self, person=None):
+        """
+        Summarizes the gaze in the trials since the last summary and sends it to the participant class
+        :param person: the participant class (so this can be one of its ending callbacks)
+        """
+
+        summaries = self.tracker.summarize()
+
+        if summaries:
+            self.person.set_gaze(summaries)
+
     def defaultelements(self):
         """
         This function will add in the default elements. Anything in here would be stuff that most or all tasks use
@@ -97,8 +611,13 @@ class Experiment(QWidget):
         # Add instructions to the layout
         self.instquitlayout.addWidget(self.instructions)
 
-        # add the middle, which will always have the same starting text
-        self.middle = QLabel('Press \"G\" to start, \"I\" for instructions')
+        # add the middle, which will always have the same starting text (drawn by the frame presenter if it is on)
+        if self.presenter == 'Yes':
+            self.middle = presenter.FramePresenter(self.clock, 'Press \"G\" to start, \"I\" for instructions',
+                                                   BACKGROUND)
+
+        else:
+            self.middle = QLabel('Press \"G\" to start, \"I\" for instructions')
         self.middle.setFont(QFont('Helvetica', 45))
 
         # center middle
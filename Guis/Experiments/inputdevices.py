@@ -0,0 +1,294 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+import fcntl
+import logging
+import queue
+import select
+import struct
+import threading
+import time
+
+# where responses can come from: Qt's key events, a keyboard or button box read straight from Linux's event devices, or
+# a serial response box (make_device also takes 'Simulated', for testing)
+DEVICES = ['Keyboard', 'Evdev', 'Serial']
+
+# how long a read waits before checking whether the device was stopped, in seconds
+POLL = .1
+
+# the layout of a Linux input event (seconds, microseconds, type, code, value) and the values used from it
+EVENTFORMAT = 'llHHi'
+EVENTSIZE = struct.calcsize(EVENTFORMAT)
+KEYEVENT = 1
+KEYPRESS = 1
+
+# the ioctl that picks the clock an event device stamps its events with (_IOW('E', 0xa0, int))
+EVIOCSCLOCKID = 0x400445a0
+
+# Linux key codes of the keys the tasks use, and the text Qt would give for them
+KEYCODES = {2: '1', 3: '2', 4: '3', 5: '4', 6: '5', 7: '6', 8: '7', 9: '8', 10: '9', 11: '0',
+            16: 'q', 17: 'w', 18: 'e', 19: 'r', 20: 't', 21: 'y', 22: 'u', 23: 'i', 24: 'o', 25: 'p',
+            30: 'a', 31: 's', 32: 'd', 33: 'f', 34: 'g', 35: 'h', 36: 'j', 37: 'k', 38: 'l',
+            44: 'z', 45: 'x', 46: 'c', 47: 'v', 48: 'b', 49: 'n', 50: 'm'}
+
+# a serial box doesn't say when a button is let go, so another press of the same button this soon (in seconds) is
+# taken to be the box repeating it
+REPEATWINDOW = .05
+
+
+class InputDevice(QObject):
+    """
+    Reads a response device in its own thread, so presses are timestamped when they are read instead of when the Qt
+    event loop gets to them (behind any painting or timer work). Each press is timestamped on time.perf_counter_ns, the
+    same monotonic clock the experiments use (right after the read, or with the device's own stamp put on that clock),
+    and is handed to the experiment with that timestamp. Auto-repeats from holding a key down are left out. Only the
+    keys the device is told to listen for are handed on, so the experimenter's keys still come through Qt
+    """
+
+    # the text of the key and the raw perf_counter_ns time it was pressed (an object, since it doesn't fit in a C int)
+    pressed = pyqtSignal(str, object)
+
+    def __init__(self, keys=None):
+        super().__init__()
+
+        # the keys to hand on (lowercase), or None for every key
+        self.keys = None if keys is None else set(key.lower() for key in keys)
+
+        # the reading thread and whether it should stop
+        self.reader = None
+        self.stopped = threading.Event()
+
+    def start(self):
+        """
+        Opens the device and starts reading it in the background
+        """
+
+        self.open()
+
+        self.reader = threading.Thread(target=self.readloop, daemon=True)
+        self.reader.start()
+
+    def stop(self, person=None):
+        """
+        Stops reading and closes the device
+        :param person: the participant class (so this can be one of its finished callbacks)
+        """
+
+        self.stopped.set()
+
+        if self.reader is not None:
+            self.reader.join()
+
+        self.close()
+
+    def deliver(self, key, stamp):
+        """
+        Hands a press to the experiment, if it is one of the keys the device listens for
+        :param key: string for the key
+        :param stamp: integer for the raw perf_counter_ns time it was pressed
+        """
+
+        if (self.keys is None) or (key.lower() in self.keys):
+            self.pressed.emit(key, stamp)
+
+    def readloop(self):
+        """
+        Runs in the reading thread until the device is stopped
+        """
+
+        while not self.stopped.is_set():
+
+            try:
+                self.read()
+
+            except OSError as err:
+
+                logging.exception(err, exc_info=True)
+                logging.info('Stopped reading the response device')
+
+                break
+
+    def open(self):
+        """
+        Opens the device. Nothing to open by default
+        """
+
+    def close(self):
+        """
+        Closes the device. Nothing to close by default
+        """
+
+    def read(self):
+        """
+        Waits up to POLL seconds for presses and delivers them. Each device reads differently
+        """
+
+
+class EvdevDevice(InputDevice):
+    """
+    Reads a keyboard or USB button box from its Linux event device (e.g., /dev/input/event3), which needs read
+    permission for the device (e.g., being in the input group). The kernel marks auto-repeats as their own kind of
+    event, so those are simply skipped. Every press keeps the time the kernel stamped it with instead of the time it was
+    read, so presses that are read together still get their own times
+    """
+
+    def __init__(self, path, keys=None):
+        super().__init__(keys)
+
+        self.path = path
+        self.file = None
+
+        # the clock the kernel stamps the device's events with
+        self.clock = time.CLOCK_REALTIME
+
+    def open(self):
+
+        self.file = open(self.path, 'rb', buffering=0)
+
+        # have the kernel stamp the events with the monotonic clock (the one perf_counter uses on Linux), so the clock
+        # changing (e.g., NTP) doesn't move them. Older kernels keep the wall clock
+        try:
+            fcntl.ioctl(self.file, EVIOCSCLOCKID, struct.pack('i', time.CLOCK_MONOTONIC))
+            self.clock = time.CLOCK_MONOTONIC
+
+        except OSError:
+            logging.info('Could not set the clock of ' + self.path + '; using the wall clock for its events')
+
+    def close(self):
+
+        if self.file is not None:
+            self.file.close()
+
+    def read(self):
+
+        ready = select.select([self.file], [], [], POLL)[0]
+
+        if not ready:
+            return
+
+        data = self.file.read(EVENTSIZE * 64)
+
+        # how far the event clock is from perf_counter right now (nothing with the monotonic clock on Linux)
+        offset = time.perf_counter_ns() - time.clock_gettime_ns(self.clock)
+
+        for start in range(0, len(data) - EVENTSIZE + 1, EVENTSIZE):
+
+            seconds, microseconds, kind, code, value = struct.unpack(EVENTFORMAT, data[start:start + EVENTSIZE])
+
+            # only key presses (not releases or repeats) of keys that have a text, each at the time the kernel got it
+            if (kind == KEYEVENT) & (value == KEYPRESS) & (code in KEYCODES):
+                self.deliver(KEYCODES[code], seconds * 1000000000 + microseconds * 1000 + offset)
+
+
+class SerialDevice(InputDevice):
+    """
+    Reads a serial response box that sends one character for each button press (e.g., '1' and '2'). This needs the
+    pyserial package. The box can't say when a button is let go, so a press of the same button within REPEATWINDOW
+    seconds of the last one is taken as a repeat
+    """
+
+    def __init__(self, port, keys=None, baudrate=9600):
+        super().__init__(keys)
+
+        self.port = port
+        self.baudrate = baudrate
+        self.serial = None
+
+        # the last button and when it was read
+        self.lastkey = None
+        self.laststamp = 0
+
+    def open(self):
+
+        import serial
+
+        self.serial = serial.Serial(self.port, self.baudrate, timeout=POLL)
+
+    def close(self):
+
+        if self.serial is not None:
+            self.serial.close()
+
+    def read(self):
+
+        data = self.serial.read(1)
+        stamp = time.perf_counter_ns()
+
+        if not data:
+            return
+
+        key = data.decode('ascii', errors='replace')
+
+        if (key == self.lastkey) & (stamp - self.laststamp < REPEATWINDOW * 1e9):
+            return
+
+        self.lastkey = key
+        self.laststamp = stamp
+
+        self.deliver(key, stamp)
+
+
+class SimulatedDevice(InputDevice):
+    """
+    A device for testing that presses keys when it is told to, going through the same thread and timestamps as a real
+    device. Held keys can be simulated too, to check that their repeats are left out
+    """
+
+    def __init__(self, keys=None):
+        super().__init__(keys)
+
+        # presses waiting to happen, as [raw time it is due, key, whether it is a repeat]
+        self.presses = queue.Queue()
+
+    def press(self, key, delay=0.0, repeats=0):
+        """
+        Presses a key
+        :param key: string for the key
+        :param delay: float for how many seconds from now the key is pressed
+        :param repeats: integer for how many auto-repeats follow the press (as if the key was held down)
+        """
+
+        due = time.perf_counter_ns() + int(delay * 1e9)
+
+        self.presses.put([due, key, False])
+
+        for repeat in range(repeats):
+            self.presses.put([due + int((repeat + 1) * .03 * 1e9), key, True])
+
+    def read(self):
+
+        try:
+            due, key, repeat = self.presses.get(timeout=POLL)
+
+        except queue.Empty:
+            return
+
+        # wait for the press to happen
+        time.sleep(max(0, (due - time.perf_counter_ns()) / 1e9))
+        stamp = time.perf_counter_ns()
+
+        if not repeat:
+            self.deliver(key, stamp)
+
+
+def make_device(kind, path='', keys=None):
+    """
+    Makes the device that responses come from
+    :param kind: string from DEVICES
+    :param path: string for the event device or serial port
+    :param keys: list of the keys to hand on (e.g., the participant's response keys), or None for every key
+    :return: the input device, or None for Qt's key events
+    """
+
+    match kind:
+
+        case 'Evdev':
+            return EvdevDevice(path, keys)
+
+        case 'Serial':
+            return SerialDevice(path, keys)
+
+        case 'Simulated':
+            return SimulatedDevice(keys)
+
+        case _:
+            return None
@@ -1,8 +1,7 @@
 from PyQt6.QtWidgets import QLabel, QHBoxLayout
 from PyQt6.QtGui import QFont
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtCore import Qt, pyqtSignal
 
-import time
 
 from Guis.Experiments import gui
 
@@ -10,8 +9,8 @@ from Guis.Experiments import gui
 class PrExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # Left and right options (and middle stuff) with font settingsguis
         self.left = QLabel('')
@@ -40,7 +39,7 @@ class PrExp(gui.Experiment):
         self.instquitlayout.addWidget(self.quitbutton)
 
         # Make timer for new trial screen
-        self.newtrialtimer = QTimer()
+        self.newtrialtimer = self.scheduler.timer('new trial')
         self.newtrialtimer.timeout.connect(self.generatetrial)
 
     def generatenext(self):
@@ -151,8 +150,8 @@ class PrExp(gui.Experiment):
 class NbExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # Instructions
         self.instructions.setText('Press ' + self.person.leftkey[0] + ' if the letter is a false alarm. Press ' +
@@ -186,8 +185,8 @@ class NbExp(gui.Experiment):
             # get the next letter
             self.middle.setText(self.person.get_trial_text())
 
-            # get the start time
-            self.starttime = time.time() - self.overallstart
+            # paint the trial and get the start time
+            self.starttime = self.flip()
 
             # start trial timers and allow the user to respond
             self.timer.start(3000)
@@ -266,7 +265,7 @@ class NbExp(gui.Experiment):
             # if this is the first trial of the first round, set the global start time to make the onset time make more
             # sense
             if (self.trialsdone == 0) & (self.roundsdone == 0):
-                self.overallstart = time.time()
+                self.clock.reset()
 
         # if the participant presses the left or right keys and is allowed to respond
         if ((key in self.person.rightkey) | (key in self.person.leftkey)) & (self.responseenabled == 1):
@@ -281,9 +280,8 @@ class NbExp(gui.Experiment):
             self.timer.stop()
             self.trialsdone += 1
 
-            # use time.time and the start time variable to compute rt
-            endtime = time.time() - self.overallstart
-            rt = endtime - self.starttime
+            # use the time the key press arrived and the time the trial was painted to compute rt
+            rt = self.responsetime(self.starttime)
 
             # if the key was the right key...
             if key in self.person.rightkey:
@@ -1,86 +1,58 @@
-import time
-import random
 
-from PyQt6.QtWidgets import QLabel, QHBoxLayout
-from PyQt6.QtGui import QPixmap
-from PyQt6.QtCore import Qt, pyqtSignal
+from PyQt6.QtWidgets import QLabel, QStackedLayout, QSizePolicy
+from PyQt6.QtGui import QPixmap, QPainter
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 
 from Guis.Experiments import gui
 
+import logging
+import time
+
+# the size of the shapes in the search array, and the smallest array (in case the window isn't laid out yet)
+SHAPESIZE = 150
+MINWIDTH = 900
+MINHEIGHT = 600
+
 
 class NACTExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # Instructions
         self.instructions.setText('Press ' + self.person.leftkey[0] + ' for |. Press ' + self.person.rightkey[0] +
                                   ' for -.')
 
-        # Make middle layout for pictures and text
-        middlelayout = QHBoxLayout()
-
-        self.left = QLabel('')
-        self.left.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.left.setScaledContents(True)
-
-        self.right = QLabel('')
-        self.right.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.right.setScaledContents(True)
-
-        middlelayout.addStretch(1)
-        middlelayout.addWidget(self.left)
-        middlelayout.addStretch(1)
-        middlelayout.addWidget(self.middle)
-        middlelayout.addStretch(1)
-        middlelayout.addWidget(self.right)
-        middlelayout.addStretch(1)
-
-        # Make middle top for pictures
-        middletoplayout = QHBoxLayout()
-
-        self.topleft = QLabel('')
-        self.topleft.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.topleft.setScaledContents(True)
-
-        self.topright = QLabel('')
-        self.topright.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.topright.setScaledContents(True)
-
-        middletoplayout.addStretch(1)
-        middletoplayout.addWidget(self.topleft)
-        middletoplayout.addStretch(1)
-        middletoplayout.addWidget(self.topright)
-        middletoplayout.addStretch(1)
-
-        # Make middle bottom for pictures
-        middlebottomlayout = QHBoxLayout()
-
-        self.bottomleft = QLabel('')
-        self.bottomleft.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.bottomleft.setScaledContents(True)
+        # the search array is put together into one picture ahead of time and shown by one label, so that all six
+        # shapes (and the fixation cross) show up in the same paint. It takes turns with the middle label, which shows
+        # the instructions and the feedback between trials
+        self.array = ArrayLabel(self.clock)
+        self.array.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
-        self.bottomright = QLabel('')
-        self.bottomright.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.bottomright.setScaledContents(True)
+        # the array is made at the size of the label, so don't let it make the label any bigger
+        self.array.setSizePolicy(QSizePolicy.Policy.Ignored, QSizePolicy.Policy.Ignored)
 
-        middlebottomlayout.addStretch(1)
-        middlebottomlayout.addWidget(self.bottomleft)
-        middlebottomlayout.addStretch(1)
-        middlebottomlayout.addWidget(self.bottomright)
-        middlebottomlayout.addStretch(1)
+        self.screens = QStackedLayout()
+        self.screens.addWidget(self.middle)
+        self.screens.addWidget(self.array)
 
         # Put everything in vertical layout
-        self.instquitlayout.addStretch(1)
-        self.instquitlayout.addLayout(middletoplayout)
-        self.instquitlayout.addStretch(1)
-        self.instquitlayout.addLayout(middlelayout)
-        self.instquitlayout.addStretch(1)
-        self.instquitlayout.addLayout(middlebottomlayout)
-        self.instquitlayout.addStretch(1)
+        self.instquitlayout.addLayout(self.screens, 1)
         self.instquitlayout.addWidget(self.quitbutton)
 
+        # the next trial's array, if it was put together during the iti (None otherwise), how long that took, and how
+        # long putting the arrays together and painting them took over the task
+        self.nextarray = None
+        self.composetime = 0.0
+        self.composetimes = []
+        self.paintdelays = []
+        self.person.finished.append(self.report)
+
+        # load and scale the shapes for the trials and the pictures for the instructions now so trials don't have to
+        self.stimuli.preload(['NACT_d*.png', 'NACT_s*.png'], 150, 150)
+        self.stimuli.preload(['NACT_Part*.png', 'NACT_FixEx.png'], 500, 500)
+
     def generatenext(self):
         """
         Generate the info for the next trial and put it on screen. if the final trial was just completed, then the next
@@ -98,37 +70,38 @@ class NACTExp(gui.Experiment):
         # user wants
         if self.trialsdone < self.person.get_trials():
 
-            # make a list for the pixmaps
-            self.pixmaps = []
+            # put the array together now if it wasn't done during the iti (e.g., the first trial of a part)
+            if self.nextarray is None:
+                self.prepare()
 
-            # obtain the list of strings
+            # start the trial the array was made for
             self.picstrings = self.person.get_trial_pic()
 
-            # add the appropriate elements to the picture strings and add the revised strings to the pixmap list
-            for pic in self.picstrings:
+            # swap the whole array (with the fixation cross) onto the screen at once
+            self.array.painttime = None
+            swaptime = self.clock.now()
 
-                pathstring = 'Assets/' + pic + '.png'
-                self.pixmaps.append(QPixmap(pathstring))
+            self.array.setPixmap(self.nextarray)
+            self.screens.setCurrentWidget(self.array)
+            self.nextarray = None
 
-            # arrange the pixmaps around the screen
-            self.topleft.setPixmap(self.pixmaps[0].scaled(150, 150, Qt.AspectRatioMode.KeepAspectRatio))
-            self.left.setPixmap(self.pixmaps[1].scaled(150, 150, Qt.AspectRatioMode.KeepAspectRatio))
-            self.bottomleft.setPixmap(self.pixmaps[2].scaled(150, 150, Qt.AspectRatioMode.KeepAspectRatio))
-            self.bottomright.setPixmap(self.pixmaps[3].scaled(150, 150, Qt.AspectRatioMode.KeepAspectRatio))
-            self.right.setPixmap(self.pixmaps[4].scaled(150, 150, Qt.AspectRatioMode.KeepAspectRatio))
-            self.topright.setPixmap(self.pixmaps[5].scaled(150, 150, Qt.AspectRatioMode.KeepAspectRatio))
+            # paint the trial and get the onset time for the trial, which will also be used to compute reaction time
+            self.starttime = self.flip()
 
-            # set the fixation cross
-            self.middle.setText('+')
+            # keep how long the array took to put together and how long after the swap it was first painted (all six
+            # shapes are in the one picture, so they can only show up in the same paint)
+            paintdelay = float('nan') if self.array.painttime is None else self.array.painttime - swaptime
 
-            # get the onset time for the trial, which will also be used to compute reaction time
-            self.starttime = time.time() - self.overallstart
+            self.composetimes.append(self.composetime)
+            self.paintdelays.append(paintdelay)
+
+            self.person.set_timing({'compose time': self.composetime, 'onset to paint': paintdelay})
 
             # set the timers, with the trial lasting between 1.2 and 1.5 seconds
-            randomtimer = random.randint(1200, 1500)
+            trialtime = self.person.get_jitter()
 
-            self.timer.start(randomtimer)
-            self.ititimer.start(randomtimer+1000)
+            self.timer.start(trialtime)
+            self.ititimer.start(trialtime+1000)
 
             # Set the variable that allows the user to respond
             self.responseenabled = 1
@@ -154,16 +127,89 @@ class NACTExp(gui.Experiment):
 
     def iti(self):
         """
-        screen for between trials, which blanks out the pixmaps and removes the border around the middle
+        screen for between trials, which takes the array off the screen and puts the next one together once the iti
+        is painted
         """
 
-        # blank out all pixmaps
-        self.topleft.setPixmap(QPixmap())
-        self.left.setPixmap(QPixmap())
-        self.bottomleft.setPixmap(QPixmap())
-        self.bottomright.setPixmap(QPixmap())
-        self.right.setPixmap(QPixmap())
-        self.topright.setPixmap(QPixmap())
+        # go back to the middle label, which has the feedback
+        self.screens.setCurrentWidget(self.middle)
+        self.array.setPixmap(QPixmap())
+
+        # put the next trial's array together if there is another trial in this part
+        if self.trialsdone < self.person.get_trials():
+            QTimer.singleShot(0, self.prepare)
+
+    def prepare(self):
+        """
+        Makes the next trial and puts its six shapes and the fixation cross together into one picture the size of the
+        screen, keeping how long that took
+        """
+
+        # the array might already be done, or the iti this was for might be over already
+        if (self.nextarray is not None) | (self.screens.currentWidget() is self.array):
+            return
+
+        start = time.perf_counter()
+
+        # get the list of strings for the next trial and the shapes for them
+        pixmaps = [self.stimuli.get('Assets/' + pic + '.png', SHAPESIZE, SHAPESIZE)
+                   for pic in self.person.prepare_trial()]
+
+        self.nextarray = self.compose(pixmaps)
+        self.composetime = time.perf_counter() - start
+
+    def compose(self, pixmaps):
+        """
+        Draws the shapes where the old layout of six labels put them: two on top, one on each side of the fixation
+        cross, and two on the bottom, with equal space around them
+        :param pixmaps: a list of the six pixmaps (top left, left, bottom left, bottom right, right, top right)
+        :return: the pixmap of the whole array
+        """
+
+        width = max(self.array.width(), MINWIDTH)
+        height = max(self.array.height(), MINHEIGHT)
+
+        # the left edges of the shapes in rows of two and three, and the top edges of the three rows
+        pairs = [(width - 2 * SHAPESIZE) * (i + 1) // 3 + SHAPESIZE * i for i in range(2)]
+        triples = [(width - 3 * SHAPESIZE) * (i + 1) // 4 + SHAPESIZE * i for i in range(3)]
+        rows = [(height - 3 * SHAPESIZE) * (i + 1) // 4 + SHAPESIZE * i for i in range(3)]
+
+        places = [[pairs[0], rows[0]], [triples[0], rows[1]], [pairs[0], rows[2]], [pairs[1], rows[2]],
+                  [triples[2], rows[1]], [pairs[1], rows[0]]]
+
+        array = QPixmap(width, height)
+        array.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(array)
+
+        # center each shape in its spot, like the labels did
+        for pixmap, place in zip(pixmaps, places):
+            painter.drawPixmap(place[0] + (SHAPESIZE - pixmap.width()) // 2,
+                               place[1] + (SHAPESIZE - pixmap.height()) // 2, pixmap)
+
+        # the fixation cross in the middle label's font
+        painter.setFont(self.middle.font())
+        painter.drawText(array.rect(), Qt.AlignmentFlag.AlignCenter, '+')
+        painter.end()
+
+        return array
+
+    def report(self, person=None):
+        """
+        Logs how long the arrays took to put together and how long after the swap they were painted
+        :param person: the participant class (so this can be one of its finished callbacks)
+        """
+
+        if not self.composetimes:
+            return
+
+        # arrays that never got painted (e.g., if the window was hidden) are left out of the paint delays
+        painted = [delay * 1000 for delay in self.paintdelays if delay == delay]
+
+        logging.info('Search arrays: ' + str(len(self.composetimes)) + ', mean compose time ' +
+                     str(round(1000 * sum(self.composetimes) / len(self.composetimes), 3)) + ' ms, mean onset to paint '
+                     + (str(round(sum(painted) / len(painted), 3)) + ' ms, max ' + str(round(max(painted), 3)) + ' ms'
+                        if painted else 'unknown (never painted)'))
 
     def timeout(self):
         """
@@ -210,7 +256,7 @@ class NACTExp(gui.Experiment):
             # if this is the first trial of the first round, set the global start time to make the onset time make more
             # sense
             if (self.trialsdone == 0) & (self.roundsdone == 0):
-                self.overallstart = time.time()
+                self.clock.reset()
 
         # if the participant presses the left or right keys and is allowed to respond
         if ((key in self.person.rightkey) | (key in self.person.leftkey)) & (self.responseenabled == 1):
@@ -225,9 +271,8 @@ class NACTExp(gui.Experiment):
             self.timer.stop()
             self.trialsdone += 1
 
-            # use time.time and the start time variable to compute rt
-            endtime = time.time() - self.overallstart
-            rt = endtime - self.starttime
+            # use the time the key press arrived and the time the trial was painted to compute rt
+            rt = self.responsetime(self.starttime)
 
             # if the key was the right key...
             if key in self.person.rightkey:
@@ -258,18 +303,15 @@ class NACTExp(gui.Experiment):
 
                 # if this is the fourth instruction...
                 if self.inst == 4:
-                    pixmap = QPixmap('Assets/NACT_Part1Ex1.png')
-                    self.middle.setPixmap(pixmap.scaled(500, 500, Qt.AspectRatioMode.KeepAspectRatio))
+                    self.middle.setPixmap(self.stimuli.get('Assets/NACT_Part1Ex1.png', 500, 500))
 
                 # if this is the fifth instruction...
                 elif self.inst == 5:
-                    pixmap = QPixmap('Assets/NACT_Part1Ex2.png')
-                    self.middle.setPixmap(pixmap.scaled(500, 500, Qt.AspectRatioMode.KeepAspectRatio))
+                    self.middle.setPixmap(self.stimuli.get('Assets/NACT_Part1Ex2.png', 500, 500))
 
                 # if this is the twelth instruction...
                 elif self.inst == 12:
-                    pixmap = QPixmap('Assets/NACT_FixEx.png')
-                    self.middle.setPixmap(pixmap.scaled(500, 500, Qt.AspectRatioMode.KeepAspectRatio))
+                    self.middle.setPixmap(self.stimuli.get('Assets/NACT_FixEx.png', 500, 500))
 
                 # if this is an instruction other than those above...
                 else:
@@ -288,18 +330,15 @@ class NACTExp(gui.Experiment):
 
                 # if this is the fifth instruction...
                 if self.inst == 5:
-                    pixmap = QPixmap('Assets/NACT_Part2Ex1.png')
-                    self.middle.setPixmap(pixmap.scaled(500, 500, Qt.AspectRatioMode.KeepAspectRatio))
+                    self.middle.setPixmap(self.stimuli.get('Assets/NACT_Part2Ex1.png', 500, 500))
 
                 # if this is the sixth instruction...
                 elif self.inst == 6:
-                    pixmap = QPixmap('Assets/NACT_Part2Ex2.png')
-                    self.middle.setPixmap(pixmap.scaled(500, 500, Qt.AspectRatioMode.KeepAspectRatio))
+                    self.middle.setPixmap(self.stimuli.get('Assets/NACT_Part2Ex2.png', 500, 500))
 
                 # if this is the eighth instruction...
                 elif self.inst == 8:
-                    pixmap = QPixmap('Assets/NACT_FixEx.png')
-                    self.middle.setPixmap(pixmap.scaled(500, 500, Qt.AspectRatioMode.KeepAspectRatio))
+                    self.middle.setPixmap(self.stimuli.get('Assets/NACT_FixEx.png', 500, 500))
 
                 # if this is an instruction other than those above...
                 else:
@@ -312,3 +351,26 @@ class NACTExp(gui.Experiment):
 
                     # reset to zero so the instructions can be viewed again
                     self.inst = 0
+
+
+class ArrayLabel(QLabel):
+    """
+    The label that shows the search array. It keeps the time it was first painted after the experiment last cleared
+    that time, so the experiment can tell how long after the swap the array got on screen
+    """
+
+    def __init__(self, clock):
+        super().__init__('')
+
+        self.clock = clock
+        self.painttime = None
+
+    def paintEvent(self, event):
+        """
+        Paints the label and then gets the time, if it doesn't have one yet
+        """
+
+        super().paintEvent(event)
+
+        if self.painttime is None:
+            self.painttime = self.clock.now()
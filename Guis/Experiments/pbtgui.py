@@ -1,8 +1,7 @@
-import time
 
 from PyQt6.QtWidgets import QHBoxLayout
 from PyQt6.QtGui import QPixmap
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtCore import pyqtSignal
 
 from Guis.Experiments import gui
 
@@ -10,8 +9,8 @@ from Guis.Experiments import gui
 class PBTExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # Instructions
         self.instructions.setText('Press ' + self.person.leftkey[0] + ' for crosses. Press ' +
@@ -31,9 +30,13 @@ class PBTExp(gui.Experiment):
         self.instquitlayout.addWidget(self.quitbutton)
 
         # Make a timer that controls how long an image is left on the screen
-        self.blankouttimer = QTimer()
+        self.blankouttimer = self.scheduler.timer('blankout')
         self.blankouttimer.timeout.connect(self.blankout)
 
+        # load and scale the pictures for the trials and the instructions now so trials don't have to
+        self.stimuli.preload(['PBT_*.png'], 250, 250)
+        self.stimuli.preload(['PBT_DSC.png', 'PBT_DCS.png'], 200, 200)
+
     def generatenext(self):
         """
         Generate the info for the next trial and put it on screen. if the final trial was just completed, then the next
@@ -54,12 +57,11 @@ class PBTExp(gui.Experiment):
             self.picstring = self.person.get_trial_pic()
             pathstring = 'Assets/' + self.picstring
 
-            # Make a pixmap of the picture and then set the middle to that pixmap
-            pixmap = QPixmap(pathstring)
-            self.middle.setPixmap(pixmap.scaled(250, 250, Qt.AspectRatioMode.KeepAspectRatio))
+            # Get the preloaded pixmap of the picture and then set the middle to that pixmap
+            self.middle.setPixmap(self.stimuli.get(pathstring, 250, 250))
 
-            # get the onset time for the trial, which will also be used to compute reaction time
-            self.starttime = time.time() - self.overallstart
+            # paint the trial and get the onset time for the trial, which will also be used to compute reaction time
+            self.starttime = self.flip()
 
             # Start the timers for until timeout, the time until the next trial begins, and how long the picture is seen
             self.timer.start(5000)
@@ -101,6 +103,10 @@ class PBTExp(gui.Experiment):
         self.blankouttimer.stop()
         self.middle.setPixmap(QPixmap())
 
+        # keep how long the picture was up, unless the trial is already over (then it went with the response)
+        if self.responseenabled == 1:
+            self.stimulusoff()
+
     def timeout(self):
         """
         if the timer runs out and the participant doesn't respond, then the
@@ -146,7 +152,7 @@ class PBTExp(gui.Experiment):
             # if this is the first trial of the first round, set the global start time to make the onset time make more
             # sense
             if (self.trialsdone == 0) & (self.roundsdone == 0):
-                self.overallstart = time.time()
+                self.clock.reset()
 
         # if the participant presses the right or left key and is allowed to respond...
         if ((key in self.person.rightkey) | (key in self.person.leftkey)) & (self.responseenabled == 1):
@@ -161,9 +167,8 @@ class PBTExp(gui.Experiment):
             self.timer.stop()
             self.trialsdone += 1
 
-            # use time.time and the start time variable to compute rt
-            endtime = time.time() - self.overallstart
-            rt = endtime - self.starttime
+            # use the time the key press arrived and the time the trial was painted to compute rt
+            rt = self.responsetime(self.starttime)
 
             # if the key was the right key...
             if key in self.person.rightkey:
@@ -191,13 +196,11 @@ class PBTExp(gui.Experiment):
 
             # if this is the sixth instruction...
             if self.inst == 6:
-                pixmap = QPixmap('Assets/PBT_DSC.png')
-                self.middle.setPixmap(pixmap.scaled(200, 200, Qt.AspectRatioMode.KeepAspectRatio))
+                self.middle.setPixmap(self.stimuli.get('Assets/PBT_DSC.png', 200, 200))
 
             # if this is the ninth instruction...
             elif self.inst == 9:
-                pixmap = QPixmap('Assets/PBT_DCS.png')
-                self.middle.setPixmap(pixmap.scaled(200, 200, Qt.AspectRatioMode.KeepAspectRatio))
+                self.middle.setPixmap(self.stimuli.get('Assets/PBT_DCS.png', 200, 200))
 
             # if this is an instruction other than sixth or ninth...
             else:
@@ -0,0 +1,278 @@
+from PyQt6.QtOpenGLWidgets import QOpenGLWidget
+from PyQt6.QtGui import QSurfaceFormat, QPainter, QColor, QPixmap, QPen, QFontMetrics
+from PyQt6.QtCore import Qt, QRect, QSize, QEventLoop, QTimer
+
+import re
+import time
+
+# how wide the default text margins are, like a label's
+MARGIN = 2
+
+# how many refreshes a flip waits for the swap that shows its change before giving up on it
+WAITFRAMES = 10
+
+
+class FramePresenter(QOpenGLWidget):
+    """
+    Stands in for the middle label of an experiment (setText, setPixmap, setStyleSheet, setAlignment, and setFont work
+    the same way) but draws with OpenGL, swapping buffers on the screen's vertical refresh. A change to what is shown is
+    queued for the next refresh, and the buffer swap that first shows it is kept as the change's onset, with its frame
+    index (refreshes since the first swap). A change that missed one or more refreshes after it was asked for counts
+    those refreshes as dropped frames
+    """
+
+    def __init__(self, clock, text='', background='#C2CAD0'):
+        super().__init__()
+
+        # swap on every vertical refresh. The default format is set as well, since the window that the widget is
+        # composed into takes its format from there
+        surfaceformat = QSurfaceFormat.defaultFormat()
+        surfaceformat.setSwapInterval(1)
+        QSurfaceFormat.setDefaultFormat(surfaceformat)
+        self.setFormat(surfaceformat)
+
+        # the experiment clock, which the swap times are given on (frames are counted on the raw time, since the clock
+        # gets reset when the task starts)
+        self.clock = clock
+
+        # what is shown: text or a picture, how it is lined up, the background, and the border
+        self.content = text
+        self.alignment = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+        self.background = QColor(background)
+        self.border = 0
+        self.bordercolor = QColor('black')
+
+        # the raw time (in nanoseconds) the change that is waiting for a swap was asked for (None if nothing is
+        # waiting), and the time of the change that is in the frame being drawn. Changes are numbered, so a swap can be
+        # matched to the change it showed
+        self.requested = None
+        self.drawn = None
+        self.requestid = 0
+        self.drawnid = 0
+
+        # the time of the first swap (frame 0), the last change's swap time, frame, dropped frames, and change number
+        # (None once it was taken), the changes and dropped frames over the task, and the flips that never got a swap
+        self.zero = None
+        self.lastswap = None
+        self.changes = 0
+        self.dropped = 0
+        self.missed = 0
+
+        self.frameSwapped.connect(self.swapped)
+
+    def get_period(self):
+        """
+        :return: float for the time between vertical refreshes in seconds
+        """
+
+        rate = self.screen().refreshRate() if self.screen() is not None else 0
+
+        return 1 / rate if rate > 0 else 1 / 60
+
+    def setText(self, text):
+        """
+        Shows text, like a label
+        :param text: string
+        """
+
+        self.change(str(text))
+
+    def text(self):
+        """
+        :return: the text being shown, or an empty string if it is a picture
+        """
+
+        return self.content if isinstance(self.content, str) else ''
+
+    def setPixmap(self, pixmap):
+        """
+        Shows a picture, like a label. An empty pixmap clears the screen
+        :param pixmap: QPixmap
+        """
+
+        self.change(pixmap)
+
+    def pixmap(self):
+        """
+        :return: the picture being shown, or an empty pixmap if it is text
+        """
+
+        return self.content if isinstance(self.content, QPixmap) else QPixmap()
+
+    def setAlignment(self, alignment):
+        """
+        Lines up the text or picture, like a label
+        :param alignment: Qt.AlignmentFlag
+        """
+
+        self.alignment = alignment
+        self.update()
+
+    def setStyleSheet(self, stylesheet):
+        """
+        Takes the border out of a style sheet (the only style the experiments change on the middle)
+        :param stylesheet: string, e.g., 'border: 3px solid blue;'
+        """
+
+        match = re.search(r'border:\s*(\d+)px(?:\s+\w+\s+(\w+|#[0-9A-Fa-f]+))?', stylesheet)
+
+        if match is not None:
+
+            self.border = int(match.group(1))
+
+            if match.group(2) is not None:
+                self.bordercolor = QColor(match.group(2))
+
+        self.change(self.content)
+
+    def change(self, content):
+        """
+        Queues new content for the next refresh
+        :param content: string or QPixmap
+        """
+
+        self.content = content
+
+        # the change counts from when it was first asked for if another change is still waiting
+        if self.requested is None:
+            self.requested = time.perf_counter_ns()
+
+        # a swap that showed an earlier change can't be this change's onset
+        self.requestid += 1
+        self.lastswap = None
+
+        self.updateGeometry()
+        self.update()
+
+    def sizeHint(self):
+        """
+        :return: the size of the text or picture plus the border, like a label
+        """
+
+        if isinstance(self.content, QPixmap):
+            size = self.content.size()
+
+        else:
+            size = QFontMetrics(self.font()).boundingRect(QRect(), self.alignment, self.content).size()
+            size += QSize(2 * MARGIN, 2 * MARGIN)
+
+        return size + QSize(2 * self.border, 2 * self.border)
+
+    def minimumSizeHint(self):
+        """
+        :return: the same as the size hint, so the layout doesn't squeeze the content
+        """
+
+        return self.sizeHint()
+
+    def paintGL(self):
+        """
+        Draws the frame
+        """
+
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.background)
+
+        inside = self.rect().adjusted(self.border, self.border, -self.border, -self.border)
+
+        if isinstance(self.content, QPixmap):
+
+            if not self.content.isNull():
+
+                place = QRect(0, 0, self.content.width(), self.content.height())
+                place.moveCenter(inside.center())
+                painter.drawPixmap(place, self.content)
+
+        else:
+
+            painter.setFont(self.font())
+            painter.setPen(QColor('black'))
+            painter.drawText(inside.adjusted(MARGIN, MARGIN, -MARGIN, -MARGIN), self.alignment, self.content)
+
+        if self.border > 0:
+
+            painter.setPen(QPen(self.bordercolor, self.border))
+            painter.drawRect(self.rect().adjusted(self.border // 2, self.border // 2, -(self.border + 1) // 2,
+                                                  -(self.border + 1) // 2))
+
+        painter.end()
+
+        # the change that was waiting is in this frame
+        if self.requested is not None:
+
+            self.drawn = self.requested
+            self.drawnid = self.requestid
+            self.requested = None
+
+    def swapped(self):
+        """
+        Gets the time of a buffer swap and, if it showed a change, keeps it as that change's onset
+        """
+
+        now = time.perf_counter_ns()
+
+        if self.zero is None:
+            self.zero = now
+
+        if self.drawn is None:
+            return
+
+        period = self.get_period()
+
+        # the refreshes that went by between asking for the change and the swap that showed it
+        dropped = int((now - self.drawn) / 1e9 / period)
+
+        self.lastswap = [(now - self.clock.zero) / 1e9, round((now - self.zero) / 1e9 / period), dropped,
+                         self.drawnid]
+        self.changes += 1
+        self.dropped += dropped
+
+        self.drawn = None
+
+    def takeswap(self):
+        """
+        Gets the swap that showed the latest change, if it happened since the last time this was called
+        :return: a list of the swap time, the frame index, and the dropped frames, or None
+        """
+
+        swap = self.lastswap
+
+        # only the swap of the latest change counts
+        if (swap is None) or (swap[3] != self.requestid):
+            return None
+
+        self.lastswap = None
+
+        return swap[:3]
+
+    def waitswap(self):
+        """
+        Gets the swap that shows the latest change, waiting for it (up to WAITFRAMES refreshes) if it hasn't happened
+        yet. The wait runs the event loop without user input, so key presses are handled after it with their own times.
+        Without an OpenGL context there are no swaps at all, so there is nothing to wait for
+        :return: a list of the swap time, the frame index, and the dropped frames, or None if it didn't come
+        """
+
+        swap = self.takeswap()
+
+        if (swap is not None) or (self.zero is None):
+            return swap
+
+        deadline = time.perf_counter() + WAITFRAMES * self.get_period()
+
+        loop = QEventLoop()
+        self.frameSwapped.connect(loop.quit)
+
+        while (swap is None) and (time.perf_counter() < deadline):
+
+            QTimer.singleShot(max(1, int((deadline - time.perf_counter()) * 1000)), loop.quit)
+            loop.exec(QEventLoop.ProcessEventsFlag.ExcludeUserInputEvents)
+
+            swap = self.takeswap()
+
+        self.frameSwapped.disconnect(loop.quit)
+
+        if swap is None:
+            self.missed += 1
+
+        return swap
@@ -1,9 +1,5 @@
-import random
-import time
-
 from PyQt6.QtWidgets import QHBoxLayout
-from PyQt6.QtGui import QPixmap
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtCore import pyqtSignal
 
 from Guis.Experiments import gui
 
@@ -11,8 +7,8 @@ from Guis.Experiments import gui
 class SSExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # Make middle layout for pictures and text
         middlelayout = QHBoxLayout()
@@ -32,9 +28,12 @@ class SSExp(gui.Experiment):
         self.instquitlayout.addWidget(self.quitbutton)
 
         # Make timer to indicate when a signal should be sent (in signal trials)
-        self.signaltimer = QTimer()
+        self.signaltimer = self.scheduler.timer('signal')
         self.signaltimer.timeout.connect(self.sendsignal)
 
+        # load and scale the arrows and signals now so trials don't have to
+        self.stimuli.preload(['SS_*.png'], 250, 250)
+
     def generatenext(self):
         """
         Generate the info for the next trial and put it on screen. if the final trial was just completed, then the next
@@ -55,12 +54,11 @@ class SSExp(gui.Experiment):
             self.picstring = self.person.get_trial_pic()
             pathstring = 'Assets/' + self.picstring
 
-            # Make a pixmap of the picture and then set the middle to that pixmap
-            pixmap = QPixmap(pathstring)
-            self.middle.setPixmap(pixmap.scaled(250, 250, Qt.AspectRatioMode.KeepAspectRatio))
+            # Get the preloaded pixmap of the picture and then set the middle to that pixmap
+            self.middle.setPixmap(self.stimuli.get(pathstring, 250, 250))
 
-            # randomly select zero or one to determine whether the trial will be a signal or non-signal one
-            signalrand = random.randint(0, 1)
+            # get zero or one from the schedule to determine whether the trial will be a signal or non-signal one
+            signalrand = self.person.get_signal()
 
             # if you get zero, then it's a non-signal trial
             if signalrand == 0:
@@ -73,8 +71,8 @@ class SSExp(gui.Experiment):
                 self.signal = 1
                 self.signaltimer.start(self.person.get_timer())
 
-            # get the onset time for the trial, which will also be used to compute reaction time
-            self.starttime = time.time() - self.overallstart
+            # paint the trial and get the onset time for the trial, which will also be used to compute reaction time
+            self.starttime = self.flip()
 
             # Start the timers for until timeout and the time until the next trial begins
             self.timer.start(2500)
@@ -144,11 +142,11 @@ class SSExp(gui.Experiment):
         else:
             pathstring = 'Assets/SS_RightSignal.png'
 
-        # set the picture to the pixmap
-        pixmap = QPixmap(pathstring)
+        # load the preloaded pixmap
+        self.middle.setPixmap(self.stimuli.get(pathstring, 250, 250))
 
-        # load the pixmap
-        self.middle.setPixmap(pixmap.scaled(250, 250, Qt.AspectRatioMode.KeepAspectRatio))
+        # paint the signal and record when it actually appeared
+        self.person.set_timing({'signal onset': self.flip('signal onset')})
 
     def keyaction(self, key):
         """
@@ -175,7 +173,7 @@ class SSExp(gui.Experiment):
             # if this is the first trial of the first round, set the global start time to make the onset time make more
             # sense
             if (self.trialsdone == 0) & (self.roundsdone == 0):
-                self.overallstart = time.time()
+                self.clock.reset()
 
         # if the participant presses the right or left key and is allowed to respond...
         if ((key in self.person.rightkey) | (key in self.person.leftkey)) & (self.responseenabled == 1):
@@ -191,9 +189,8 @@ class SSExp(gui.Experiment):
             self.signaltimer.stop()
             self.trialsdone += 1
 
-            # use time.time and the start time variable to compute rt
-            endtime = time.time() - self.overallstart
-            rt = endtime - self.starttime
+            # use the time the key press arrived and the time the trial was painted to compute rt
+            rt = self.responsetime(self.starttime)
 
             # if the key was the right key...
             if key in self.person.rightkey:
@@ -232,8 +229,8 @@ class SSExp(gui.Experiment):
 class EGNGExp(gui.Experiment):
     keyPressed = pyqtSignal(str)
 
-    def __init__(self, person):
-        super().__init__(person)
+    def __init__(self, person, **hardware):
+        super().__init__(person, **hardware)
 
         # Variable that determines what you see at the start
         self.start = 0
@@ -254,6 +251,9 @@ class EGNGExp(gui.Experiment):
         self.instquitlayout.addStretch(1)
         self.instquitlayout.addWidget(self.quitbutton)
 
+        # load and scale the faces now so trials don't have to
+        self.stimuli.preload(['EGNG_*.png'], 250, 250)
+
     def generatenext(self):
         """
         Generate the info for the next trial and put it on screen. if the final trial was just completed, then the next
@@ -270,21 +270,17 @@ class EGNGExp(gui.Experiment):
         # user wants
         if self.trialsdone < self.person.get_trials():
 
-            # get a random number for one of the pictures
-            randopic = str(random.randint(1, 12))
-
-            # Get the string that contains the name of the trial picture
-            self.picstring = self.person.get_trial_pic() + randopic + '.png'
+            # Get the string that contains the name of the trial picture (including which face it is)
+            self.picstring = self.person.get_trial_pic()
 
             # add the path to the picture string
             pathstring = 'Assets/' + self.picstring
 
-            # Make a pixmap of the picture and then set the middle to that pixmap
-            pixmap = QPixmap(pathstring)
-            self.middle.setPixmap(pixmap.scaled(250, 250, Qt.AspectRatioMode.KeepAspectRatio))
+            # Get the preloaded pixmap of the picture and then set the middle to that pixmap
+            self.middle.setPixmap(self.stimuli.get(pathstring, 250, 250))
 
-            # get the onset time for the trial, which will also be used to compute reaction time
-            self.starttime = time.time() - self.overallstart
+            # paint the trial and get the onset time for the trial, which will also be used to compute reaction time
+            self.starttime = self.flip()
 
             # Start the timers for until timeout and the time until the next trial begins
             self.timer.start(500)
@@ -336,12 +332,13 @@ class EGNGExp(gui.Experiment):
         # indicate that a trial has been completed
         self.trialsdone += 1
 
+        # set the screen to the iti window (first, so how long the face was up can go with the trial)
+        self.iti()
+        self.stimulusoff()
+
         # send the trial info to the participant class
         self.person.updateoutput(self.trialsdone, self.picstring, self.starttime, 9999)
 
-        # set the screen to the iti window
-        self.iti()
-
     def keyaction(self, key):
         """
         Reads the keys that are pressed and does the corresponding actions
@@ -379,7 +376,7 @@ class EGNGExp(gui.Experiment):
             # if this is the first trial of the first round, set the global start time to make the onset time make more
             # sense
             if (self.trialsdone == 0) & (self.roundsdone == 0):
-                self.overallstart = time.time()
+                self.clock.reset()
 
         # if the participant presses the right or left key and is allowed to respond...
         if (key in self.person.leftkey) & (self.responseenabled == 1):
@@ -394,16 +391,16 @@ class EGNGExp(gui.Experiment):
             self.timer.stop()
             self.trialsdone += 1
 
-            # use time.time and the start time variable to compute rt
-            endtime = time.time() - self.overallstart
-            rt = endtime - self.starttime
+            # use the time the key press arrived and the time the trial was painted to compute rt
+            rt = self.responsetime(self.starttime)
+
+            # set the window to the iti screen (first, so how long the face was up can go with the trial)
+            self.iti()
+            self.stimulusoff()
 
             # send the trial info to the participant class so it can be added to the dataframe
             self.person.updateoutput(self.trialsdone, self.picstring, self.starttime, rt, 1)
 
-            # set the window to the iti screen
-            self.iti()
-
         # if someone presses the i key and the participant is between rounds...
         if (key in ['i', 'I']) & (self.betweenrounds == 1):
 
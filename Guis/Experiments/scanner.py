@@ -0,0 +1,161 @@
+from PyQt6.QtCore import QObject
+
+from Guis.Experiments import inputdevices
+
+import logging
+import time
+
+# the key that scanners (or their trigger boxes) send at the start of every volume
+TRIGGER = '5'
+
+# where the scanner's pulses come from: the keyboard through Qt (most trigger boxes type a 5), a trigger box read
+# straight from Linux's event devices, a serial trigger box, or a software pulse generator for trying out a run
+SOURCES = ['Keyboard', 'Evdev', 'Serial', 'Simulated']
+
+
+class PulseGenerator(inputdevices.InputDevice):
+    """
+    A software scanner for testing that sends a trigger every TR, going through the same thread and timestamps as a
+    real trigger box. The first pulse comes one TR after it starts
+    """
+
+    def __init__(self, tr=2.0):
+        super().__init__([TRIGGER])
+
+        # the repetition time in nanoseconds, and the raw time the next pulse is due
+        self.tr = int(tr * 1e9)
+        self.due = None
+
+    def open(self):
+
+        self.due = time.perf_counter_ns() + self.tr
+
+    def read(self):
+
+        wait = (self.due - time.perf_counter_ns()) / 1e9
+
+        # check whether it was stopped every so often while waiting for the next pulse
+        if wait > inputdevices.POLL:
+
+            time.sleep(inputdevices.POLL)
+
+            return
+
+        time.sleep(max(0, wait))
+        stamp = time.perf_counter_ns()
+
+        # keep the pulses on the TR grid, even if one of them was sent late
+        self.due += self.tr
+
+        self.deliver(TRIGGER, stamp)
+
+
+class ScannerSync(QObject):
+    """
+    Keeps the experiment in step with the scanner in fmri mode. Every pulse is timestamped when it is read and kept with
+    its run, its number in the run, and its time on the scanner's clock. Once the experimenter starts a run, the task
+    waits for the scanner and starts on the run's first pulse, which becomes time zero of the experiment clock, so every
+    onset in the output is already in scanner time
+    """
+
+    def __init__(self, person, source='Keyboard', path='', tr=2.0):
+        super().__init__()
+
+        # the participant class that keeps the pulses, and where they come from
+        self.person = person
+        self.source = source
+
+        # the run (counting from 1, 0 before the first one), the pulses in it, and the raw time of its first pulse and
+        # of the last pulse
+        self.run = 0
+        self.volumes = 0
+        self.runstart = None
+        self.laststamp = None
+
+        # what to do on the first pulse of a run (None if nothing is waiting for the scanner)
+        self.onstart = None
+
+        # the pulses that came in before the first run, which don't get kept
+        self.early = 0
+
+        # read the pulses from their own device in the background, unless they come through Qt
+        match source:
+
+            case 'Simulated':
+                self.device = PulseGenerator(tr)
+
+            case _:
+                self.device = inputdevices.make_device(source, path, [TRIGGER])
+
+        if self.device is not None:
+
+            self.device.pressed.connect(self.pulse)
+            self.device.start()
+            self.person.finished.append(self.device.stop)
+
+        self.person.finished.append(self.report)
+
+    def waiting(self):
+        """
+        :return: whether a run is waiting for its first pulse
+        """
+
+        return self.onstart is not None
+
+    def wait(self, onstart):
+        """
+        Waits for the next pulse and starts a new run on it
+        :param onstart: function that gets the raw perf_counter_ns time of the run's first pulse
+        """
+
+        self.onstart = onstart
+
+    def pulse(self, key, stamp):
+        """
+        Takes a pulse from the scanner, starting the run that is waiting for it (if there is one), and keeps it
+        :param key: string for the key the trigger sent
+        :param stamp: integer for the raw perf_counter_ns time the pulse was read
+        """
+
+        # start the run that was waiting for the scanner
+        if self.onstart is not None:
+
+            self.run += 1
+            self.volumes = 0
+            self.runstart = stamp
+            self.laststamp = None
+
+            onstart = self.onstart
+            self.onstart = None
+
+            onstart(stamp)
+
+        # the scanner may already be going before the first run (e.g., dummy scans)
+        if self.run == 0:
+
+            self.early += 1
+
+            return
+
+        self.volumes += 1
+
+        self.person.set_pulse({'run': self.run, 'volume': self.volumes,
+                               'scanner time': (stamp - self.runstart) / 1e9,
+                               'interval': None if self.laststamp is None else (stamp - self.laststamp) / 1e9})
+
+        self.laststamp = stamp
+
+    def report(self, person=None):
+        """
+        Logs how many runs and pulses there were and how steady the pulses came in
+        :param person: the participant class (so this can be one of its finished callbacks)
+        """
+
+        intervals = [pulse['interval'] for pulse in self.person.pulses if pulse['interval'] is not None]
+
+        logging.info('Scanner: ' + str(self.run) + ' runs, ' + str(len(self.person.pulses)) + ' pulses kept, ' +
+                     str(self.early) + ' before the first run')
+
+        if intervals:
+            logging.info('Scanner TR: mean ' + str(round(sum(intervals) / len(intervals), 4)) + ' s, range ' +
+                         str(round(min(intervals), 4)) + ' to ' + str(round(max(intervals), 4)) + ' s')
@@ -0,0 +1,92 @@
+from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import Qt
+
+import glob
+import logging
+import os
+import time
+
+
+class StimulusCache(object):
+    """
+    Holds the task pictures already read from disk and scaled to the size they are shown at, keyed by the path and the
+    size. The experiments preload everything they will show when they start, so putting a picture on screen during a
+    trial is just handing an existing pixmap to a label
+    """
+
+    def __init__(self):
+
+        # dictionary of pixmaps, with (path, width, height) tuples as keys
+        self.pixmaps = {}
+
+    def load(self, path, width=None, height=None):
+        """
+        Reads a picture and scales it the same way the experiments always have
+        :param path: string for the path to the picture
+        :param width: int for the width to scale to, or None to keep the original size
+        :param height: int for the height to scale to (keeping the aspect ratio), or None to only scale to the width
+        :return: the pixmap
+        """
+
+        pixmap = QPixmap(path)
+
+        # no width means the picture is used as is
+        if width is None:
+            return pixmap
+
+        # no height means the picture is scaled to the width
+        if height is None:
+            return pixmap.scaledToWidth(width, Qt.TransformationMode.SmoothTransformation)
+
+        return pixmap.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio)
+
+    def get(self, path, width=None, height=None):
+        """
+        Gets a picture at a certain size, loading it if it wasn't preloaded
+        :param path: string for the path to the picture
+        :param width: int for the width to scale to, or None to keep the original size
+        :param height: int for the height to scale to (keeping the aspect ratio), or None to only scale to the width
+        :return: the pixmap
+        """
+
+        key = (path, width, height)
+
+        if key not in self.pixmaps:
+            self.pixmaps[key] = self.load(path, width, height)
+
+        return self.pixmaps[key]
+
+    def preload(self, patterns, width=None, height=None, folder='Assets'):
+        """
+        Loads and scales every picture in a folder that matches the patterns and logs how long it took and how much
+        memory the cache is using
+        :param patterns: a list of file name patterns (e.g., ['EGNG_*.png'])
+        :param width: int for the width to scale to, or None to keep the original size
+        :param height: int for the height to scale to (keeping the aspect ratio), or None to only scale to the width
+        :param folder: string for the folder the pictures are in, written the same way the experiments write it
+        """
+
+        start = time.perf_counter()
+
+        # find the pictures and put them together with the folder the same way the experiments do
+        names = sorted(set(os.path.basename(path) for pattern in patterns
+                           for path in glob.glob(os.path.join(folder, pattern))))
+
+        for name in names:
+            self.get(folder + '/' + name, width, height)
+
+        logging.info('Preloaded ' + str(len(names)) + ' pictures (' + ', '.join(patterns) + ') in ' +
+                     str(round(time.perf_counter() - start, 3)) + ' s; the stimulus cache is using ' +
+                     str(round(self.get_memory() / 1e6, 1)) + ' MB')
+
+    def get_memory(self):
+        """
+        Adds up how much memory the cached pixmaps take
+        :return: int for the number of bytes
+        """
+
+        return sum(pixmap.width() * pixmap.height() * pixmap.depth() // 8 for pixmap in self.pixmaps.values())
+
+
+# one cache shared by every experiment window, so pictures loaded for one task are still there for the next
+stimuluscache = StimulusCache()
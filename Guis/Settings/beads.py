@@ -13,6 +13,9 @@ class BeadsSettings(settings.Settings):
 
         self.layout.addRow(QLabel('Number of trials:'), self.trialsin)
         self.layout.addRow(QLabel('Are you using an eyetracker?'), self.eyetrackingtoggle)
+        self.layout.addRow(QLabel('Where do the eyetracker\'s samples come from?'), self.trackersource)
+        self.layout.addRow(QLabel('Address the eyetracker streams to (host:port):'), self.trackerpath)
+        self.layout.addRow(QLabel('Eyetracker sampling rate (Hz):'), self.trackerrate)
         self.layout.addRow(QLabel('Enter the output directory:'), self.wd)
         self.layout.addRow(self.quitbutton, self.submit)
 
@@ -30,6 +33,6 @@ class BeadsSettings(settings.Settings):
                                          'Beads Task',
                                          self.eyetracking)
 
-        self.exp = beadsgui.BeadsExp(person)
+        self.exp = beadsgui.BeadsExp(person, **self.get_hardware())
         self.exp.show()
         self.hide()
@@ -38,6 +38,10 @@ class DdSettings(settings.Settings):
         self.lrewin.setRange(0, 100000000)
         self.lrewin.setValue(250)
 
+        # Dropdown box for the engine grid: the full grid, or a smaller one that is refined as the task goes on
+        self.grid = QComboBox()
+        self.grid.addItems(['Fixed', 'Adaptive'])
+
         # Make form layout for all the settingsguis
         self.layout.addRow(QLabel('Number of trials per block:'), self.trialsin)
         self.layout.addRow(QLabel('Number of blocks:'), self.blocksin)
@@ -46,9 +50,22 @@ class DdSettings(settings.Settings):
         self.layout.addRow(QLabel('Longest delay in delayed option (weeks):'), self.ldin)
         self.layout.addRow(QLabel('Smallest reward in immediate option:'), self.srewin)
         self.layout.addRow(QLabel('Biggest reward in delayed option:'), self.lrewin)
+        self.layout.addRow(QLabel('Engine grid:'), self.grid)
+        self.layout.addRow(QLabel('Engine precision:'), self.precision)
+        self.layout.addRow(QLabel('End the task early when the posterior settles:'), self.stoprule)
+        self.layout.addRow(QLabel('Stopping threshold (% of the prior):'), self.stopthreshold)
+        self.layout.addRow(QLabel('Start from the participant\'s last session?'), self.warmstart)
+        self.layout.addRow(QLabel('Weight of the last session (%):'), self.priorweight)
+        self.layout.addRow(QLabel('Save the posterior after every trial?'), self.snapshotformat)
         self.layout.addRow(QLabel('Are you using a button-box instead of the keyboard?'), self.buttontoggle)
         self.layout.addRow(QLabel('Are you using an eyetracker?'), self.eyetrackingtoggle)
+        self.layout.addRow(QLabel('Where do the eyetracker\'s samples come from?'), self.trackersource)
+        self.layout.addRow(QLabel('Address the eyetracker streams to (host:port):'), self.trackerpath)
+        self.layout.addRow(QLabel('Eyetracker sampling rate (Hz):'), self.trackerrate)
         self.layout.addRow(QLabel('Run in fMRI mode?'), self.fmritoggle)
+        self.layout.addRow(QLabel('Where do the scanner\'s pulses come from?'), self.triggersource)
+        self.layout.addRow(QLabel('Trigger device or serial port (e.g., /dev/input/event3 or COM3):'), self.triggerpath)
+        self.layout.addRow(QLabel('Repetition time of the simulated scanner (s):'), self.trin)
         self.layout.addRow(QLabel('Enter the output directory:'), self.wd)
         self.layout.addRow(self.quitbutton, self.submit)
 
@@ -71,9 +88,16 @@ class DdSettings(settings.Settings):
                                          self.blocksin.text(),
                                          self.buttonboxstate,
                                          self.eyetracking,
-                                         self.fmri)
-
-        self.exp = discountgui.DDiscountExp(person)
+                                         self.fmri,
+                                         self.grid.currentText(),
+                                         self.precision.currentText(),
+                                         self.stoprule.currentText(),
+                                         self.stopthreshold.text(),
+                                         self.warmstart.currentText(),
+                                         self.priorweight.text(),
+                                         self.snapshotformat.currentText())
+
+        self.exp = discountgui.DDiscountExp(person, **self.get_hardware())
         self.exp.show()
         self.hide()
 
@@ -106,11 +130,24 @@ class PdSettings(settings.Settings):
         self.layout.addRow(QLabel('Smallest amount of money:'), self.rewmin)
         self.layout.addRow(QLabel('Biggest amount of money:'), self.rewmax)
         self.layout.addRow(QLabel('What type of questions do you want?'), self.design)
+        self.layout.addRow(QLabel('Pick the designs with an adaptive engine?'), self.adaptive)
+        self.layout.addRow(QLabel('Engine precision:'), self.precision)
+        self.layout.addRow(QLabel('End the task early when the posterior settles:'), self.stoprule)
+        self.layout.addRow(QLabel('Stopping threshold (% of the prior):'), self.stopthreshold)
+        self.layout.addRow(QLabel('Start from the participant\'s last session?'), self.warmstart)
+        self.layout.addRow(QLabel('Weight of the last session (%):'), self.priorweight)
+        self.layout.addRow(QLabel('Save the posterior after every trial?'), self.snapshotformat)
         self.layout.addRow(QLabel('Do you want to have an outcome randomly chosen?'), self.outcometoggle)
         self.layout.addRow(QLabel('Participant starting money (only used if above is checked):'), self.smoneyin)
         self.layout.addRow(QLabel('Are you using a button-box instead of the keyboard?'), self.buttontoggle)
         self.layout.addRow(QLabel('Are you using an eyetracker?'), self.eyetrackingtoggle)
+        self.layout.addRow(QLabel('Where do the eyetracker\'s samples come from?'), self.trackersource)
+        self.layout.addRow(QLabel('Address the eyetracker streams to (host:port):'), self.trackerpath)
+        self.layout.addRow(QLabel('Eyetracker sampling rate (Hz):'), self.trackerrate)
         self.layout.addRow(QLabel('Run in fMRI mode?'), self.fmritoggle)
+        self.layout.addRow(QLabel('Where do the scanner\'s pulses come from?'), self.triggersource)
+        self.layout.addRow(QLabel('Trigger device or serial port (e.g., /dev/input/event3 or COM3):'), self.triggerpath)
+        self.layout.addRow(QLabel('Repetition time of the simulated scanner (s):'), self.trin)
         self.layout.addRow(QLabel('Enter the output directory:'), self.wd)
         self.layout.addRow(self.quitbutton, self.submit)
 
@@ -143,9 +180,16 @@ class PdSettings(settings.Settings):
                                              self.blocksin.text(),
                                              self.buttonboxstate,
                                              self.eyetracking,
-                                             self.fmri)
-
-            self.exp = discountgui.PDiscountExp(person)
+                                             self.fmri,
+                                             self.adaptive.currentText(),
+                                             self.precision.currentText(),
+                                             self.stoprule.currentText(),
+                                             self.stopthreshold.text(),
+                                             self.warmstart.currentText(),
+                                             self.priorweight.text(),
+                                             self.snapshotformat.currentText())
+
+            self.exp = discountgui.PDiscountExp(person, **self.get_hardware())
             self.exp.show()
             self.hide()
 
@@ -179,7 +223,13 @@ class CEDTSettings(settings.Settings):
         self.layout.addRow(QLabel('Would you like the original or alternate version?'), self.version)
         self.layout.addRow(QLabel('Are you using a button-box instead of the keyboard?'), self.buttontoggle)
         self.layout.addRow(QLabel('Are you using an eyetracker?'), self.eyetrackingtoggle)
+        self.layout.addRow(QLabel('Where do the eyetracker\'s samples come from?'), self.trackersource)
+        self.layout.addRow(QLabel('Address the eyetracker streams to (host:port):'), self.trackerpath)
+        self.layout.addRow(QLabel('Eyetracker sampling rate (Hz):'), self.trackerrate)
         self.layout.addRow(QLabel('Run in fMRI mode?'), self.fmritoggle)
+        self.layout.addRow(QLabel('Where do the scanner\'s pulses come from?'), self.triggersource)
+        self.layout.addRow(QLabel('Trigger device or serial port (e.g., /dev/input/event3 or COM3):'), self.triggerpath)
+        self.layout.addRow(QLabel('Repetition time of the simulated scanner (s):'), self.trin)
         self.layout.addRow(QLabel('Enter the output directory:'), self.wd)
         self.layout.addRow(self.quitbutton, self.submit)
 
@@ -209,7 +259,7 @@ class CEDTSettings(settings.Settings):
                                               self.eyetracking,
                                               self.fmri)
 
-            self.exp = discountgui.CEDiscountExp(person)
+            self.exp = discountgui.CEDiscountExp(person, **self.get_hardware())
             self.exp.show()
             self.hide()
 
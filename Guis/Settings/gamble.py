@@ -45,11 +45,23 @@ class ARTTSettings(settings.Settings):
         self.layout.addRow(QLabel('Fixed reward/loss magnitude:'), self.srewin)
         self.layout.addRow(QLabel('Largest reward/loss possible:'), self.lrewin)
         self.layout.addRow(QLabel('What type of questions do you want?'), self.design)
+        self.layout.addRow(QLabel('Engine precision:'), self.precision)
+        self.layout.addRow(QLabel('End the task early when the posterior settles:'), self.stoprule)
+        self.layout.addRow(QLabel('Stopping threshold (% of the prior):'), self.stopthreshold)
+        self.layout.addRow(QLabel('Start from the participant\'s last session?'), self.warmstart)
+        self.layout.addRow(QLabel('Weight of the last session (%):'), self.priorweight)
+        self.layout.addRow(QLabel('Save the posterior after every trial?'), self.snapshotformat)
         self.layout.addRow(QLabel('Do you want to have an outcome randomly chosen?'), self.outcometoggle)
         self.layout.addRow(QLabel('Participant starting money (only used if above is checked):'), self.smoneyin)
         self.layout.addRow(QLabel('Are you using a button-box instead of the keyboard?'), self.buttontoggle)
         self.layout.addRow(QLabel('Are you using an eyetracker?'), self.eyetrackingtoggle)
+        self.layout.addRow(QLabel('Where do the eyetracker\'s samples come from?'), self.trackersource)
+        self.layout.addRow(QLabel('Address the eyetracker streams to (host:port):'), self.trackerpath)
+        self.layout.addRow(QLabel('Eyetracker sampling rate (Hz):'), self.trackerrate)
         self.layout.addRow(QLabel('Run in fMRI mode?'), self.fmritoggle)
+        self.layout.addRow(QLabel('Where do the scanner\'s pulses come from?'), self.triggersource)
+        self.layout.addRow(QLabel('Trigger device or serial port (e.g., /dev/input/event3 or COM3):'), self.triggerpath)
+        self.layout.addRow(QLabel('Repetition time of the simulated scanner (s):'), self.trin)
         self.layout.addRow(QLabel('Enter the output directory:'), self.wd)
         self.layout.addRow(self.quitbutton, self.submit)
 
@@ -96,9 +108,15 @@ class ARTTSettings(settings.Settings):
                                              self.blocksin.text(),
                                              self.buttonboxstate,
                                              self.eyetracking,
-                                             self.fmri)
-
-            self.exp = gamblegui.ARTTExp(person)
+                                             self.fmri,
+                                             self.precision.currentText(),
+                                             self.stoprule.currentText(),
+                                             self.stopthreshold.text(),
+                                             self.warmstart.currentText(),
+                                             self.priorweight.text(),
+                                             self.snapshotformat.currentText())
+
+            self.exp = gamblegui.ARTTExp(person, **self.get_hardware())
             self.exp.show()
             self.hide()
 
@@ -126,11 +144,24 @@ class RASettings(settings.Settings):
         self.layout.addRow(QLabel('Number of blocks:'), self.blocksin)
         self.layout.addRow(QLabel('Smallest possible gain:'), self.minin)
         self.layout.addRow(QLabel('Largest possible gain:'), self.maxin)
+        self.layout.addRow(QLabel('Pick the designs with an adaptive engine?'), self.adaptive)
+        self.layout.addRow(QLabel('Engine precision:'), self.precision)
+        self.layout.addRow(QLabel('End the task early when the posterior settles:'), self.stoprule)
+        self.layout.addRow(QLabel('Stopping threshold (% of the prior):'), self.stopthreshold)
+        self.layout.addRow(QLabel('Start from the participant\'s last session?'), self.warmstart)
+        self.layout.addRow(QLabel('Weight of the last session (%):'), self.priorweight)
+        self.layout.addRow(QLabel('Save the posterior after every trial?'), self.snapshotformat)
         self.layout.addRow(QLabel('Do you want to have an outcome randomly chosen?'), self.outcometoggle)
         self.layout.addRow(QLabel('Participant starting money (only used if above is checked):'), self.smoneyin)
         self.layout.addRow(QLabel('Are you using a button-box instead of the keyboard?'), self.buttontoggle)
         self.layout.addRow(QLabel('Are you using an eyetracker?'), self.eyetrackingtoggle)
+        self.layout.addRow(QLabel('Where do the eyetracker\'s samples come from?'), self.trackersource)
+        self.layout.addRow(QLabel('Address the eyetracker streams to (host:port):'), self.trackerpath)
+        self.layout.addRow(QLabel('Eyetracker sampling rate (Hz):'), self.trackerrate)
         self.layout.addRow(QLabel('Run in fMRI mode?'), self.fmritoggle)
+        self.layout.addRow(QLabel('Where do the scanner\'s pulses come from?'), self.triggersource)
+        self.layout.addRow(QLabel('Trigger device or serial port (e.g., /dev/input/event3 or COM3):'), self.triggerpath)
+        self.layout.addRow(QLabel('Repetition time of the simulated scanner (s):'), self.trin)
         self.layout.addRow(QLabel('Enter the output directory:'), self.wd)
         self.layout.addRow(self.quitbutton, self.submit)
 
@@ -153,9 +184,16 @@ class RASettings(settings.Settings):
                                        self.blocksin.text(),
                                        self.buttonboxstate,
                                        self.eyetracking,
-                                       self.fmri)
-
-        self.exp = gamblegui.RAExp(person)
+                                       self.fmri,
+                                       self.adaptive.currentText(),
+                                       self.precision.currentText(),
+                                       self.stoprule.currentText(),
+                                       self.stopthreshold.text(),
+                                       self.warmstart.currentText(),
+                                       self.priorweight.text(),
+                                       self.snapshotformat.currentText())
+
+        self.exp = gamblegui.RAExp(person, **self.get_hardware())
         self.exp.show()
         self.hide()
 
@@ -186,11 +224,24 @@ class FrameSettings(settings.Settings):
         self.layout.addRow(QLabel('Maximum expected value:'), self.maxin)
         self.layout.addRow(QLabel('What type of questions do you want?'), self.design)
         self.layout.addRow(QLabel('Do you want FTT truncations (i.e., Gist, Mixed, Verbatim)?'), self.ftttoggle)
+        self.layout.addRow(QLabel('Pick the designs with an adaptive engine?'), self.adaptive)
+        self.layout.addRow(QLabel('Engine precision:'), self.precision)
+        self.layout.addRow(QLabel('End the task early when the posterior settles:'), self.stoprule)
+        self.layout.addRow(QLabel('Stopping threshold (% of the prior):'), self.stopthreshold)
+        self.layout.addRow(QLabel('Start from the participant\'s last session?'), self.warmstart)
+        self.layout.addRow(QLabel('Weight of the last session (%):'), self.priorweight)
+        self.layout.addRow(QLabel('Save the posterior after every trial?'), self.snapshotformat)
         self.layout.addRow(QLabel('Do you want to have an outcome randomly chosen?'), self.outcometoggle)
         self.layout.addRow(QLabel('Participant starting money (only used if above is checked):'), self.smoneyin)
         self.layout.addRow(QLabel('Are you using a button-box instead of the keyboard?'), self.buttontoggle)
         self.layout.addRow(QLabel('Are you using an eyetracker?'), self.eyetrackingtoggle)
+        self.layout.addRow(QLabel('Where do the eyetracker\'s samples come from?'), self.trackersource)
+        self.layout.addRow(QLabel('Address the eyetracker streams to (host:port):'), self.trackerpath)
+        self.layout.addRow(QLabel('Eyetracker sampling rate (Hz):'), self.trackerrate)
         self.layout.addRow(QLabel('Run in fMRI mode?'), self.fmritoggle)
+        self.layout.addRow(QLabel('Where do the scanner\'s pulses come from?'), self.triggersource)
+        self.layout.addRow(QLabel('Trigger device or serial port (e.g., /dev/input/event3 or COM3):'), self.triggerpath)
+        self.layout.addRow(QLabel('Repetition time of the simulated scanner (s):'), self.trin)
         self.layout.addRow(QLabel('Enter the output directory:'), self.wd)
         self.layout.addRow(self.quitbutton, self.submit)
 
@@ -233,8 +284,15 @@ class FrameSettings(settings.Settings):
                                               self.blocksin.text(),
                                               self.buttonboxstate,
                                               self.eyetracking,
-                                              self.fmri)
-
-            self.exp = gamblegui.FrameExp(person)
+                                              self.fmri,
+                                              self.adaptive.currentText(),
+                                              self.precision.currentText(),
+                                              self.stoprule.currentText(),
+                                              self.stopthreshold.text(),
+                                              self.warmstart.currentText(),
+                                              self.priorweight.text(),
+                                              self.snapshotformat.currentText())
+
+            self.exp = gamblegui.FrameExp(person, **self.get_hardware())
             self.exp.show()
             self.hide()
@@ -21,6 +21,9 @@ class PrSettings(settings.Settings):
         self.layout.addRow(QLabel('Number of study-test trials:'), self.trialsin)
         self.layout.addRow(QLabel('Do you want an STT trial?'), self.stttoggle)
         self.layout.addRow(QLabel('Are you using an eyetracker?'), self.eyetrackingtoggle)
+        self.layout.addRow(QLabel('Where do the eyetracker\'s samples come from?'), self.trackersource)
+        self.layout.addRow(QLabel('Address the eyetracker streams to (host:port):'), self.trackerpath)
+        self.layout.addRow(QLabel('Eyetracker sampling rate (Hz):'), self.trackerrate)
         self.layout.addRow(QLabel('Enter the output directory:'), self.wd)
         self.layout.addRow(self.quitbutton, self.submit)
 
@@ -40,7 +43,7 @@ class PrSettings(settings.Settings):
                                        self.stt,
                                        self.eyetracking)
 
-        self.exp = memorygui.PrExp(person)
+        self.exp = memorygui.PrExp(person, **self.get_hardware())
         self.exp.show()
         self.hide()
 
@@ -61,6 +64,9 @@ class NBackSettings(settings.Settings):
         self.layout.addRow(QLabel('Type of n-Back:'), self.design)
         self.layout.addRow(QLabel('Are you using a button-box instead of the keyboard?'), self.buttontoggle)
         self.layout.addRow(QLabel('Are you using an eyetracker?'), self.eyetrackingtoggle)
+        self.layout.addRow(QLabel('Where do the eyetracker\'s samples come from?'), self.trackersource)
+        self.layout.addRow(QLabel('Address the eyetracker streams to (host:port):'), self.trackerpath)
+        self.layout.addRow(QLabel('Eyetracker sampling rate (Hz):'), self.trackerrate)
         self.layout.addRow(QLabel('Enter the output directory:'), self.wd)
         self.layout.addRow(self.quitbutton, self.submit)
 
@@ -84,6 +90,6 @@ class NBackSettings(settings.Settings):
                                        self.buttonboxstate,
                                        self.eyetracking)
 
-        self.exp = memorygui.NbExp(person)
+        self.exp = memorygui.NbExp(person, **self.get_hardware())
         self.exp.show()
         self.hide()
@@ -33,6 +33,11 @@ class NACTSettings(settings.Settings):
         self.layout.addRow(QLabel('Minimum money a participants could have at the end:'), self.minmoneyin)
         self.layout.addRow(QLabel('Are you using a button-box instead of the keyboard?'), self.buttontoggle)
         self.layout.addRow(QLabel('Are you using an eyetracker?'), self.eyetrackingtoggle)
+        self.layout.addRow(QLabel('Where do the eyetracker\'s samples come from?'), self.trackersource)
+        self.layout.addRow(QLabel('Address the eyetracker streams to (host:port):'), self.trackerpath)
+        self.layout.addRow(QLabel('Eyetracker sampling rate (Hz):'), self.trackerrate)
+        self.layout.addRow(QLabel('Where do the responses come from?'), self.inputdevice)
+        self.layout.addRow(QLabel('Event device or serial port (e.g., /dev/input/event3 or COM3):'), self.inputpath)
         self.layout.addRow(QLabel('Enter the output directory:'), self.wd)
         self.layout.addRow(self.quitbutton, self.submit)
 
@@ -58,7 +63,7 @@ class NACTSettings(settings.Settings):
                                            self.buttonboxstate,
                                            self.eyetracking)
 
-            self.exp = nactgui.NACTExp(person)
+            self.exp = nactgui.NACTExp(person, **self.get_hardware())
             self.exp.show()
             self.hide()
 
@@ -22,6 +22,13 @@ class SSSettings(settings.Settings):
         self.layout.addRow(QLabel('Number of blocks:'), self.blocksin)
         self.layout.addRow(QLabel('Are you using a button-box instead of the keyboard?'), self.buttontoggle)
         self.layout.addRow(QLabel('Are you using an eyetracker?'), self.eyetrackingtoggle)
+        self.layout.addRow(QLabel('Where do the eyetracker\'s samples come from?'), self.trackersource)
+        self.layout.addRow(QLabel('Address the eyetracker streams to (host:port):'), self.trackerpath)
+        self.layout.addRow(QLabel('Eyetracker sampling rate (Hz):'), self.trackerrate)
+        self.layout.addRow(QLabel('Draw the stimuli with OpenGL on the screen refresh (measures durations)?'),
+                           self.presentertoggle)
+        self.layout.addRow(QLabel('Where do the responses come from?'), self.inputdevice)
+        self.layout.addRow(QLabel('Event device or serial port (e.g., /dev/input/event3 or COM3):'), self.inputpath)
         self.layout.addRow(QLabel('Enter the output directory:'), self.wd)
         self.layout.addRow(self.quitbutton, self.submit)
 
@@ -42,7 +49,7 @@ class SSSettings(settings.Settings):
                                          self.buttonboxstate,
                                          self.eyetracking)
 
-        self.exp = reactiongui.SSExp(person)
+        self.exp = reactiongui.SSExp(person, **self.get_hardware())
         self.exp.show()
         self.hide()
 
@@ -95,6 +102,10 @@ class EGNGSettings(settings.Settings):
         self.layout.addRow(QLabel('Number of blocks:'), self.blocksin)
         self.layout.addRow(QLabel('Which faces would you like to include?'), facelayout)
         self.layout.addRow(QLabel('Are you using a button-box instead of the keyboard?'), self.buttontoggle)
+        self.layout.addRow(QLabel('Draw the stimuli with OpenGL on the screen refresh (measures durations)?'),
+                           self.presentertoggle)
+        self.layout.addRow(QLabel('Where do the responses come from?'), self.inputdevice)
+        self.layout.addRow(QLabel('Event device or serial port (e.g., /dev/input/event3 or COM3):'), self.inputpath)
         self.layout.addRow(QLabel('Enter the output directory:'), self.wd)
         self.layout.addRow(self.quitbutton, self.submit)
 
@@ -122,7 +133,7 @@ class EGNGSettings(settings.Settings):
                                                    self.buttonboxstate,
                                                    self.eyetracking)
 
-                self.exp = reactiongui.EGNGExp(person)
+                self.exp = reactiongui.EGNGExp(person, **self.get_hardware())
                 self.exp.show()
                 self.hide()
 
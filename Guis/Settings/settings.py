@@ -1,8 +1,12 @@
 from PyQt6.QtWidgets import QWidget, QApplication, QLabel, QPushButton, QSpinBox, QLineEdit, QVBoxLayout, QDialog, \
-    QCheckBox, QFormLayout
+    QCheckBox, QFormLayout, QComboBox, QDoubleSpinBox
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont
 
+from Participants import engineoptions
+
+from Guis.Experiments import inputdevices, scanner, eyetracker
+
 from os import path
 
 
@@ -171,6 +175,7 @@ class Settings(QWidget):
         self.outcome = 'No'
         self.eyetracking = 'No'
         self.fmri = 'No'
+        self.presenter = 'No'
         self.ftt = 'No'
         self.stt = 'No'
         self.happy = 'No'
@@ -232,6 +237,39 @@ class Settings(QWidget):
         self.fmritoggle = QCheckBox()
         self.fmritoggle.stateChanged.connect(self.clickbox)
 
+        # checkbox for drawing the stimuli with the OpenGL frame presenter
+        self.presentertoggle = QCheckBox()
+        self.presentertoggle.stateChanged.connect(self.clickbox)
+
+        # Dropdown box for where the responses come from, and the device or port to read them from
+        self.inputdevice = QComboBox()
+        self.inputdevice.addItems(inputdevices.DEVICES)
+
+        self.inputpath = QLineEdit()
+
+        # Dropdown box for where the scanner's pulses come from in fmri mode, the trigger box's device or port, and the
+        # repetition time for the pulse generator
+        self.triggersource = QComboBox()
+        self.triggersource.addItems(scanner.SOURCES)
+
+        self.triggerpath = QLineEdit()
+
+        self.trin = QDoubleSpinBox()
+        self.trin.setRange(.1, 10)
+        self.trin.setSingleStep(.1)
+        self.trin.setValue(2)
+
+        # Dropdown box for where the eyetracker's samples come from, where a UDP tracker streams to, and its sampling
+        # rate
+        self.trackersource = QComboBox()
+        self.trackersource.addItems(eyetracker.SOURCES)
+
+        self.trackerpath = QLineEdit()
+
+        self.trackerrate = QSpinBox()
+        self.trackerrate.setRange(30, 2000)
+        self.trackerrate.setValue(1000)
+
         # FTT checkbox for framing task
         self.ftttoggle = QCheckBox()
         self.ftttoggle.stateChanged.connect(self.clickbox)
@@ -244,6 +282,35 @@ class Settings(QWidget):
         self.outcometoggle = QCheckBox()
         self.outcometoggle.stateChanged.connect(self.clickbox)
 
+        # Options for the tasks with an ADOPy engine
+        # Dropdown box for picking the designs with an engine instead of at random (PD, RA, and framing)
+        self.adaptive = QComboBox()
+        self.adaptive.addItems(['No', 'Yes'])
+
+        # Dropdown box for the precision of the engine: single precision is faster, double is there to check it against
+        self.precision = QComboBox()
+        self.precision.addItems(['Single', 'Double'])
+
+        # Dropdown box for the stopping rule, and its threshold as a percent of the prior
+        self.stoprule = QComboBox()
+        self.stoprule.addItems(engineoptions.STOPRULES)
+
+        self.stopthreshold = QSpinBox()
+        self.stopthreshold.setRange(1, 100)
+        self.stopthreshold.setValue(10)
+
+        # Dropdown box for starting from the posterior of the participant's last session, and how much of it to keep
+        self.warmstart = QComboBox()
+        self.warmstart.addItems(['No', 'Yes'])
+
+        self.priorweight = QSpinBox()
+        self.priorweight.setRange(1, 100)
+        self.priorweight.setValue(engineoptions.WEIGHT)
+
+        # Dropdown box for keeping the whole posterior after every trial in a file next to the output
+        self.snapshotformat = QComboBox()
+        self.snapshotformat.addItems(engineoptions.FORMATS)
+
         # Submit button
         self.submit = QPushButton('Submit')
         self.submit.clicked.connect(self.checksettings)
@@ -311,6 +378,11 @@ class Settings(QWidget):
         else:
             self.fmri = 'No'
 
+        if self.presentertoggle.isChecked():
+            self.presenter = 'Yes'
+        else:
+            self.presenter = 'No'
+
         if self.ftttoggle.isChecked():
             self.ftt = 'Yes'
         else:
@@ -351,6 +423,7 @@ class Settings(QWidget):
                 self.fileerrordialog()
 
             else:
+
                 self.submitsettings()
 
         else:
@@ -387,6 +460,18 @@ class Settings(QWidget):
 
         error.exec()
 
+    def get_hardware(self):
+        """
+        :return: dictionary of the hardware the experiment window runs with (how it draws, and where the responses, the
+        scanner's pulses, and the eyetracker's samples come from), to pass to the window when submitsettings makes it
+        """
+
+        return {'presenter': self.presenter, 'inputdevice': self.inputdevice.currentText(),
+                'inputpath': self.inputpath.text(), 'triggersource': self.triggersource.currentText(),
+                'triggerpath': self.triggerpath.text(), 'tr': self.trin.value(),
+                'trackersource': self.trackersource.currentText(), 'trackerpath': self.trackerpath.text(),
+                'trackerrate': self.trackerrate.value()}
+
     def submitsettings(self):
         """
         This function activates if you hit submit on a settings window and both the directory is valid and a file
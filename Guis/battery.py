@@ -0,0 +1,320 @@
+from PyQt6.QtCore import QTimer
+
+from adopy.tasks.dd import TaskDD
+from adopy.tasks.cra import TaskCRA
+
+from Participants import beadsp, discountp, gamblep, memoryp, nactp, pbtp, reactionp
+
+from Guis.Experiments import beadsgui, discountgui, gamblegui, memorygui, nactgui, pbtgui, reactiongui
+
+from concurrent.futures import ThreadPoolExecutor
+
+import json
+import logging
+import os
+import time
+
+# the settings every task in a battery gets unless the battery file says otherwise (the same defaults as the settings
+# windows)
+DEFAULTS = {'expid': '9999', 'session': 'Pretest', 'trials': '5', 'blocks': '1', 'buttonbox': 'No', 'eyetracking': 'No',
+            'fmri': 'No', 'outcome': 'No', 'money': '25', 'presenter': 'No', 'inputdevice': 'Keyboard', 'inputpath': '',
+            'triggersource': 'Keyboard', 'triggerpath': '', 'tr': '2', 'trackersource': 'Simulated', 'trackerpath': '',
+            'trackerrate': '1000'}
+
+# how long (in milliseconds) the end of a task stays on screen before the next task's window comes up
+PAUSE = 3000
+
+# for each task: how to make the participant class from a battery entry, and the experiment window that runs it. The
+# settings are named after the settings window inputs and default to the same values
+TASKS = {
+    'DD': {
+        'make': lambda c: discountp.DdParticipant(c['expid'], c['trials'], c['session'], c['outdir'], TaskDD(),
+                                                  c.get('ss_del', '0'), c.get('ll_shortdel', '1'),
+                                                  c.get('ll_longdel', '52'), c.get('ss_smallrew', '1'),
+                                                  c.get('ll_rew', '250'), c['blocks'], c['buttonbox'], c['eyetracking'],
+                                                  c['fmri'], c.get('grid', 'Fixed'), c.get('precision', 'Single'),
+                                                  c.get('stoprule', 'None'), c.get('stopthreshold', '10'),
+                                                  c.get('warmstart', 'No'), c.get('priorweight', '50'),
+                                                  c.get('snapshots', 'No')),
+        'experiment': discountgui.DDiscountExp
+    },
+    'PD': {
+        'make': lambda c: discountp.PdParticipant(c['expid'], c['trials'], c['session'], c['outdir'],
+                                                  'Probability Discounting', c.get('design', 'Gains only'),
+                                                  c.get('rewmin', '1'), c.get('rewmax', '250'), c['outcome'],
+                                                  c['money'], c['blocks'], c['buttonbox'], c['eyetracking'],
+                                                  c['fmri'], c.get('adaptive', 'No'),
+                                                  c.get('precision', 'Single'), c.get('stoprule', 'None'),
+                                                  c.get('stopthreshold', '10'), c.get('warmstart', 'No'),
+                                                  c.get('priorweight', '50'), c.get('snapshots', 'No')),
+        'experiment': discountgui.PDiscountExp
+    },
+    'CEDT': {
+        'make': lambda c: discountp.CEDParticipant(c['expid'], c['trials'], c['session'], c['outdir'], 'CogED Task',
+                                                   c.get('maxrew', '5'), c['outcome'], c.get('names', 'a, e, i, u'),
+                                                   c.get('version', 'Original'), c['blocks'], c['buttonbox'],
+                                                   c['eyetracking'], c['fmri']),
+        'experiment': discountgui.CEDiscountExp
+    },
+    'ARTT': {
+        'make': lambda c: gamblep.ARTTParticipant(c['expid'], c['trials'], c['session'], c['outdir'], TaskCRA(),
+                                                  c.get('risklist', [.13, .25, .38, .5, .62, .75, .87]),
+                                                  c.get('amblist', [.25, .5, .75]), c.get('rewmin', '5'),
+                                                  c.get('rewmax', '50'), c.get('design', 'Gains only'),
+                                                  c['outcome'], c['money'], c['blocks'], c['buttonbox'],
+                                                  c['eyetracking'], c['fmri'], c.get('precision', 'Single'),
+                                                  c.get('stoprule', 'None'), c.get('stopthreshold', '10'),
+                                                  c.get('warmstart', 'No'), c.get('priorweight', '50'),
+                                                  c.get('snapshots', 'No')),
+        'experiment': gamblegui.ARTTExp
+    },
+    'RA': {
+        'make': lambda c: gamblep.RAParticipant(c['expid'], c['trials'], c['session'], c['outdir'], 'Risk Aversion',
+                                                c.get('minimum', '1'), c.get('maximum', '30'), c['outcome'],
+                                                c['money'], c['blocks'], c['buttonbox'], c['eyetracking'], c['fmri'],
+                                                c.get('adaptive', 'No'),
+                                                c.get('precision', 'Single'), c.get('stoprule', 'None'),
+                                                c.get('stopthreshold', '10'), c.get('warmstart', 'No'),
+                                                c.get('priorweight', '50'), c.get('snapshots', 'No')),
+        'experiment': gamblegui.RAExp
+    },
+    'Framing': {
+        'make': lambda c: gamblep.FrameParticipant(c['expid'], c['trials'], c['session'], c['outdir'], 'Framing Task',
+                                                   c.get('minimum', '1'), c.get('maximum', '50'),
+                                                   c.get('design', 'Gains only'), c.get('ftt', 'No'), c['outcome'],
+                                                   c['money'], c['blocks'], c['buttonbox'], c['eyetracking'],
+                                                   c['fmri'], c.get('adaptive', 'No'),
+                                                   c.get('precision', 'Single'), c.get('stoprule', 'None'),
+                                                   c.get('stopthreshold', '10'), c.get('warmstart', 'No'),
+                                                   c.get('priorweight', '50'), c.get('snapshots', 'No')),
+        'experiment': gamblegui.FrameExp
+    },
+    'Beads': {
+        'make': lambda c: beadsp.BeadsParticipant(c['expid'], c['trials'], c['session'], c['outdir'], 'Beads Task',
+                                                  c['eyetracking']),
+        'experiment': beadsgui.BeadsExp
+    },
+    'PBT': {
+        'make': lambda c: pbtp.PBTParticipant(c['expid'], c['trials'], c['session'], c['outdir'],
+                                              'Perceptual Bias Task', c['blocks'], c['buttonbox'], c['eyetracking']),
+        'experiment': pbtgui.PBTExp
+    },
+    'NACT': {
+        'make': lambda c: nactp.NACTParticipant(c['expid'], c['session'], c['outdir'],
+                                                'Negative Attention Capture Task', int(c.get('hightrials', '120')),
+                                                int(c.get('lowtrials', '120')), c['money'], c['buttonbox'],
+                                                c['eyetracking']),
+        'experiment': nactgui.NACTExp
+    },
+    'SS': {
+        'make': lambda c: reactionp.SSParticipant(c['expid'], c['trials'], c['session'], c['outdir'],
+                                                  'Stop-Signal Task', c.get('maxrt', '1500'), c['blocks'],
+                                                  c['buttonbox'], c['eyetracking']),
+        'experiment': reactiongui.SSExp
+    },
+    'EGNG': {
+        'make': lambda c: reactionp.EGNGParticipant(c['expid'], c['trials'], c['session'], c['outdir'], 'Emo Go/No-Go',
+                                                    c['blocks'], c.get('happy', 'Yes'), c.get('sad', 'Yes'),
+                                                    c.get('angry', 'Yes'), c.get('fear', 'Yes'), c['buttonbox'],
+                                                    c['eyetracking']),
+        'experiment': reactiongui.EGNGExp
+    },
+    'PR': {
+        'make': lambda c: memoryp.PrParticipant(c['expid'], c.get('pairs', '30'), c['session'], c['outdir'],
+                                                'Pair Recall Memory', c['trials'], c.get('stt', 'No'),
+                                                c['eyetracking']),
+        'experiment': memorygui.PrExp
+    },
+    'NB': {
+        'make': lambda c: memoryp.NbParticipant(c['expid'], c['trials'], c['session'], c['outdir'],
+                                                c.get('design', '1-back'), c['blocks'], c['buttonbox'],
+                                                c['eyetracking']),
+        'experiment': memorygui.NbExp
+    }
+}
+
+
+def load_battery(path):
+    """
+    Reads a battery file. The file is a JSON object with a list of tasks under 'tasks', in the order they are run. Each
+    task is an object with a 'task' (a key of TASKS) and any settings for that task; settings outside of the task list
+    (e.g., 'expid', 'session', and 'outdir') are used for every task that doesn't set them itself. For example:
+    {"expid": "101", "outdir": "C:/data", "tasks": [{"task": "DD", "trials": 10, "grid": "Adaptive"}, {"task": "SS"}]}
+    :param path: string for the path to the battery file
+    :return: a list of dictionaries, one with the full settings of each task
+    """
+
+    with open(path, encoding='utf-8') as file:
+        battery = json.load(file)
+
+    shared = {name: value for name, value in battery.items() if name != 'tasks'}
+
+    return [get_config(entry, shared) for entry in battery.get('tasks', [])]
+
+
+def get_config(entry, shared=None):
+    """
+    Fills in the settings of one task in a battery and checks that it can be run
+    :param entry: dictionary with the task and the settings given for it
+    :param shared: dictionary of the settings given for every task
+    :return: dictionary of the task's settings, with numbers turned into strings the way the settings windows give them
+    """
+
+    config = {**DEFAULTS, **(shared or {}), **entry}
+
+    if config.get('task') not in TASKS:
+        raise ValueError('The battery has a task that can\'t be run: ' + str(config.get('task')) + '. The tasks that '
+                         'can be in a battery are ' + ', '.join(TASKS) + '.')
+
+    if not os.path.isdir(str(config.get('outdir'))):
+        raise ValueError('The output directory for ' + config['task'] + ' isn\'t a directory: ' +
+                         str(config.get('outdir')))
+
+    # the participant classes get their settings as text from the settings windows
+    return {name: str(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else value
+            for name, value in config.items()}
+
+
+class Battery(object):
+    """
+    Runs a list of tasks one after the other in the same application. While a task is running, the participant class of
+    the next task (which for the ADOPy tasks includes building the engine) is made in a background thread, so that when
+    a task ends the next one only has to put its window up. The pictures stay in the shared stimulus cache between
+    tasks, so a task that shows pictures already used in the battery doesn't load them again
+    """
+
+    def __init__(self, configs, pause=PAUSE):
+
+        # the settings of each task, in order, and the task that is running
+        self.configs = configs
+        self.index = -1
+
+        # how long the end of a task stays on screen
+        self.pause = pause
+
+        # the experiment window that is up
+        self.exp = None
+
+        # the participant classes change to the output directory when they write their output, but the experiments load
+        # their pictures from the folder the program started in, so go back to it before every task
+        self.cwd = os.getcwd()
+
+        # one background thread for making the participant classes, and the one being made for the next task
+        self.builder = ThreadPoolExecutor(max_workers=1)
+        self.upcoming = None
+
+    def start(self):
+        """
+        Starts making the first task's participant class and puts its window up
+        """
+
+        logging.info('Starting a battery of ' + str(len(self.configs)) + ' tasks: ' +
+                     ', '.join(config['task'] for config in self.configs))
+
+        self.upcoming = self.build(0)
+        self.advance()
+
+    def build(self, index):
+        """
+        Starts making a task's participant class in the background thread
+        :param index: integer for the position of the task in the battery
+        :return: a future that gives the participant class, or None if there are no more tasks
+        """
+
+        if index >= len(self.configs):
+            return None
+
+        config = self.configs[index]
+
+        return self.builder.submit(self.make, config)
+
+    def make(self, config):
+        """
+        Makes a task's participant class (runs in the background thread) and logs how long it took
+        :param config: dictionary of the task's settings
+        :return: the participant class
+        """
+
+        start = time.perf_counter()
+
+        person = TASKS[config['task']]['make'](config)
+
+        logging.info('Made the participant class for ' + config['task'] + ' in the background in ' +
+                     str(round(time.perf_counter() - start, 3)) + ' s')
+
+        return person
+
+    def advance(self):
+        """
+        Moves to the next task: gets its participant class (waiting only if it isn't made yet), puts its window up in
+        place of the last task's window, and starts making the participant class for the task after it
+        """
+
+        self.index += 1
+
+        # once every task is done, leave the last task's window up
+        if self.index >= len(self.configs):
+
+            logging.info('Battery complete')
+            self.builder.shutdown(wait=False)
+
+            return
+
+        config = self.configs[self.index]
+        start = time.perf_counter()
+
+        try:
+            person = self.upcoming.result()
+
+        # if the task can't be made, log it and go on to the next task
+        except Exception as err:
+
+            logging.exception(err, exc_info=True)
+            logging.info('Skipping ' + config['task'] + ' in the battery because its participant class could not be '
+                         'made')
+
+            self.upcoming = self.build(self.index + 1)
+            self.advance()
+
+            return
+
+        waited = time.perf_counter() - start
+
+        # start making the next task's participant class now, so it is made while this task runs
+        self.upcoming = self.build(self.index + 1)
+
+        # move on once this task writes its output
+        person.finished.append(self.taskdone)
+
+        # the experiments load their pictures relative to where the program started
+        os.chdir(self.cwd)
+
+        # put the new window up and then take the old one down, so there's never a moment without a window
+        last = self.exp
+        self.exp = TASKS[config['task']]['experiment'](person, presenter=config['presenter'],
+                                                       inputdevice=config['inputdevice'],
+                                                       inputpath=config['inputpath'],
+                                                       triggersource=config['triggersource'],
+                                                       triggerpath=config['triggerpath'], tr=float(config['tr']),
+                                                       trackersource=config['trackersource'],
+                                                       trackerpath=config['trackerpath'],
+                                                       trackerrate=int(config['trackerrate']))
+        self.exp.show()
+
+        if last is not None:
+
+            last.close()
+            last.deleteLater()
+
+        logging.info('Battery task ' + str(self.index + 1) + ' of ' + str(len(self.configs)) + ' (' + config['task'] +
+                     ') up in ' + str(round(time.perf_counter() - start, 3)) + ' s, ' + str(round(waited, 3)) +
+                     ' s of which was waiting on its participant class')
+
+    def taskdone(self, person):
+        """
+        Called by the participant class once its output is written. Leaves the end of the task on screen for a moment
+        and then moves to the next task
+        :param person: the participant class of the task that ended
+        """
+
+        QTimer.singleShot(int(self.configs[self.index].get('pause', self.pause)), self.advance)
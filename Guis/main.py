@@ -1,8 +1,39 @@
-from PyQt6.QtWidgets import QWidget, QApplication, QLabel, QPushButton, QGridLayout, QVBoxLayout, QGroupBox
+from PyQt6.QtWidgets import QWidget, QApplication, QLabel, QPushButton, QGridLayout, QVBoxLayout, QGroupBox, \
+    QFileDialog
 from PyQt6.QtGui import QFont
 from PyQt6.QtCore import Qt
 
-from Guis.Settings import discount, memory, reaction, beads, pbt, nact, gamble
+import importlib
+import logging
+import sys
+import time
+
+# when this module was imported, so the startup report can say how long it took to get the selection window up
+STARTED = time.perf_counter()
+
+# the libraries that the task stacks pull in, in the order they get imported for the report. The settings modules (and
+# the participant and experiment modules they import) only get loaded when their button is clicked, so the selection
+# window comes up with just PyQt loaded
+LIBRARIES = ['numpy', 'pandas', 'xlsxwriter']
+ADOPYLIBRARIES = LIBRARIES + ['scipy', 'adopy']
+
+# for each button: the settings module, the settings window class, the task string it gets, and the libraries it needs
+TASKS = {
+    'DD': ('discount', 'DdSettings', 'DD', ADOPYLIBRARIES),
+    'PD': ('discount', 'PdSettings', 'PD', ADOPYLIBRARIES),
+    'CEDT': ('discount', 'CEDTSettings', 'CEDT', ADOPYLIBRARIES),
+    'ARTT': ('gamble', 'ARTTSettings', 'ARTT', ADOPYLIBRARIES),
+    'RA': ('gamble', 'RASettings', 'RA', ADOPYLIBRARIES),
+    'Framing': ('gamble', 'FrameSettings', 'Framing', ADOPYLIBRARIES),
+    'Beads': ('beads', 'BeadsSettings', 'Beads', LIBRARIES),
+    'PBT': ('pbt', 'PBTSettings', 'PBT', LIBRARIES),
+    'NACT': ('nact', 'NACTSettings', 'NACT', LIBRARIES),
+    'SS': ('reaction', 'SSSettings', 'SS', LIBRARIES),
+    'PR': ('memory', 'PrSettings', 'PR', LIBRARIES),
+    'NB': ('memory', 'NBackSettings', '1-back', LIBRARIES),
+    'EGNG': ('reaction', 'EGNGSettings', 'EGNG', LIBRARIES),
+    'GNG': ('reaction', 'GNGSettings', 'GNG', LIBRARIES)
+}
 
 
 class SelectWindow(QWidget):
@@ -130,6 +161,12 @@ class SelectWindow(QWidget):
         self.nbackbutton.setFont(QFont('Helvetica', 15))
         self.nbackbutton.clicked.connect(lambda: self.selection('NB'))
 
+        # Battery button, which runs a list of tasks from a battery file one after the other
+        self.batterybutton = QPushButton('Battery (from file)')
+        self.batterybutton.setFixedHeight(50)
+        self.batterybutton.setFont(QFont('Helvetica', 15))
+        self.batterybutton.clicked.connect(self.battery)
+
         # Quit button
         self.quitbutton = QPushButton('Quit')
         self.quitbutton.setFont(QFont('Helvetica', 15))
@@ -186,6 +223,7 @@ class SelectWindow(QWidget):
         memorylayout.addWidget(self.nbackbutton, 0, 1)
 
         misclayout.addWidget(self.beadsbutton, 0, 0)
+        misclayout.addWidget(self.batterybutton, 0, 1)
 
         # add the boxes and the quit button to the main layout
         mainlayout.addWidget(riskbox)
@@ -218,60 +256,112 @@ class SelectWindow(QWidget):
         :return: Hides the selection window and opens up the corresponding settingsguis window
         """
 
-        match choice:
+        # if the button isn't a task that is set up, show the panic label
+        if choice not in TASKS:
+            self.w = QLabel('Panic')
 
-            case str('DD'):
-                self.w = discount.DdSettings('DD')
+        else:
 
-            case str('PD'):
-                self.w = discount.PdSettings('PD')
+            modulename, classname, task, libraries = TASKS[choice]
 
-            case str('CEDT'):
-                self.w = discount.CEDTSettings('CEDT')
+            # import the task's stack now (this is where the cold start cost of the task is paid)
+            module = loadstack('Guis.Settings.' + modulename, libraries)
 
-            case str('ARTT'):
-                self.w = gamble.ARTTSettings('ARTT')
+            self.w = getattr(module, classname)(task)
 
-            case str('RA'):
-                self.w = gamble.RASettings('RA')
+        self.w.show()
+        self.hide()
 
-            case str('Framing'):
-                self.w = gamble.FrameSettings('Framing')
+    def battery(self):
+        """
+        Asks for a battery file and runs its tasks one after the other in this application
+        """
 
-            case str('Beads'):
-                self.w = beads.BeadsSettings('Beads')
+        path = QFileDialog.getOpenFileName(self, 'Open a battery file', '', 'Battery files (*.json)')[0]
 
-            case str('PBT'):
-                self.w = pbt.PBTSettings('PBT')
+        # the user closed the dialog without picking a file
+        if not path:
+            return
 
-            case str('NACT'):
-                self.w = nact.NACTSettings('NACT')
+        try:
 
-            case str('SS'):
-                self.w = reaction.SSSettings('SS')
+            # the battery can run any task, so it needs the whole stack
+            module = loadstack('Guis.battery', ADOPYLIBRARIES)
 
-            case str('PR'):
-                self.w = memory.PrSettings('PR')
+            self.w = module.Battery(module.load_battery(path))
 
-            case str('NB'):
-                self.w = memory.NBackSettings('1-back')
+        # if the battery runner can't be loaded, or the file can't be read or has a setting that can't work, say what it
+        # is instead of starting
+        except (ImportError, OSError, ValueError) as err:
 
-            case str('EGNG'):
-                self.w = reaction.EGNGSettings('EGNG')
+            logging.exception(err, exc_info=True)
 
-            case str('GNG'):
-                self.w = reaction.GNGSettings('GNG')
+            self.w = QLabel('The battery file could not be used:\n' + str(err))
+            self.w.show()
 
-            case _:
-                self.w = QLabel('Panic')
+            return
 
-        self.w.show()
+        self.w.start()
         self.hide()
 
 
+def timeimport(name):
+    """
+    Imports a module and times it, including everything it imports that wasn't loaded yet (like the cumulative column
+    of python -X importtime)
+    :param name: string for the module
+    :return: the module, the import time in milliseconds, and the number of modules that got loaded with it
+    """
+
+    # modules that are already loaded don't cost anything
+    if name in sys.modules:
+        return sys.modules[name], 0.0, 0
+
+    loaded = len(sys.modules)
+    start = time.perf_counter()
+
+    module = importlib.import_module(name)
+
+    return module, (time.perf_counter() - start) * 1000, len(sys.modules) - loaded
+
+
+def loadstack(name, libraries):
+    """
+    Imports a settings module and logs an import time report. The heavy libraries are imported one at a time first so
+    the report shows where the time goes, and the rest of the time is the task's own modules
+    :param name: string for the settings module
+    :param libraries: list of strings for the libraries the module needs
+    :return: the settings module
+    """
+
+    lines = []
+    total = 0.0
+
+    for library in libraries + [name]:
+
+        module, elapsed, count = timeimport(library)
+        total += elapsed
+
+        # only report what actually got imported now
+        if count > 0:
+            lines.append('{:>10.1f} ms {:>6} modules | {}'.format(elapsed, count, library))
+
+    logging.info('Import time report for %s (%.1f ms, %s):\n%s', name, total,
+                 'frozen' if getattr(sys, 'frozen', False) else 'source', '\n'.join(lines) or 'already loaded')
+
+    return module
+
+
 # Main function, which starts the application when called
 def main():
     app = QApplication([])
     app.setStyle('Fusion')
     SelectWindow()
+
+    # report how long the selection window took to come up and make sure nothing heavy came with it
+    heavy = [library for library in ADOPYLIBRARIES if library in sys.modules]
+    logging.info('Selection window up %.1f ms after startup with %d modules loaded%s',
+                 (time.perf_counter() - STARTED) * 1000, len(sys.modules),
+                 ' (already loaded: ' + ', '.join(heavy) + ')' if heavy else '')
+
     app.exec()
@@ -0,0 +1,546 @@
+from Participants import participant, enginecache, engineoptions, parallelmi, priors, snapshots
+
+from adopy.functions import get_nearest_grid_index
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import logging
+import os
+
+# the stopping rules that can end the task once the posterior has settled
+STOPRULES = engineoptions.STOPRULES
+
+# the stopping rules never end the task before this many updates
+MINUPDATES = 10
+
+# how many updates the entropy plateau rule looks back over
+PLATEAU = 5
+
+# the engine updates in the background while the next trial is set up, so the posterior in a trial's row is the one
+# the trial's design was chosen from (before its response). The column names say so, and the posterior after the last
+# response is put in the settings instead
+BEFORE = ' before response'
+
+
+class AdoParticipant(participant.Participant):
+    """
+    Superclass for the tasks that use an ADOPy engine to pick their designs. Updating the engine and finding the next
+    optimal design can take a while on big grids, so that work is done in a background thread during the iti and the
+    gui only picks up the result when the next trial starts. Since the response is either 0 or 1, the background
+    thread also works out the next design for both responses while the participant is still deciding, so that when the
+    response comes in the matching one only has to be swapped in. A stopping rule can end the task early once the
+    posterior has settled: either once every parameter's posterior sd is below a percent of its prior sd, or once the
+    entropy of the posterior has gone down by less than a percent of the prior entropy over the last few updates. The
+    posterior is stored next to the output at the end of the task, so that the participant's next session can start
+    from it (tempered) instead of from a flat prior. The whole posterior after every update can also be kept in a
+    compressed snapshot folder next to the output
+    """
+
+    def __init__(self, expid, trials, session, outdir, task, buttonbox='No', eyetrack='No', fmri='No', stoprule='None',
+                 stopthreshold=10, warmstart='No', priorweight=priors.WEIGHT, snapshotformat='No', seed=None):
+        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetrack, fmri, seed=seed)
+
+        # the engine, once the task has made it (tasks that can also run without one leave it as None)
+        self.engine = None
+
+        # a single background worker, so engine updates always happen one at a time and in the order of the trials
+        self.worker = ThreadPoolExecutor(max_workers=1)
+
+        # the pending computation of the next design (None when nothing is pending)
+        self.nextdesign = None
+
+        # whether the current design came from the engine ('optimal'), from the speculation on the last response
+        # ('speculative', or 'speculative (late)' if it wasn't done when the response came in), or was a fallback because
+        # the engine wasn't done; and what the design being computed will count as
+        self.designsource = 'optimal'
+        self.nextsource = 'optimal'
+
+        # the design that the speculation is for and the pending speculation (None when there isn't one), plus how many
+        # responses found the speculation done, still running, or not there at all
+        self.speculated = None
+        self.speculation = None
+        self.speculationstats = {'ready': 0, 'late': 0, 'skipped': 0}
+
+        # the stopping rule (one of STOPRULES) and its threshold as a percent of the prior, plus why and after how many
+        # updates the task stopped (None until it does)
+        self.stoprule = stoprule
+        self.stopthreshold = float(stopthreshold)
+        self.stopreason = None
+        self.stoptrial = None
+
+        # the posterior sds and entropy after every update, which the stopping rule looks at
+        self.trace = []
+
+        # whether to start from the participant's last session, how much of its posterior to keep (as a percent), and
+        # the stored posterior once it is loaded
+        self.warmstart = warmstart
+        self.priorweight = float(priorweight)
+        self.warmprior = None
+
+        # the background writer for the posterior snapshots (one of snapshots.FORMATS), if they are kept; like the
+        # journal, there are none for practice sessions or simulated sessions without an output directory
+        self.snapshots = None
+
+        if (snapshotformat != 'No') & (self.session not in ['Practice', 'practice']) & (self.outdir is not None):
+            self.snapshots = snapshots.SnapshotWriter(snapshots.get_path(self.outdir, self.expid, self.get_taskstr(),
+                                                                         self.session), snapshotformat)
+
+        # record the stopping rule, warm start, and snapshots with the other settings
+        self.set_settings({'Stopping rule': [stoprule], 'Stopping threshold (%)': [self.stopthreshold],
+                           'Warm start': [warmstart], 'Prior weight (%)': [self.priorweight],
+                           'Posterior snapshots': [snapshotformat]})
+
+    def start_engine(self, engine):
+        """
+        Takes the engine that the task made and computes the optimal design for the first trial
+        :param engine: adopy engine object
+        """
+
+        self.engine = engine
+
+        # the flat prior's sds and entropy, which the stopping rule thresholds are a percent of
+        self.prior = self.get_summary()
+
+        # start from the participant's last session if asked to
+        if self.warmstart == 'Yes':
+            self.load_warmstart()
+
+        # the prior is the first snapshot
+        if self.snapshots is not None:
+            self.snapshots.add(0, self.engine)
+
+        # Compute an optimal design for the first trial
+        self.design = self.choose_design(self.engine, self.engine.mutual_info, self.get_nextframe())
+
+        # keep the posterior means and sds together so the gui never reads them halfway through an update
+        self.posterior = [self.engine.post_mean, self.engine.post_sd]
+
+        # record whether the likelihood tables came from the engine cache and how long getting them took
+        self.set_settings({'Engine cache': [self.engine.cachestatus],
+                           'Engine table time (s)': [self.engine.cachetime]})
+
+    def load_warmstart(self):
+        """
+        Looks for the posterior of the participant's last session of this task in the output directory and, if there is
+        one, makes the engine start from it
+        """
+
+        path = priors.find_previous(self.outdir, self.expid, self.get_taskstr(), self.session)
+
+        if path is None:
+
+            logging.info('No earlier session of ' + self.get_taskstr() + ' for ' + self.expid + '; starting from a '
+                         'flat prior')
+            self.set_settings({'Prior from': ['No earlier session found']})
+
+            return
+
+        self.warmprior = priors.load(path)
+        priors.set_prior(self.engine, self.get_warmprior(self.engine))
+
+        logging.info('Starting ' + self.get_taskstr() + ' for ' + self.expid + ' from the posterior of the ' +
+                     self.warmprior['info']['session'] + ' session, weighted ' + str(self.priorweight) + '%')
+        self.set_settings({'Prior from': [os.path.basename(path)]})
+
+    def get_warmprior(self, engine):
+        """
+        :param engine: adopy engine object
+        :return: array with the tempered log posterior of the last session on the engine's grid, or zeros if the task
+        didn't start from one
+        """
+
+        if self.warmprior is None:
+            return np.zeros(engine.n_p)
+
+        return priors.temper(priors.project(self.warmprior, engine), self.priorweight)
+
+    def can_speculate(self):
+        """
+        Whether the next update is a plain engine update, which is what the speculation works out ahead of time. Tasks
+        that do something else on some updates (e.g., rebuild the grid) say no for those. Only called in the background
+        worker, so it sees every update that came before
+        :return: boolean
+        """
+
+        return True
+
+    def speculate(self):
+        """
+        Starts working out the next design for both responses to the current design in the background worker, unless
+        that is already under way
+        """
+
+        if self.speculated is self.design:
+            return
+
+        self.speculated = self.design
+        self.speculation = self.worker.submit(self.computebranches, self.design)
+
+    def computebranches(self, design):
+        """
+        Runs in the background worker. Works out what the engine would look like after each response to a design,
+        without changing the engine, using the same steps as the engine's own update
+        :param design: the design on screen
+        :return: dictionary with the engine the branches were worked out on and, for responses 0 and 1, the posterior,
+        the tables that depend on it, and the next optimal design; or None if the next update can't be speculated on
+        """
+
+        if not self.can_speculate():
+            return None
+
+        engine = self.engine
+
+        # the row of the design grid for this design
+        index = get_nearest_grid_index(pd.Series(design, index=engine.task.designs, dtype=engine.dtype).values,
+                                       engine.grid_design.values)
+
+        branches = {'engine': engine}
+
+        for response in [0, 1]:
+
+            # the posterior after this response
+            logpost = enginecache.normalize(engine.log_post + engine.log_lik[index, :, response])
+
+            # the mutual information of every design under that posterior (split across the cores on big grids)
+            marglik = parallelmi.marginal(engine, logpost)
+            entmarg = -1 * np.einsum('dy,dy->d', np.exp(marglik), marglik)
+            entcond = parallelmi.conditional(engine, np.exp(logpost))
+            mutualinfo = entmarg - entcond
+
+            branches[response] = {'log_post': logpost, 'marg_log_lik': marglik, 'ent_marg': entmarg,
+                                  'ent_cond': entcond, 'mutual_info': mutualinfo,
+                                  'design': self.choose_design(engine, mutualinfo,
+                                                               self.get_nextframe())}
+
+        return branches
+
+    def commitbranch(self, speculation, ready, design, response):
+        """
+        Runs in the background worker. Puts the speculated branch for the response into the engine, or does a normal
+        update if the speculation can't be used (the worker runs one thing at a time, so the speculation is always done
+        by the time this runs)
+        :param speculation: the future of the speculation, or None
+        :param ready: whether the speculation was done when the response came in
+        :param design: the design that the participant responded to
+        :param response: the participant's response
+        :return: list with the new optimal design and the engine it came from
+        """
+
+        branches = None if speculation is None else speculation.result()
+
+        # the speculation has to be for this engine (e.g., not for a grid that has since been replaced) and for an
+        # update that is just an engine update
+        if (branches is None) or (branches['engine'] is not self.engine) or (not self.can_speculate()):
+
+            self.speculationstats['skipped'] += 1
+            self.nextsource = 'optimal'
+
+            return self.computedesign(design, response)
+
+        # keep track of whether the speculation was done in time
+        if ready:
+
+            self.speculationstats['ready'] += 1
+            self.nextsource = 'speculative'
+
+        else:
+
+            self.speculationstats['late'] += 1
+            self.nextsource = 'speculative (late)'
+
+        return self.applybranch(design, response, branches[response])
+
+    def applybranch(self, design, response, branch):
+        """
+        Sets the engine to a speculated branch, the same as if it had been updated with the response
+        :param design: the design that the participant responded to
+        :param response: the participant's response
+        :param branch: dictionary from computebranches for the response
+        :return: list with the new optimal design and the engine it came from
+        """
+
+        self.engine.log_post = branch['log_post']
+        self.engine._marg_log_lik = branch['marg_log_lik']
+        self.engine._ent_marg = branch['ent_marg']
+        self.engine._ent_cond = branch['ent_cond']
+        self.engine._mutual_info = branch['mutual_info']
+
+        # store the new posterior summaries for the output and the stopping rule
+        self.setposterior()
+
+        return [branch['design'], self.engine]
+
+    def computedesign(self, design, response):
+        """
+        Runs in the background worker. Updates the engine with a response and then computes the next optimal design
+        :param design: the design that the participant responded to
+        :param response: the participant's response
+        :return: list with the new optimal design and the engine it came from
+        """
+
+        # Update engine with the response and current design
+        self.engine.update(design, response)
+
+        # store the new posterior summaries for the output and the stopping rule
+        self.setposterior()
+
+        # Generate new optimal design based on previous design and response
+        return [self.choose_design(self.engine, self.engine.mutual_info, self.get_nextframe()), self.engine]
+
+    def get_nextframe(self):
+        """
+        Tasks that show some trials as gains and some as losses (in an order set up front) have a 'frame' design
+        variable, and the design for a trial has to be in that trial's frame. Called while the trial before it is on
+        screen (or during the iti after it)
+        :return: 1 or -1 for the frame of the next trial that hasn't been shown yet, or None if the designs aren't split
+        up by frame
+        """
+
+        return None
+
+    def choose_design(self, engine, mutualinfo, frame=None):
+        """
+        Picks the design with the most mutual information, out of the designs in a frame if the task has frames
+        :param engine: adopy engine object
+        :param mutualinfo: array with the mutual information of every design in the engine's design grid
+        :param frame: 1 or -1 for the frame the design has to be in, or None for any design
+        :return: dictionary of the design
+        """
+
+        if frame is not None:
+            mutualinfo = np.where(engine.grid_design['frame'].values == frame, mutualinfo, -np.inf)
+
+        return engine.grid_design.iloc[np.argmax(mutualinfo)].to_dict()
+
+    def get_posteriorschema(self):
+        """
+        :return: dictionary of the trial data columns for the posterior and the design source, for set_schema
+        """
+
+        schema = {}
+
+        for name in self.engine.model.params:
+
+            schema['mean_' + name + BEFORE] = float
+            schema['sd_' + name + BEFORE] = float
+
+        schema['design source'] = str
+
+        return schema
+
+    def get_posteriordata(self):
+        """
+        :return: dictionary with the posterior mean and sd of every parameter from before the trial's response (the
+        update for the response is still running in the background) and where the design on screen came from, to add
+        to the trial data
+        """
+
+        # get the latest posterior means and sds from the engine
+        postmean, postsd = self.posterior
+        data = {}
+
+        for index, name in enumerate(self.engine.model.params):
+
+            data['mean_' + name + BEFORE] = float(np.asarray(postmean)[index])
+            data['sd_' + name + BEFORE] = float(np.asarray(postsd)[index])
+
+        data['design source'] = self.designsource
+
+        return data
+
+    def get_summary(self, engine=None):
+        """
+        Summarizes the engine's posterior for the stopping rule. The sds are taken on the scale each parameter's grid is
+        spaced on (e.g., the log of k for DD), since a posterior over a log spaced grid can have a tiny sd on the
+        original scale while still being spread over many grid values
+        :param engine: the engine to summarize, or None for the task's engine
+        :return: dictionary with the engine, the posterior sd of each parameter, and the entropy of the posterior
+        """
+
+        engine = self.engine if engine is None else engine
+
+        logpost = np.asarray(engine.log_post, dtype=np.float64)
+        post = np.exp(logpost)
+        sds = []
+
+        for name in engine.model.params:
+
+            values = engine.grid_param[name].values.astype(np.float64)
+
+            if priors.is_logspaced(np.unique(values)):
+                values = np.log(values)
+
+            mean = np.dot(post, values)
+            sds.append(np.sqrt(np.dot(post, (values - mean) ** 2)))
+
+        return {'engine': engine, 'sd': np.array(sds), 'entropy': float(-1 * np.sum(post * logpost))}
+
+    def setposterior(self, engine=None):
+        """
+        Runs in the background worker after every update. Stores the posterior means and sds for the output, adds the
+        posterior summary to the trace for the stopping rule, and hands the posterior to the snapshot writer
+        :param engine: the engine that was updated, or None for the task's engine (a new engine, like a refined grid,
+        only becomes the task's engine once the gui picks up its design)
+        """
+
+        engine = self.engine if engine is None else engine
+
+        self.posterior = [engine.post_mean, engine.post_sd]
+        self.trace.append(self.get_summary(engine))
+
+        if self.snapshots is not None:
+            self.snapshots.add(len(self.trace), engine)
+
+    def stopping(self):
+        """
+        Called before every trial. Checks the stopping rule against the posterior from the last update the background
+        worker finished (an update that isn't done yet is checked before the next trial instead)
+        :return: boolean for whether the task should end now
+        """
+
+        if self.stopreason is not None:
+            return True
+
+        # nothing to check without a rule, before enough updates, or while the worker is still on the last update
+        if (self.stoprule == 'None') | (len(self.trace) < MINUPDATES):
+            return False
+
+        if (self.nextdesign is not None) and (not self.nextdesign.done()):
+            return False
+
+        threshold = self.stopthreshold / 100
+        last = self.trace[-1]
+
+        # every parameter is known to within a percent of how spread out it was to start with
+        if self.stoprule == 'Posterior SD':
+
+            if np.all(last['sd'] <= threshold * self.prior['sd']):
+                self.stopreason = 'Posterior SD below ' + str(self.stopthreshold) + '% of the prior SD'
+
+        # the last few updates (all on the same grid) barely made the posterior any narrower
+        elif self.stoprule == 'Entropy plateau':
+
+            window = self.trace[-(PLATEAU + 1):]
+
+            if (len(window) == PLATEAU + 1) and all(summary['engine'] is last['engine'] for summary in window) and \
+                    (window[0]['entropy'] - last['entropy'] <= threshold * self.prior['entropy']):
+                self.stopreason = 'Entropy went down by less than ' + str(self.stopthreshold) + \
+                                  '% of the prior entropy over the last ' + str(PLATEAU) + ' updates'
+
+        if self.stopreason is None:
+            return False
+
+        self.stoptrial = len(self.trace)
+
+        logging.info('Stopping the task after ' + str(self.stoptrial) + ' updates: ' + self.stopreason)
+
+        return True
+
+    def engineupdate(self, response):
+        """
+        Sends the participant's response to the background worker, which swaps in the speculated branch for it (or
+        updates the engine if there isn't one) and sets up the new design while the iti is on screen
+        :param response: 0 or 1 depending on what the participant chose
+        """
+
+        # tasks that can run without the engine have nothing to update
+        if self.engine is None:
+            return
+
+        speculation = self.speculation if self.speculated is self.design else None
+        ready = (speculation is not None) and speculation.done()
+
+        self.speculated = None
+        self.speculation = None
+
+        self.nextdesign = self.worker.submit(self.commitbranch, speculation, ready, self.design, response)
+
+    def collectdesign(self, frame=None):
+        """
+        Called when the next trial is about to be shown. If the background worker is done, its design is used. If not,
+        a random design from the grid is used so that the trial can start on time
+        :param frame: 1 or -1 for the frame of the trial about to be shown, for tasks with frames (the fallback design
+        has to be in it)
+        """
+
+        # if there is nothing pending, keep the current design
+        if self.nextdesign is None:
+
+            self.speculate()
+
+            return
+
+        # if the worker finished, use the optimal design and the engine it came from. A new engine (e.g., a refined
+        # grid) is only swapped in here, so the gui never sees the engine change in the middle of a trial
+        if self.nextdesign.done():
+
+            self.design, self.engine = self.nextdesign.result()
+            self.designsource = self.nextsource
+
+        # otherwise, fall back to a random design from the engine the gui has (reading its design grid is safe while
+        # the worker runs). The worker already updated that engine with the response, so if it was building a new
+        # engine, the task keeps going on this one and the new grid is left for the next refinement
+        else:
+
+            engine = self.engine
+
+            self.design = self.choose_design(engine, np.random.random(engine.n_d), frame)
+            self.designsource = 'fallback'
+
+            logging.info('Engine was not done computing the next design; using a random design instead.')
+
+        self.nextdesign = None
+
+        # start on the designs for both responses to this design while the participant decides
+        self.speculate()
+
+    def output(self):
+        """
+        Adds how often the speculated design was ready and why the task stopped to the settings before the output is
+        written, stores the posterior next to the output for the participant's next session, and finishes the snapshot
+        file
+        """
+
+        # wait for the update from the last response, and keep the engine it ended with
+        if self.nextdesign is not None:
+            self.engine = self.nextdesign.result()[1]
+
+        # the posterior after the last response isn't in any trial's row, so it goes with the settings
+        if self.engine is not None:
+
+            postmean, postsd = self.posterior
+
+            for index, name in enumerate(self.engine.model.params):
+                self.set_settings({'Final mean_' + name: [float(np.asarray(postmean)[index])],
+                                   'Final sd_' + name: [float(np.asarray(postsd)[index])]})
+
+        if self.snapshots is not None:
+
+            self.snapshots.close()
+            self.snapshots = None
+
+        if (self.session not in ['Practice', 'practice']) & (self.outdir is not None) & (self.engine is not None):
+
+            try:
+                priors.save(priors.get_path(self.outdir, self.expid, self.get_taskstr(), self.session), self.engine,
+                            self.expid, self.get_taskstr(), self.session)
+
+            # the task output still gets written if the posterior can't be
+            except OSError as err:
+                logging.info('Could not store the posterior: ' + str(err))
+
+        total = sum(self.speculationstats.values())
+
+        self.set_settings({'Speculation ready': [self.speculationstats['ready']],
+                           'Speculation late': [self.speculationstats['late']],
+                           'Speculation skipped': [self.speculationstats['skipped']],
+                           'Stop reason': [self.stopreason or 'Ran every trial'],
+                           'Stopped after update': [self.stoptrial if self.stoptrial is not None else len(self.trace)]})
+
+        logging.info('Speculated designs were ready for ' + str(self.speculationstats['ready']) + ' of ' + str(total) +
+                     ' responses (' + str(self.speculationstats['late']) + ' late, ' +
+                     str(self.speculationstats['skipped']) + ' skipped)')
+
+        super().output()
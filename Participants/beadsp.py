@@ -1,13 +1,12 @@
 from Participants import participant
 
-import pandas as pd
 import random
 
 
 class BeadsParticipant(participant.Participant):
 
-    def __init__(self, expid, rounds, session, outdir, task, eyetracking):
-        super().__init__(expid, rounds, session, outdir, task, eyetracking)
+    def __init__(self, expid, rounds, session, outdir, task, eyetracking, seed=None):
+        super().__init__(expid, rounds, session, outdir, task, eyetracking, seed=seed)
 
         # set up the jars as lists of beads, one with 80 red and one with 90 blue
         self.blue_jar = ['BeadsTask_BlueBead',
@@ -16,6 +15,17 @@ class BeadsParticipant(participant.Participant):
                          'BeadsTask_BlueBead',
                          'BeadsTask_RedBead']
 
+        # declare the trial data columns and their types so the trial store can set them up ahead of time
+        self.set_schema({
+            'round': int,
+            'beads': int,
+            'last bead': str,
+            'response': int,
+            'jar picked': str,
+            'confidence': int,
+            'correct': int
+        })
+
         self.red_jar = ['BeadsTask_BlueBead',
                         'BeadsTask_RedBead',
                         'BeadsTask_RedBead',
@@ -98,21 +108,18 @@ class BeadsParticipant(participant.Participant):
                 correct = 1
 
         # set up a dictionary with this trial's info
-        df_simultrial = {
-            'round': [currentround],
-            'beads': [beadspicked],
-            'last bead': [self.pic],
-            'response': [response],
-            'jar picked': [pick],
-            'confidence': [conf],
-            'correct': [correct]
+        dict_simultrial = {
+            'round': currentround,
+            'beads': beadspicked,
+            'last bead': self.pic,
+            'response': response,
+            'jar picked': pick,
+            'confidence': conf,
+            'correct': correct
         }
 
-        # turn the dictionary into a dataframe
-        df_simultrial = pd.DataFrame(data=df_simultrial)
-
-        # add the dataframe to the main one
-        self.set_performance(df_simultrial)
+        # use set_performance to add the trial to the overall trial data
+        self.set_performance(dict_simultrial)
 
     def get_instructions(self, instint):
         """
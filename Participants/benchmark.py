@@ -0,0 +1,398 @@
+from Participants import simulate, parallelmi
+
+import numpy as np
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+# the participant class calls that run during trials (or at the end of the task) and get timed
+CALLS = ['get_design_text', 'set_design_text', 'get_trial_pic', 'get_trial_text', 'get_signal', 'get_jitter',
+         'updateoutput', 'engineupdate', 'computedesign', 'nextround', 'output']
+
+# how many trials are run for the tasks without an engine, and for the tasks with an ADOPy engine (which take much
+# longer per trial)
+COUNTS = [100, 1000, 10000]
+ADOCOUNTS = [20, 100]
+
+# the grid sizes for the ADOPy tasks, set with the largest reward (more rewards give more designs in the grid)
+GRIDS = {
+    'DD': [{'ll_rew': '50'}, {'ll_rew': '125'}, {'ll_rew': '250'}, {'ll_rew': '250', 'grid': 'Adaptive'}],
+    'ARTT': [{'rewmax': '20'}, {'rewmax': '50'}, {'rewmax': '100'}]
+}
+
+# the p50 has to get this much slower than the last stored run before it is called a regression
+THRESHOLD = 1.2
+
+# where the results are kept by default
+RESULTS = 'benchmark_results.jsonl'
+
+# the worker counts and pool backends the mutual information is timed with, and how many times each is repeated
+WORKERCOUNTS = [1, 2, 4, 8]
+BACKENDS = ['thread', 'process']
+REPEATS = 5
+
+
+def get_shape(task, count):
+    """
+    Splits a number of trials into trials per block and blocks the way each task can run them. Blocks have 20 trials
+    so that every task's conditions divide evenly, except for the ADOPy tasks, which keep 10 trials per block because
+    the number of trials per block also sets the number of delays in the DD grid
+    :param task: string for the task
+    :param count: integer for the total number of trials
+    :return: integers for the trials per block and the number of blocks
+    """
+
+    # these tasks only make a trial order for one block
+    if task in ['PD', 'Framing']:
+        return count, 1
+
+    # NACT always has two parts
+    if task == 'NACT':
+        return max(1, count // 2), 1
+
+    # EGNG runs a round for each of the 4 emotions and its reverse in each block
+    if task == 'EGNG':
+        return 20, max(1, count // 160)
+
+    if task in GRIDS:
+        return 10, max(1, count // 10)
+
+    return 20, max(1, count // 20)
+
+
+def timecalls(person, timings):
+    """
+    Replaces the participant class's trial calls with versions that record how long each call took
+    :param person: the participant class
+    :param timings: dictionary that gets a list of seconds for each call
+    """
+
+    for name in CALLS:
+
+        if not hasattr(person, name):
+            continue
+
+        timings[name] = []
+
+        def timed(*args, method=getattr(person, name), durations=timings[name], **kwargs):
+
+            start = time.perf_counter()
+            value = method(*args, **kwargs)
+            durations.append(time.perf_counter() - start)
+
+            return value
+
+        setattr(person, name, timed)
+
+
+def get_percentiles(durations):
+    """
+    Summarizes the durations of a call
+    :param durations: a list of seconds
+    :return: dictionary with the number of calls and the mean, percentiles, and max in microseconds
+    """
+
+    micro = np.array(durations) * 1e6
+
+    return {'calls': len(micro), 'mean': float(micro.mean()), 'p50': float(np.percentile(micro, 50)),
+            'p90': float(np.percentile(micro, 90)), 'p99': float(np.percentile(micro, 99)), 'max': float(micro.max())}
+
+
+def run(task, count, settings=None, seed=0):
+    """
+    Runs a task headlessly twice: once to time every trial call and once with tracemalloc to see how much the memory
+    grows (tracemalloc slows everything down, so the timings come from the first run)
+    :param task: string for the task
+    :param count: integer for the number of trials
+    :param settings: dictionary of task settings (e.g., the grid size)
+    :param seed: integer seed for the session
+    :return: dictionary of the benchmark results
+    """
+
+    trials, rounds = get_shape(task, count)
+
+    # output() changes the working directory, so come back to it afterwards
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as outdir:
+
+        try:
+
+            # the timing run, with a real output directory so the journal writes are part of the numbers
+            simulation = simulate.make_simulation(task, None, trials, rounds, seed, outdir, settings)
+            person = simulation.person
+
+            timings = {}
+            timecalls(person, timings)
+
+            start = time.perf_counter()
+            simulate.TASKS[task]['run'](simulation)
+            person.output()
+            elapsed = time.perf_counter() - start
+
+            if hasattr(person, 'worker'):
+                person.worker.shutdown()
+
+            # the memory run
+            tracemalloc.start()
+
+            simulation = simulate.make_simulation(task, None, trials, rounds, seed, outdir, settings)
+            startmemory = tracemalloc.get_traced_memory()[0]
+
+            simulate.TASKS[task]['run'](simulation)
+
+            endmemory, peakmemory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            if hasattr(simulation.person, 'worker'):
+                simulation.person.worker.shutdown()
+
+            simulation.person.output()
+
+        finally:
+
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+            os.chdir(cwd)
+
+    return {
+        'task': task,
+        'settings': settings or {},
+        'trials': len(person.performance),
+        'session time (s)': elapsed,
+        'memory growth (KB)': (endmemory - startmemory) / 1024,
+        'memory peak (KB)': (peakmemory - startmemory) / 1024,
+        'calls': {name: get_percentiles(durations) for name, durations in timings.items() if durations}
+    }
+
+
+def get_environment():
+    """
+    Gets the info needed to compare runs: the commit, the time, and the versions
+    :return: dictionary of the environment info
+    """
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+
+    except OSError:
+        commit = ''
+
+    return {'commit': commit, 'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(), 'numpy': np.__version__, 'machine': platform.node()}
+
+
+def get_key(result):
+    """
+    :param result: a benchmark result
+    :return: string that identifies the task, settings, and number of trials, so runs can be compared
+    """
+
+    return result['task'] + json.dumps(result['settings'], sort_keys=True) + str(result['trials'])
+
+
+def load_results(path):
+    """
+    Reads the stored benchmark results
+    :param path: string for the results file
+    :return: a dictionary with the latest stored result for every task, settings, and number of trials
+    """
+
+    latest = {}
+
+    if not os.path.exists(path):
+        return latest
+
+    with open(path, encoding='utf-8') as file:
+
+        for line in file:
+
+            try:
+                result = json.loads(line)
+
+            except ValueError:
+                continue
+
+            latest[get_key(result)] = result
+
+    return latest
+
+
+def compare(result, previous):
+    """
+    Compares the p50 of every call with the last stored run
+    :param result: the new benchmark result
+    :param previous: the stored result with the same key, or None
+    :return: a list of strings, one for every call that got slower than the threshold
+    """
+
+    if previous is None:
+        return []
+
+    slower = []
+
+    for name, stats in result['calls'].items():
+
+        if name not in previous['calls']:
+            continue
+
+        ratio = stats['p50'] / max(previous['calls'][name]['p50'], 1e-9)
+
+        if ratio > THRESHOLD:
+            slower.append(name + ' p50 is ' + str(round(ratio, 2)) + 'x the last run (' +
+                          previous['commit'] + ')')
+
+    return slower
+
+
+def report(result, slower):
+    """
+    Prints a benchmark result as a table
+    :param result: the benchmark result
+    :param slower: list of regression strings from compare
+    """
+
+    print(result['task'] + ' ' + json.dumps(result['settings']) + ': ' + str(result['trials']) + ' trials in ' +
+          str(round(result['session time (s)'], 2)) + ' s; memory grew ' + str(round(result['memory growth (KB)'])) +
+          ' KB (peak ' + str(round(result['memory peak (KB)'])) + ' KB)')
+
+    for name, stats in result['calls'].items():
+        print('    {:<16}{:>8} calls  p50 {:>10.1f} us  p90 {:>10.1f} us  p99 {:>10.1f} us  max {:>10.1f} us'.format(
+            name, stats['calls'], stats['p50'], stats['p90'], stats['p99'], stats['max']))
+
+    for line in slower:
+        print('    REGRESSION: ' + line)
+
+
+def benchmark(tasks=None, counts=COUNTS, adocounts=ADOCOUNTS, path=RESULTS):
+    """
+    Benchmarks the trial calls of every task (and every grid size of the ADOPy tasks), prints the results next to the
+    last stored run, and adds them to the results file
+    :param tasks: a list of task strings, or None for every task that can be simulated
+    :param counts: a list of trial counts for the tasks without an engine
+    :param adocounts: a list of trial counts for the ADOPy tasks
+    :param path: string for the results file
+    :return: a list of the benchmark results
+    """
+
+    if tasks is None:
+        tasks = list(simulate.TASKS)
+
+    environment = get_environment()
+    latest = load_results(path)
+    results = []
+
+    for task in tasks:
+
+        for settings in GRIDS.get(task, [None]):
+
+            for count in (adocounts if task in GRIDS else counts):
+
+                result = {**environment, **run(task, count, settings)}
+
+                report(result, compare(result, latest.get(get_key(result))))
+                results.append(result)
+
+    # add the results to the file so the next run can be compared with this one
+    with open(path, 'a', encoding='utf-8') as file:
+
+        for result in results:
+            file.write(json.dumps(result) + '\n')
+
+    return results
+
+
+def benchmark_mi(tasks=None, workercounts=WORKERCOUNTS, backends=BACKENDS, repeats=REPEATS):
+    """
+    Times how long the mutual information of every design takes on the largest grid of each ADOPy task, split across
+    different numbers of workers, and prints the speedup over one worker. The grid is split even if it is smaller than
+    the usual cutoff, so that every worker count is really used
+    :param tasks: a list of ADOPy task strings, or None for all of them
+    :param workercounts: a list of worker counts
+    :param backends: a list of pool backends ('thread' and/or 'process')
+    :param repeats: integer for how many times each worker count is timed (the median is used)
+    :return: a list of dictionaries, one for each task, backend, and worker count
+    """
+
+    if tasks is None:
+        tasks = list(GRIDS)
+
+    results = []
+    minsize = parallelmi.MINSIZE
+
+    print('Mutual information on ' + str(os.cpu_count()) + ' cores')
+
+    try:
+
+        parallelmi.MINSIZE = 0
+
+        for task in [task for task in tasks if task in GRIDS]:
+
+            # the largest fixed grid of the task
+            settings = [settings for settings in GRIDS[task] if 'grid' not in settings][-1]
+
+            trials, rounds = get_shape(task, 10)
+            engine = simulate.make_simulation(task, None, trials, rounds, 0, None, settings).person.engine
+
+            print('    ' + task + ' ' + json.dumps(settings) + ': ' + str(engine.log_lik.size) + ' cells')
+
+            for backend in backends:
+
+                baseline = None
+
+                for workers in workercounts:
+
+                    engine.workers = workers
+                    engine.backend = backend
+
+                    durations = []
+
+                    # the first run starts the pool (and shares the tables with the processes), so it isn't timed
+                    for repeat in range(repeats + 1):
+
+                        start = time.perf_counter()
+                        parallelmi.marginal(engine, engine.log_post)
+                        parallelmi.conditional(engine, engine.post)
+                        durations.append(time.perf_counter() - start)
+
+                    median = float(np.median(durations[1:]))
+                    baseline = median if baseline is None else baseline
+
+                    results.append({'task': task, 'settings': settings, 'backend': backend, 'workers': workers,
+                                    'median (ms)': median * 1000, 'speedup': baseline / median})
+
+                    print('        {:<8}{:>3} workers  {:>10.2f} ms  {:>6.2f}x'.format(backend, workers, median * 1000,
+                                                                                   baseline / median))
+
+    finally:
+        parallelmi.MINSIZE = minsize
+
+    return results
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Time the participant class calls of each task over many trials.')
+    parser.add_argument('tasks', nargs='*', help='tasks to benchmark (default: all of them)')
+    parser.add_argument('--counts', type=int, nargs='+', default=COUNTS, help='trial counts for most tasks')
+    parser.add_argument('--adocounts', type=int, nargs='+', default=ADOCOUNTS, help='trial counts for DD and ARTT')
+    parser.add_argument('--results', default=RESULTS, help='file the results are stored in and compared with')
+    parser.add_argument('--mi', action='store_true', help='time the mutual information over different worker counts')
+    parser.add_argument('--workers', type=int, nargs='+', default=WORKERCOUNTS, help='worker counts for --mi')
+    parser.add_argument('--backends', nargs='+', default=BACKENDS, help='pool backends for --mi')
+    args = parser.parse_args()
+
+    if args.mi:
+        benchmark_mi(args.tasks or None, args.workers, args.backends)
+
+    else:
+        benchmark(args.tasks or None, args.counts, args.adocounts, args.results)
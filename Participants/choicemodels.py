@@ -0,0 +1,96 @@
+from adopy.base import Task, Model
+
+from scipy.special import expit as inv_logit
+from scipy.stats import bernoulli
+
+import numpy as np
+
+
+class TaskPD(Task):
+    """
+    The probability discounting task: a sure amount against a chance of a bigger amount. The frame is 1 for gains and
+    -1 for losses. The choice is 0 for the sure amount and 1 for the gamble
+    """
+
+    def __init__(self):
+        super().__init__(name='Probability discounting task', designs=['r_sure', 'r_risky', 'p_risky', 'frame'],
+                         responses=['choice'])
+
+
+class ModelPD(Model):
+    """
+    Hyperbolic probability discounting (Rachlin et al., 1991), the same form as the hyperbolic model for delay
+    discounting, with the odds against winning in place of the delay:
+
+        V = r_risky / (1 + h * (1 - p_risky) / p_risky)
+        P(gamble) = 1 / (1 + exp(-tau * frame * (V - r_sure)))
+
+    Model parameters: h (how steeply the gamble loses value as the odds go against it) and tau (inverse temperature)
+    """
+
+    def __init__(self):
+        super().__init__(name='Hyperbolic model for the PD task', task=TaskPD(), params=['h', 'tau'])
+
+    def compute(self, choice, r_sure, r_risky, p_risky, frame, h, tau):
+        sv_risky = np.divide(r_risky, 1 + h * np.divide(1 - p_risky, p_risky))
+        p_obs = inv_logit(tau * frame * (sv_risky - r_sure))
+        return bernoulli.logpmf(choice, p_obs)
+
+
+class TaskRA(Task):
+    """
+    The risk aversion task: nothing for sure against a 50/50 gamble to win or lose some money. The choice is 0 for
+    nothing and 1 for the gamble
+    """
+
+    def __init__(self):
+        super().__init__(name='Risk aversion task', designs=['r_gain', 'r_loss'], responses=['choice'])
+
+
+class ModelRA(Model):
+    """
+    Prospect theory for mixed gambles (Sokol-Hessner et al., 2009):
+
+        U = .5 * r_gain ^ rho - .5 * lam * r_loss ^ rho
+        P(gamble) = 1 / (1 + exp(-mu * U))
+
+    Model parameters: rho (curvature of the value function), lam (loss aversion), and mu (inverse temperature)
+    """
+
+    def __init__(self):
+        super().__init__(name='Prospect theory model for the RA task', task=TaskRA(), params=['rho', 'lam', 'mu'])
+
+    def compute(self, choice, r_gain, r_loss, rho, lam, mu):
+        sv_gamble = .5 * np.power(r_gain, rho) - .5 * lam * np.power(r_loss, rho)
+        p_obs = inv_logit(mu * sv_gamble)
+        return bernoulli.logpmf(choice, p_obs)
+
+
+class TaskFrame(Task):
+    """
+    The framing task: a sure amount against a gamble with the same expected value, framed as gains (frame 1) or as
+    losses (frame -1). The choice is 0 for the sure amount and 1 for the gamble
+    """
+
+    def __init__(self):
+        super().__init__(name='Framing task', designs=['r_sure', 'r_risky', 'p_risky', 'frame'], responses=['choice'])
+
+
+class ModelFrame(Model):
+    """
+    A power value function that is the same for gains and losses (so that being risk averse for gains goes with being
+    risk seeking for losses), plus a bias towards the gamble in the loss frame for the framing effect itself:
+
+        U = frame * (p_risky * r_risky ^ alpha - r_sure ^ alpha)
+        P(gamble) = 1 / (1 + exp(-(gamma * U + beta * (1 - frame) / 2)))
+
+    Model parameters: alpha (curvature of the value function), beta (framing bias), and gamma (inverse temperature)
+    """
+
+    def __init__(self):
+        super().__init__(name='Framing model', task=TaskFrame(), params=['alpha', 'beta', 'gamma'])
+
+    def compute(self, choice, r_sure, r_risky, p_risky, frame, alpha, beta, gamma):
+        sv_gamble = frame * (p_risky * np.power(r_risky, alpha) - np.power(r_sure, alpha))
+        p_obs = inv_logit(gamma * sv_gamble + beta * np.divide(1 - frame, 2))
+        return bernoulli.logpmf(choice, p_obs)
@@ -1,28 +1,46 @@
-from Participants import participant
+from Participants import participant, adopyp, choicemodels, enginecache, parallelmi, priors, schedule
 
 from adopy.tasks.dd import *
-from adopy import Engine
 
 import numpy as np
-import pandas as pd
 import random
 
+# sizes of the adaptive DD grid: reward levels for the immediate option, k values, and tau values
+ADAPTIVEREWARDS = 40
+ADAPTIVEK = 25
+ADAPTIVETAU = 8
 
-class DdParticipant(participant.Participant):
+# how many trials go by between refinements of the adaptive grid
+REFINEEVERY = 5
+
+# how many sure amounts the adaptive PD design has, and the gamble probabilities it picks from
+PDREWARDS = 40
+PROBABILITIES = np.round(np.arange(.05, 1, .05), 2)
+
+
+class DdParticipant(adopyp.AdoParticipant):
 
     def __init__(self, expid, trials, session, outdir, task, ss_del, ll_shortdel, ll_longdel, ss_smallrew, ll_rew,
-                 rounds, buttonbox, eyetracking, fmri):
-        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, fmri)
+                 rounds, buttonbox, eyetracking, fmri, grid='Fixed', precision='Single', stoprule='None',
+                 stopthreshold='10', warmstart='No', priorweight=priors.WEIGHT, snapshotformat='No', seed=None):
+        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, fmri, stoprule, stopthreshold,
+                         warmstart, priorweight, snapshotformat, seed=seed)
 
         # set how many blocks there are
         self.rounds = int(rounds)
 
-        # call the function to create the adopy engine
-        self.engine = self.create_dd_engine(self.task, float(ss_del), float(ll_shortdel), float(ll_longdel),
-                                            float(ss_smallrew), float(ll_rew))
+        # whether the engine uses the full grid ('Fixed') or a smaller one that is refined as trials go by ('Adaptive')
+        self.grid = grid
+
+        # the precision of the engine tables and posterior (a key of enginecache.PRECISIONS)
+        self.precision = precision
 
-        # Compute an optimal design for the first trial
-        self.design = self.engine.get_design('optimal')
+        # every design and choice so far, which the adaptive grid uses to carry the posterior over to a refined grid
+        self.history = []
+
+        # call the function to create the adopy engine and compute the design for the first trial
+        self.start_engine(self.create_dd_engine(self.task, float(ss_del), float(ll_shortdel), float(ll_longdel),
+                                                float(ss_smallrew), float(ll_rew)))
 
         # Experiment settingsguis output dataframe
         dict_simulsettings = {'Immediate Option Delay': [ss_del],
@@ -31,12 +49,32 @@ class DdParticipant(participant.Participant):
                               'Smallest Smaller Sooner Reward': [ss_smallrew],
                               'Largest Smaller Sooner Reward': [(float(ll_rew) - float(ss_smallrew))],
                               'Larger Later Reward': [ll_rew],
-                              'Blocks': [rounds]
+                              'Blocks': [rounds],
+                              'Grid': [grid],
+                              'Precision': [precision]
                               }
 
         # attach the task-specific settings to the task general settings
         self.set_settings(dict_simulsettings)
 
+        # declare the trial data columns and their types so the trial store can set them up ahead of time
+        self.set_schema({
+            'trial': int,
+            'onset': float,
+            'SSAmount': float,
+            'LLAmount': float,
+            'LLDelay': float,
+            'response': int,
+            'reaction time': float,
+            'mean_k' + adopyp.BEFORE: float,
+            'mean_tau' + adopyp.BEFORE: float,
+            'sd_k' + adopyp.BEFORE: float,
+            'sd_tau' + adopyp.BEFORE: float,
+            'design source': str,
+            'design grid size': int,
+            'parameter grid size': int
+        })
+
     def create_dd_engine(self, task, ss_del, ll_shortdel, ll_longdel, ss_smallrew, ll_rew):
         """
         creates the ADOPy engine for the delay discounting task
@@ -52,6 +90,10 @@ class DdParticipant(participant.Participant):
         # use the hyperbolic discounting model
         model = ModelHyp()
 
+        # make a random number generator seeded with the delay settings, so that the same settings always give the
+        # same delays (and the same engine grid, which can then be loaded from the engine cache)
+        rng = random.Random(str([ss_del, ll_shortdel, ll_longdel, self.get_trials()]))
+
         # make a list to have the different delays for the delayed option
         timerange = [ll_shortdel]
 
@@ -62,11 +104,20 @@ class DdParticipant(participant.Participant):
             for trial in range(self.get_trials()-2):
 
                 # add a random float between the shortest and longest delay for the delayed option to the list of delays
-                timerange.append(random.uniform(ll_shortdel, ll_longdel))
+                timerange.append(rng.uniform(ll_shortdel, ll_longdel))
 
         # now add the longest delay to the list of delay
         timerange.append(ll_longdel)
 
+        # keep the delays and rewards so that the adaptive grid can be rebuilt around them
+        self.delays = timerange
+        self.rewards = [ss_del, ss_smallrew, ll_rew]
+
+        # the adaptive grid starts out with fewer rewards and parameter values, spread over the same ranges
+        if self.grid == 'Adaptive':
+
+            return self.create_grid_engine(task, ss_smallrew, ll_rew - .5, 1e-5, 1, .5, 5, True)
+
         # make a design dictionary for ADOPy
         grid_design = {
             # e.g., for now, put [0]
@@ -96,12 +147,151 @@ class DdParticipant(participant.Participant):
             'choice': [0, 1]
         }
 
-        # Set up engine
-        engine = Engine(task, model, grid_design, grid_param, grid_response)
+        # Set up engine, loading the likelihood tables from the cache if these settings were used before, and splitting
+        # the mutual information over the design grid across the cores
+        engine = parallelmi.ParallelEngine(task, model, grid_design, grid_param, grid_response,
+                                           dtype=enginecache.PRECISIONS[self.precision])
 
         # return the engine
         return engine
 
+    def create_grid_engine(self, task, rewmin, rewmax, kmin, kmax, taumin, taumax, cached=False):
+        """
+        creates an engine for the adaptive grid, with a fixed number of rewards, k values, and tau values over the
+        given ranges
+        :param task: for the adopy dd task
+        :param rewmin: float for the smallest reward for the sooner option
+        :param rewmax: float for the largest reward for the sooner option
+        :param kmin: float for the smallest k
+        :param kmax: float for the largest k
+        :param taumin: float for the smallest tau
+        :param taumax: float for the largest tau
+        :param cached: whether to use the engine cache (only for the starting grid, which is the same every time)
+        :return: adopy engine object
+        """
+
+        # rewards are kept to the half dollar, like the full grid
+        rewards = np.unique(np.round(np.linspace(rewmin, rewmax, ADAPTIVEREWARDS) * 2) / 2)
+
+        grid_design = {
+            't_ss': [self.rewards[0]],
+            't_ll': self.delays,
+            'r_ss': rewards,
+            'r_ll': [self.rewards[2]]
+        }
+
+        # k is spread on a log scale and tau on a linear scale, as in the full grid
+        grid_param = {
+            'k': np.logspace(np.log10(kmin), np.log10(kmax), ADAPTIVEK, base=10),
+            'tau': np.linspace(taumin, taumax, ADAPTIVETAU)
+        }
+
+        grid_response = {
+            'choice': [0, 1]
+        }
+
+        # refined grids are different for every participant, so they aren't worth keeping in the cache
+        return parallelmi.ParallelEngine(task, ModelHyp(), grid_design, grid_param, grid_response,
+                                         dtype=enginecache.PRECISIONS[self.precision],
+                                         cachedir=enginecache.CACHEDIR if cached else None)
+
+    def refine_engine(self):
+        """
+        Builds a new adaptive grid around where the posterior is: the k and tau ranges shrink to the values that still
+        have posterior mass, and the rewards move to the amounts that would make those participants indifferent. The
+        posterior is carried over by recomputing the likelihood of every choice so far on the new grid
+        :return: the new adopy engine
+        """
+
+        ss_del, ss_smallrew, ll_rew = self.rewards
+        post = self.engine.post
+        ranges = []
+
+        # find the range of each parameter that holds almost all of the posterior, plus a grid step on each side
+        for index, name in enumerate(self.engine.model.params):
+
+            values = self.engine.grid_param[name].values
+            levels = np.unique(values)
+            marginal = np.array([post[values == level].sum() for level in levels])
+            cumulative = np.cumsum(marginal)
+
+            low = max(np.searchsorted(cumulative, .005) - 1, 0)
+            high = min(np.searchsorted(cumulative, .995) + 1, len(levels) - 1)
+
+            ranges.append([levels[low], levels[high]])
+
+        # never go outside of the full grid's ranges
+        kmin, kmax = max(ranges[0][0], 1e-5), min(ranges[0][1], 1)
+        taumin, taumax = max(ranges[1][0], .5), min(ranges[1][1], 5)
+
+        # the immediate rewards that someone with those k values would take instead of the delayed reward
+        delays = np.array([min(self.delays), max(self.delays)])
+        indifference = ll_rew * (1 + np.outer([kmin, kmax], [ss_del])) / (1 + np.outer([kmin, kmax], delays))
+
+        rewmin = min(max(indifference.min(), ss_smallrew), ll_rew - .5)
+        rewmax = max(min(indifference.max(), ll_rew - .5), rewmin + .5)
+
+        engine = self.create_grid_engine(self.task, rewmin, rewmax, kmin, kmax, taumin, taumax)
+
+        # the log likelihood of every choice so far for every parameter value on the new grid
+        designs = {name: np.array([[design[name]] for design, choice in self.history])
+                   for name in ['t_ss', 't_ll', 'r_ss', 'r_ll']}
+        choices = np.array([[choice] for design, choice in self.history])
+        params = {name: engine.grid_param[name].values.reshape(1, -1) for name in engine.model.params}
+
+        lik = np.exp(engine.model.compute(choice=choices, **designs, **params))
+        loglik = np.log((1 - 2 * engine._noise_ratio) * lik + engine._noise_ratio).sum(axis=0)
+
+        # add the prior from the last session (if the task started from one), use that as the new engine's starting
+        # point, and work out the mutual information from it
+        priors.set_prior(engine, enginecache.normalize(loglik + self.get_warmprior(engine)))
+
+        return engine
+
+    def computedesign(self, design, response):
+        """
+        Runs in the background worker. Updates the engine like the other ADOPy tasks and, with the adaptive grid,
+        refines the grid every few trials before picking the next design
+        :param design: the design that the participant responded to
+        :param response: the participant's choice
+        :return: list with the new optimal design and the engine it came from
+        """
+
+        self.history.append([{name: float(design[name]) for name in ['t_ss', 't_ll', 'r_ss', 'r_ll']}, response])
+
+        # just a normal update with the fixed grid, or between refinements
+        if (self.grid != 'Adaptive') | (len(self.history) % REFINEEVERY != 0):
+            return super().computedesign(design, response)
+
+        # the refined grid is handed back with its design, and the gui swaps it in when it picks up the design
+        self.engine.update(design, response)
+        engine = self.refine_engine()
+
+        self.setposterior(engine)
+
+        return [self.choose_design(engine, engine.mutual_info, self.get_nextframe()), engine]
+
+    def can_speculate(self):
+        """
+        The adaptive grid gets rebuilt on every few updates, which the speculation can't work out ahead of time
+        :return: boolean
+        """
+
+        return (self.grid != 'Adaptive') | ((len(self.history) + 1) % REFINEEVERY != 0)
+
+    def applybranch(self, design, response, branch):
+        """
+        Keeps the design and choice for the adaptive grid and then swaps in the speculated branch
+        :param design: the design that the participant responded to
+        :param response: the participant's choice
+        :param branch: dictionary from computebranches for the choice
+        :return: list with the new optimal design and the engine it came from
+        """
+
+        self.history.append([{name: float(design[name]) for name in ['t_ss', 't_ll', 'r_ss', 'r_ll']}, response])
+
+        return super().applybranch(design, response, branch)
+
     def get_timestring(self, startingweeks):
         """
         takes the float that the model kicks out for the delays and converts it to an understandable string
@@ -195,8 +385,12 @@ class DdParticipant(participant.Participant):
         :return: a list of two strings, one for the left option, and one for the right option
         """
 
-        # pick a random integer so that we randomize the sides that the strings are on
-        side = random.randint(1, 2)
+        # pick up the design that the engine worked out during the iti
+        self.collectdesign()
+
+        # pick a random integer so that we randomize the sides that the strings are on (kept so that the engine update
+        # knows which side the delayed option was on)
+        self.side = random.randint(1, 2)
 
         # if the user wanted the immediate option to occur now, as opposed to also at a delay, use now  in the string
         if int(self.design['t_ss']) == 0:
@@ -212,7 +406,7 @@ class DdParticipant(participant.Participant):
                       + self.get_timestring(float(self.design['t_ll']))
 
         # if the side integer is 1, then put the delay string on the right
-        if side == 1:
+        if self.side == 1:
 
             options = [shortstring, delaystring]
 
@@ -226,15 +420,23 @@ class DdParticipant(participant.Participant):
 
     def engineupdate(self, response):
         """
-        updates the adopy engine with the participant's response and then sets up the new design
-        :param response: 0 or 1 depending on if the participant took the immediate or delayed option
+        turns the participant's key press into a choice for the adopy engine, which then sets up the new design in the
+        background
+        :param response: 0 or 1 depending on if the participant chose left or right
         """
 
-        # Update engine with the response and current design
-        self.engine.update(self.design, response)
+        # the engine wants a 1 if the delayed option was chosen, which is on the right when the side integer is 1
+        if ((self.side == 1) & (response == 1)) | ((self.side == 2) & (response == 0)):
+
+            choice = 1
 
-        # Generate new optimal design based on previous design and response
-        self.design = self.engine.get_design('optimal')
+        # otherwise, the participant took the immediate option
+        else:
+
+            choice = 0
+
+        # send the choice to the background worker in the superclass
+        super().engineupdate(choice)
 
     def nextround(self, blocks):
         """
@@ -256,34 +458,41 @@ class DdParticipant(participant.Participant):
         # return the prompt
         return prompt
 
-    def updateoutput(self, trial, onset, time, response):
+    def updateoutput(self, trial, onset, time, response=3):
         """
         records stats for the trial
         :param trial: the number of the trial that was just completed
         :param onset: onset time for the trial
         :param time: participants's reaction time
-        :param response: integer with either 0 or 1 depending on if the person chose left or right
+        :param response: integer with either 0 or 1 depending on if the person chose left or right. Default is 3 in case
+        the participants doesn't answer in time.
         :return: updates the performance dataframe in the superclass
         """
 
+        # get the latest posterior means and sds from the engine (from before this response, which the background
+        # worker is still updating the engine with)
+        postmean, postsd = self.posterior
+
         # make a dictionary of trial info
-        df_simultrial = {
-            'trial': [trial],
-            'onset': [onset],
-            'SSAmount': [float(self.design['r_ss'])],
-            'LLAmount': [float(self.design['r_ll'])],
-            'LLDelay': [float(self.design['t_ll'])],
-            'response': [response],
-            'reaction time': [time],
-            'mean_k': [self.engine.post_mean[0]],
-            'mean_tau': [self.engine.post_mean[1]],
-            'sd_k': [self.engine.post_sd[0]],
-            'sd_tau': [self.engine.post_sd[1]]
+        dict_simultrial = {
+            'trial': trial,
+            'onset': onset,
+            'SSAmount': float(self.design['r_ss']),
+            'LLAmount': float(self.design['r_ll']),
+            'LLDelay': float(self.design['t_ll']),
+            'response': response,
+            'reaction time': time,
+            'mean_k' + adopyp.BEFORE: postmean[0],
+            'mean_tau' + adopyp.BEFORE: postmean[1],
+            'sd_k' + adopyp.BEFORE: postsd[0],
+            'sd_tau' + adopyp.BEFORE: postsd[1],
+            'design source': self.designsource,
+            'design grid size': self.engine.n_d,
+            'parameter grid size': self.engine.n_p
         }
 
-        # turn that dictionary into a dataframe and use set_performance to add it to the overall dataframe
-        df_simultrial = pd.DataFrame(data=df_simultrial)
-        self.set_performance(df_simultrial)
+        # use set_performance to add the trial to the overall trial data
+        self.set_performance(dict_simultrial)
 
     def get_instructions(self, instint):
         """
@@ -316,38 +525,76 @@ class DdParticipant(participant.Participant):
         return inst
 
 
-class PdParticipant(participant.Participant):
+class PdParticipant(adopyp.AdoParticipant):
 
     def __init__(self, expid, trials, session, outdir, task, design, minimum, maximum, outcome, money, rounds,
-                 buttonbox, eyetracking, fmri):
-        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, fmri)
+                 buttonbox, eyetracking, fmri, adaptive='No', precision='Single', stoprule='None', stopthreshold='10',
+                 warmstart='No', priorweight=priors.WEIGHT, snapshotformat='No', seed=None):
+
+        # the stopping rule, warm start, and snapshots only mean something with the engine
+        if adaptive != 'Yes':
+            stoprule, warmstart, snapshotformat = 'None', 'No', 'No'
+
+        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, fmri, stoprule, stopthreshold,
+                         warmstart, priorweight, snapshotformat, seed=seed)
 
         # grab the information that the user entered on the settings page
         self.rounds = int(rounds)
-        self.design = design
+        self.structure = design
         self.maximum = float(maximum)
         self.minimum = float(minimum)
         self.startmoney = float(money)
         self.outcomeopt = outcome
 
+        # whether the designs come from an ADOPy engine ('Yes') or are picked at random ('No'), and the precision of the
+        # engine tables and posterior (a key of enginecache.PRECISIONS)
+        self.adaptive = adaptive
+        self.precision = precision
+
         # make empty lists for the trial design and outcomes that the participant chose (if the user wanted an outcome
         # randomly shown on screen
         self.trialdesign = []
         self.outcomelist = []
 
+        # the trial type (gain or loss) of the trial on screen
+        self.state = None
+
         # call the function to create the design
         self.create_design()
 
+        # create the adopy engine and compute the design for the first trial (the order has to be made first, since the
+        # design has to be in the first trial's frame)
+        if self.adaptive == 'Yes':
+            self.start_engine(self.create_pd_engine())
+
         # Experiment settingsguis output dataframe
         dict_simulsettings = {'Design': [design],
                               'Minimum Reward': [minimum],
                               'Maximum Reward': [maximum],
-                              'Blocks': [rounds]
+                              'Blocks': [rounds],
+                              'Adaptive design': [adaptive],
+                              'Precision': [precision]
                               }
 
         # attach the task-specific settings to the task general settings
         self.set_settings(dict_simulsettings)
 
+        # declare the trial data columns and their types so the trial store can set them up ahead of time
+        self.set_schema({
+            'trial': int,
+            'cond': str,
+            'SureAmount': str,
+            'RiskyAmount': float,
+            'RiskyProbability': str,
+            'onset': float,
+            'response': int,
+            'reaction time': float
+        })
+
+        # the posterior after every trial and where the design came from, with the adaptive design
+        if self.adaptive == 'Yes':
+            self.set_schema(self.get_posteriorschema())
+
     def create_design(self):
         """
         If you want both gains and losses, then it creates a random order for gain and loss questions
@@ -356,7 +603,7 @@ class PdParticipant(participant.Participant):
         """
 
         # only if the user wanted gains and losses
-        if self.design == 'Gains and Losses':
+        if self.structure == 'Gains and Losses':
 
             # divide the number of trials by 2 because there are 2 types of trials
             multnum = int(self.get_trials() / 2)
@@ -367,18 +614,86 @@ class PdParticipant(participant.Participant):
             # list composed of 2 strings for gains and losses
             gainlosscond = ['Gain', 'Loss']
 
-            # the lists are multiplied so that you end up with a list of strings. Each string appears half of the trials
-            self.order = sum([[s] * n for s, n in zip(gainlosscond, multiplier)], [])
+            # make a random order of the strings. Each string appears half of the trials
+            self.order = schedule.Order(self.schedule.sequence(gainlosscond, multiplier))
 
-            # randomize the list
-            random.shuffle(self.order)
+    def create_pd_engine(self):
+        """
+        creates the ADOPy engine for the probability discounting task. The sure amounts are spread over the same range
+        as the random designs, and the gamble is always for the maximum
+        :return: adopy engine object
+        """
+
+        # the frames of the trials: 1 for gains, -1 for losses
+        frames = {'Gains only': [1], 'Losses only': [-1], 'Gains and Losses': [1, -1]}
+
+        # make a design dictionary for ADOPy
+        grid_design = {
+            # sure amounts from the minimum to $.50 under the maximum, kept to the half dollar
+            'r_sure': np.unique(np.round(np.linspace(self.minimum, self.maximum - .5, PDREWARDS) * 2) / 2),
+
+            # [maximum]
+            'r_risky': [self.maximum],
+
+            # [5%, 10%, ..., 95%]
+            'p_risky': PROBABILITIES,
+
+            'frame': frames[self.structure]
+        }
+
+        # make a dictionary for the ADOPy model parameters
+        grid_param = {
+            # 41 points on [10^-2, ..., 10^2] in a log scale
+            'h': np.logspace(-2, 2, 41, base=10),
+
+            # 10 points on (0, 5] in a linear scale
+            'tau': np.linspace(0, 5, 11)[1:]
+        }
+
+        # make a dictionary for the possible responses (1 is the gamble)
+        grid_response = {
+            'choice': [0, 1]
+        }
+
+        # Set up engine, loading the likelihood tables from the cache if these settings were used before, and splitting
+        # the mutual information over the design grid across the cores
+        return parallelmi.ParallelEngine(choicemodels.TaskPD(), choicemodels.ModelPD(), grid_design, grid_param,
+                                         grid_response, dtype=enginecache.PRECISIONS[self.precision])
+
+    def get_frame(self, state=None):
+        """
+        :param state: the trial type from the order, if there is one
+        :return: 1 for a gain trial or -1 for a loss trial
+        """
+
+        if self.structure == 'Gains and Losses':
+            return 1 if state == 'Gain' else -1
+
+        return 1 if self.structure == 'Gains only' else -1
+
+    def get_nextframe(self):
+        """
+        With both gains and losses, the engine has to pick the next design out of the next trial's frame
+        :return: 1 or -1 for the frame of the next trial, or None if all of the trials are in the same frame
+        """
+
+        if self.structure != 'Gains and Losses':
+            return None
+
+        state = self.order.peek()
+
+        return None if state is None else self.get_frame(state)
 
     def set_design_text(self):
         """
-        Sets the actual text used in the design
+        Sets the actual text used in the design. With the adaptive design, the engine picks the design instead (in the
+        background, when the response comes in)
         :return: Creates self.trialdesign
         """
 
+        if self.adaptive == 'Yes':
+            return
+
         # generate random floats between the ranges for rewards and probabilities
         self.trialdesign = [
             random.uniform(self.minimum, self.maximum-.5),
@@ -391,11 +706,21 @@ class PdParticipant(participant.Participant):
         :return: left text (sure), right text (gamble), and gamble probability
         """
 
-        # if the user wanted both gains and losses
-        if self.design == 'Gains and Losses':
+        # if the user wanted both gains and losses, get the next string from the order to figure out if the trial is a
+        # gain or loss one
+        if self.structure == 'Gains and Losses':
+            self.state = self.order.next()
+
+        # with the adaptive design, pick up the design that the engine worked out during the iti (in this trial's frame)
+        if self.adaptive == 'Yes':
 
-            # pop the string out of the order list to figure out if the trial is a gain or loss one
-            self.state = self.order.pop()
+            self.collectdesign(self.get_frame(self.state))
+
+            # (rounded, since the single precision grid isn't exact)
+            self.trialdesign = [round(float(self.design['r_sure']), 2), round(float(self.design['p_risky']), 2)]
+
+        # if the user wanted both gains and losses
+        if self.structure == 'Gains and Losses':
 
             # if the next trial is a gain trial
             if self.state == 'Gain':
@@ -424,7 +749,7 @@ class PdParticipant(participant.Participant):
                 barvalue = round((1 - self.trialdesign[1]) * 100)
 
         # if the user just wanted gains
-        elif self.design == "Gains only":
+        elif self.structure == "Gains only":
 
             # indicate that the trial is a gain trial
             self.state = 'Gain'
@@ -478,31 +803,35 @@ class PdParticipant(participant.Participant):
         # return the prompt
         return prompt
 
-    def updateoutput(self, trial, onset, time, response):
+    def updateoutput(self, trial, onset, time, response=3):
         """
         records stats for the trial
         :param trial: the number of the trial that was just completed
         :param onset: onset time for the trial
         :param time: participants's reaction time
-        :param response: integer with either 0 or 1 depending on if the person chose left or right
+        :param response: integer with either 0 or 1 depending on if the person chose left or right. Default is 3 in case
+        the participants doesn't answer in time.
         :return: updates the performance dataframe in the superclass
         """
 
         # make a dictionary of trial info
-        df_simultrial = {
-            'trial': [trial],
-            'cond': [self.state],
-            'SureAmount': [str('{:.2f}'.format(self.trialdesign[0]))],
-            'RiskyAmount': [self.maximum],
-            'RiskyProbability': [str(self.trialdesign[1])],
-            'onset': [onset],
-            'response': [response],
-            'reaction time': [time]
+        dict_simultrial = {
+            'trial': trial,
+            'cond': self.state,
+            'SureAmount': str('{:.2f}'.format(self.trialdesign[0])),
+            'RiskyAmount': self.maximum,
+            'RiskyProbability': str(self.trialdesign[1]),
+            'onset': onset,
+            'response': response,
+            'reaction time': time
         }
 
-        # turn that dictionary into a dataframe and use set_performance to add it to the overall dataframe
-        df_simultrial = pd.DataFrame(data=df_simultrial)
-        self.set_performance(df_simultrial)
+        # add the latest posterior from the engine
+        if self.adaptive == 'Yes':
+            dict_simultrial.update(self.get_posteriordata())
+
+        # use set_performance to add the trial to the overall trial data
+        self.set_performance(dict_simultrial)
 
         # only do the following if the user wanted a random reward/loss at the end
         if (self.outcomeopt == 'Yes') & (response != 'None'):
@@ -512,13 +841,13 @@ class PdParticipant(participant.Participant):
             if response == 0:
 
                 # if they only have gains...
-                if self.design == 'Gains only':
+                if self.structure == 'Gains only':
 
                     # then add the fixed gain to the list
                     self.outcomelist.append('$' + str('{:.2f}'.format(float(self.trialdesign[0]))))
 
                 # if they only have losses...
-                elif self.design == 'Losses only':
+                elif self.structure == 'Losses only':
 
                     # then add the fixed loss to the list
                     self.outcomelist.append('-$' + str('{:.2f}'.format(float(self.trialdesign[0]))))
@@ -540,7 +869,7 @@ class PdParticipant(participant.Participant):
                 actualprob = random.uniform(0.0, 1.0)
 
                 # if they only have gains...
-                if self.design == 'Gains only':
+                if self.structure == 'Gains only':
 
                     # if they win, add the reward
                     if actualprob > float(self.trialdesign[1]):
@@ -551,7 +880,7 @@ class PdParticipant(participant.Participant):
                         self.outcomelist.append(self.outcomelist.append('$0.00'))
 
                 # if they only have losses...
-                elif self.design == 'Losses only':
+                elif self.structure == 'Losses only':
 
                     # if they lose, add the loss
                     if actualprob < float(self.trialdesign[1]):
@@ -625,8 +954,8 @@ class PdParticipant(participant.Participant):
 class CEDParticipant(participant.Participant):
 
     def __init__(self, expid, trials, session, outdir, task, maxrew, outcome, names, version, rounds, buttonbox,
-                 eyetracking, fmri):
-        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, fmri)
+                 eyetracking, fmri, seed=None):
+        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, fmri, seed=seed)
 
         # grab information from what the user entered in the settings
         self.rounds = int(rounds)
@@ -684,6 +1013,19 @@ class CEDParticipant(participant.Participant):
         # attach the task-specific settings to the task general settings
         self.set_settings(dict_simulsettings)
 
+        # declare the trial data columns and their types so the trial store can set them up ahead of time
+        self.set_schema({
+            'trial': int,
+            'left task': str,
+            'left value': str,
+            'right task': str,
+            'right value': str,
+            'onset': float,
+            'full question displayed': float,
+            'response': int,
+            'reaction time': float
+        })
+
         # call the set structure function to set up what order things are presented in
         self.set_structure()
 
@@ -704,9 +1046,8 @@ class CEDParticipant(participant.Participant):
             # list composed of 6 strings for the 6 types of trials
             gainlosscond = ['1-2', '1-3', '1-4', '2-3', '2-4', '3-4']
 
-            # the strings are multiplied so that you end up with a list of strings. Each string appears one sixth of the
-            # time
-            self.order = sum([[s] * n for s, n in zip(gainlosscond, multiplier)], [])
+            # make a random order of the strings. Each string appears one sixth of the time
+            self.order = schedule.Order(self.schedule.sequence(gainlosscond, multiplier))
 
         # if the user wanted the standard CogED
         else:
@@ -720,20 +1061,16 @@ class CEDParticipant(participant.Participant):
             # list composed of 3 strings for the 3 types of trials
             gainlosscond = ['1-2', '1-3', '1-4']
 
-            # the strings are multiplied so that you end up with a list of strings. Each string appears one third of the
-            # time
-            self.order = sum([[s] * n for s, n in zip(gainlosscond, multiplier)], [])
-
-        # shuffle the order
-        random.shuffle(self.order)
+            # make a random order of the strings. Each string appears one third of the time
+            self.order = schedule.Order(self.schedule.sequence(gainlosscond, multiplier))
 
     def set_design_text(self):
         """
         reads what type of trial is next and then sets the trial text accordingly
         """
 
-        # pop a string from the order list to determine what trial is next
-        self.state = self.order.pop()
+        # get the next string from the order to determine what trial is next
+        self.state = self.order.next()
 
         # pick a random integer to figure out which task will be on which side
         self.randomside = random.randint(1, 2)
@@ -1022,21 +1359,20 @@ class CEDParticipant(participant.Participant):
         """
 
         # make a dictionary of trial info
-        df_simultrial = {
-            'trial': [trial],
-            'left task': [self.lefttask],
-            'left value': [self.leftmoney],
-            'right task': [self.righttask],
-            'right value': [self.rightmoney],
-            'onset': [onset],
-            'full question displayed': [fulltime],
-            'response': [response],
-            'reaction time': [time]
+        dict_simultrial = {
+            'trial': trial,
+            'left task': self.lefttask,
+            'left value': self.leftmoney,
+            'right task': self.righttask,
+            'right value': self.rightmoney,
+            'onset': onset,
+            'full question displayed': fulltime,
+            'response': response,
+            'reaction time': time
         }
 
-        # turn that dictionary into a dataframe and use set_performance to add it to the overall dataframe
-        df_simultrial = pd.DataFrame(data=df_simultrial)
-        self.set_performance(df_simultrial)
+        # use set_performance to add the trial to the overall trial data
+        self.set_performance(dict_simultrial)
 
         # only do the following if the user wanted a random reward/loss at the end and the participant responded
         if (self.outcomeopt == 'Yes') & (response != 3):
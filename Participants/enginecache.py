@@ -0,0 +1,217 @@
+from adopy import Engine
+from adopy.functions import get_nearest_grid_index
+from scipy.special import logsumexp
+
+import numpy as np
+import pandas as pd
+
+import hashlib
+import logging
+import os
+import time
+
+# folder where the likelihood tables are kept between sessions
+CACHEDIR = os.path.join(os.path.expanduser('~'), '.TaskMaster', 'enginecache')
+
+# how many different grids to keep on disk before the oldest ones get deleted
+CACHESIZE = 8
+
+# the precisions the engine tables and posterior can be kept in. Single precision (what ADOPy uses by default) halves
+# the memory and the time spent going through the tables; double precision is there to check it against
+PRECISIONS = {'Single': np.float32, 'Double': np.float64}
+
+
+def normalize(log_post):
+    """
+    Normalizes a log posterior so that its probabilities add up to 1. The sum is done in double precision even for a
+    single precision posterior, so that the rounding doesn't build up over the trials of a session
+    :param log_post: array of unnormalized log probabilities
+    :return: array of normalized log probabilities, in the same dtype
+    """
+
+    return (log_post - logsumexp(np.asarray(log_post, dtype=np.float64))).astype(log_post.dtype)
+
+
+class CachedEngine(Engine):
+    """
+    ADOPy engine that keeps its likelihood and entropy tables on disk. Those tables only depend on the grids and the
+    model, so when a participant is run with the same settings as an earlier one, the tables are loaded from the cache
+    instead of being computed again. Any change to the grids, model, or dtype gives a different key, so old tables are
+    never used for a new grid. Grids that won't be used again can skip the cache by giving None for the folder
+    """
+
+    def __init__(self, task, model, grid_design, grid_param, grid_response, noise_ratio=1e-7, dtype=np.float32,
+                 cachedir=CACHEDIR):
+
+        # set up the cache info before the engine computes anything
+        self.cachedir = cachedir
+        self.cachestatus = 'miss'
+        self.cachetime = 0.0
+
+        super().__init__(task, model, grid_design, grid_param, grid_response, noise_ratio, dtype)
+
+    @property
+    def log_lik(self):
+        """
+        Log likelihood for every design, parameter, and response. Loaded from the cache if possible
+        """
+
+        if self._log_lik is None:
+            self.loadtables()
+
+        return self._log_lik
+
+    def get_cachekey(self):
+        """
+        Makes a hash out of everything that the likelihood tables depend on
+        :return: string with the hex digest of the hash
+        """
+
+        hasher = hashlib.sha1()
+
+        # the task, the model, and the settings for the tables
+        hasher.update(type(self.task).__qualname__.encode())
+        hasher.update(type(self.model).__qualname__.encode())
+        hasher.update(repr(self._noise_ratio).encode())
+        hasher.update(np.dtype(self.dtype).str.encode())
+
+        # the names and values of every grid
+        for grid in [self.grid_design, self.grid_param, self.grid_response]:
+
+            hasher.update(repr(list(grid.columns)).encode())
+            hasher.update(pd.util.hash_pandas_object(grid, index=False).values.tobytes())
+
+        return hasher.hexdigest()
+
+    def loadtables(self):
+        """
+        Loads the log likelihood and entropy tables from the cache. If they aren't there (or don't match the grids),
+        they get computed like normal and saved for next time
+        """
+
+        start = time.perf_counter()
+
+        # without a cache, just compute the tables
+        if self.cachedir is None:
+
+            self._log_lik = Engine.log_lik.fget(self)
+            self._ent = Engine.ent.fget(self)
+            self.cachestatus = 'off'
+            self.cachetime = time.perf_counter() - start
+
+            return
+
+        # the folder for this grid
+        folder = os.path.join(self.cachedir, self.get_cachekey())
+
+        # the shapes the tables should have
+        shapes = {'log_lik': (self.n_d, self.n_p, self.n_y), 'ent': (self.n_d, self.n_p)}
+
+        try:
+
+            # memory-map the tables so they don't have to be read in all at once
+            tables = {name: np.load(os.path.join(folder, name + '.npy'), mmap_mode='r') for name in shapes}
+
+            # make sure the tables fit this engine before using them
+            if any(tables[name].shape != shapes[name] for name in shapes):
+                raise ValueError('Cached tables do not match the grids.')
+
+            self._log_lik = tables['log_lik']
+            self._ent = tables['ent']
+            self.cachestatus = 'hit'
+
+            # touch the folder so it counts as recently used
+            os.utime(folder)
+
+        # if the tables aren't there or are broken, compute them and save them
+        except (OSError, ValueError, EOFError):
+
+            self._log_lik = Engine.log_lik.fget(self)
+            self._ent = Engine.ent.fget(self)
+            self.cachestatus = 'miss'
+
+            self.savetables(folder)
+
+        self.cachetime = time.perf_counter() - start
+
+        logging.info('Engine cache ' + self.cachestatus + ' (' + str(round(self.cachetime, 3)) + ' s)')
+
+    def update(self, design, response):
+        """
+        Updates the posterior with a response to a design, the same way the ADOPy engine does, except that the
+        posterior is normalized with normalize so that single precision posteriors stay accurate over a session
+        :param design: dictionary of the design
+        :param response: the response (e.g., 0 or 1 for the choice)
+        """
+
+        # the rows of the tables for the design and the response
+        index = get_nearest_grid_index(pd.Series(design, index=self.task.designs, dtype=self.dtype).values,
+                                       self.grid_design.values)
+        choice = get_nearest_grid_index(pd.Series(response, index=self.task.responses, dtype=self.dtype).values,
+                                        self.grid_response.values)
+
+        self.log_post = normalize(self.log_post + self.log_lik[index, :, choice])
+
+        # everything that depends on the posterior has to be worked out again
+        self._marg_log_lik = None
+        self._ent_marg = None
+        self._ent_cond = None
+        self._mutual_info = None
+
+        self._update_mutual_info()
+
+    def savetables(self, folder):
+        """
+        Saves the tables to the cache folder and deletes the oldest grids if there are too many. If the cache can't be
+        written, the task still runs and the tables are just computed again next time
+        :param folder: the folder for this grid
+        """
+
+        try:
+
+            os.makedirs(folder, exist_ok=True)
+
+            for name, table in [('ent', self._ent), ('log_lik', self._log_lik)]:
+
+                # write to a temporary file first so a crash never leaves half a table behind (named after the process,
+                # so simulations running in parallel don't write to the same one)
+                path = os.path.join(folder, name + '.npy')
+                tmppath = path + '.' + str(os.getpid()) + '.tmp'
+
+                with open(tmppath, 'wb') as file:
+                    np.save(file, table)
+
+                os.replace(tmppath, path)
+
+            self.prunecache(folder)
+
+        except OSError as err:
+
+            logging.info('Could not write the engine cache: ' + str(err))
+
+    def prunecache(self, keep):
+        """
+        Deletes the least recently used grids so that the cache doesn't keep growing
+        :param keep: the folder that was just written, which is never deleted
+        """
+
+        # list the grid folders from most to least recently used
+        folders = [os.path.join(self.cachedir, name) for name in os.listdir(self.cachedir)]
+        folders = sorted([folder for folder in folders if os.path.isdir(folder)], key=os.path.getmtime, reverse=True)
+
+        for folder in folders[CACHESIZE:]:
+
+            if folder == keep:
+                continue
+
+            try:
+
+                for name in os.listdir(folder):
+                    os.remove(os.path.join(folder, name))
+
+                os.rmdir(folder)
+
+            # tables that are still open (e.g., memory-mapped on Windows) can't be deleted yet, so leave them for later
+            except OSError:
+
+                pass
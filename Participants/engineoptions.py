@@ -0,0 +1,13 @@
+# the options the settings windows offer for the tasks with an ADOPy engine. They are kept apart from the engine modules
+# so that the settings windows (which all share them) can be opened without loading adopy and scipy
+
+# the stopping rules that can end the task once the posterior has settled
+STOPRULES = ['None', 'Posterior SD', 'Entropy plateau']
+
+# how much of the last session's posterior goes into the prior by default, as a percent. The stored posterior is raised
+# to this power (a tempered or "power" prior), so the new session starts out less sure than the last one ended
+WEIGHT = 50
+
+# the ways the posterior can be stored: the whole log posterior in half precision, or only the most likely points of
+# the grid (their indices and their log probabilities in half precision)
+FORMATS = ['No', 'Dense', 'Top-k']
@@ -1,18 +1,26 @@
-from Participants import participant
+from Participants import participant, adopyp, choicemodels, enginecache, parallelmi, priors, schedule
 
 from adopy.tasks.cra import *
-from adopy import Engine
 
 import numpy as np
-import pandas as pd
 import random
 
+# how many gain amounts the adaptive RA design has, and the loss multipliers it picks from (as in the random design)
+RAGAINS = 30
+MULTIPLIERS = np.arange(.25, 2, .125)
 
-class ARTTParticipant(participant.Participant):
+# how many gamble amounts the adaptive framing design has, and the gamble probabilities it picks from
+FRAMEREWARDS = 20
+PROBABILITIES = np.round(np.arange(.05, 1, .05), 2)
+
+
+class ARTTParticipant(adopyp.AdoParticipant):
 
     def __init__(self, expid, trials, session, outdir, task, risklist, amblist, rewmin, rewmax, structure, outcome,
-                 money, rounds, buttonbox, eyetracking, fmri):
-        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, fmri)
+                 money, rounds, buttonbox, eyetracking, fmri, precision='Single', stoprule='None', stopthreshold='10',
+                 warmstart='No', priorweight=priors.WEIGHT, snapshotformat='No', seed=None):
+        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, fmri, stoprule, stopthreshold,
+                         warmstart, priorweight, snapshotformat, seed=seed)
 
         # set variables from the user input
         self.rounds = int(rounds)
@@ -20,17 +28,17 @@ class ARTTParticipant(participant.Participant):
         self.outcomeopt = outcome
         self.structure = structure
 
+        # the precision of the engine tables and posterior (a key of enginecache.PRECISIONS)
+        self.precision = precision
+
         # make an empty list to collect the participant's choices if requested
         self.outcomelist = []
 
         # call the create structure function
         self.create_structure()
 
-        # call the create_artt_engine function to create the adopy engine
-        self.engine = self.create_artt_engine(self.task, risklist, amblist, rewmin, rewmax)
-
-        # Compute an optimal design for the first trial
-        self.design = self.engine.get_design('optimal')
+        # call the create_artt_engine function to create the adopy engine and compute the design for the first trial
+        self.start_engine(self.create_artt_engine(self.task, risklist, amblist, rewmin, rewmax))
 
         # Experiment settingsguis output dataframe
         dict_simulsettings = {'Risky Probabilities': [risklist],
@@ -38,12 +46,29 @@ class ARTTParticipant(participant.Participant):
                               'Fixed Reward': [rewmin],
                               'Largest Reward': [rewmax],
                               'Design': [structure],
-                              'Blocks': [rounds]
+                              'Blocks': [rounds],
+                              'Precision': [precision]
                               }
 
         # attach the task-specific settings to the generic settings
         self.set_settings(dict_simulsettings)
 
+        # declare the trial data columns and their types so the trial store can set them up ahead of time
+        self.set_schema({
+            'trial': int,
+            'cond': str,
+            'Proportion Ambiguous': float,
+            'Proportion Risky': float,
+            'Fixed Reward': float,
+            'Variable Reward': float,
+            'onset': float,
+            'response': int,
+            'reaction time': float
+        })
+
+        # the posterior from before every trial's response and where the design came from
+        self.set_schema(self.get_posteriorschema())
+
     def create_structure(self):
         """
         If you want both gains and losses, then it creates a random order for gain and loss questions
@@ -64,12 +89,8 @@ class ARTTParticipant(participant.Participant):
             # list composed of the two strings: gain and loss
             gainlosscond = ['Gain', 'Loss']
 
-            # the strings are multiplied so that you end up with a list of strings. The gain and loss both appear
-            # equally in the list
-            self.order = sum([[s] * n for s, n in zip(gainlosscond, multiplier)], [])
-
-            # shuffle the list so you have a random order
-            random.shuffle(self.order)
+            # make a random order where the gain and loss both appear equally
+            self.order = schedule.Order(self.schedule.sequence(gainlosscond, multiplier))
 
     def create_artt_engine(self, task, risklist, amblist, rewmin, rewmax):
         """
@@ -121,8 +142,10 @@ class ARTTParticipant(participant.Participant):
             'choice': [0, 1]
         }
 
-        # Set up engine
-        engine = Engine(task, model, grid_design, grid_param, grid_response)
+        # Set up engine, loading the likelihood tables from the cache if these settings were used before, and splitting
+        # the mutual information over the design grid across the cores
+        engine = parallelmi.ParallelEngine(task, model, grid_design, grid_param, grid_response,
+                                           dtype=enginecache.PRECISIONS[self.precision])
 
         # return the engine
         return engine
@@ -134,14 +157,17 @@ class ARTTParticipant(participant.Participant):
         :return: a list with the two text strings, the string for the picture, and the
         """
 
+        # pick up the design that the engine worked out during the iti
+        self.collectdesign()
+
         # randomly pick an integer to determine whether blue or red is the reward color
         bluered = random.randint(1, 2)
 
         # if the user wanted gains and losses
         if self.structure == 'Gains and Losses':
 
-            # pop the next trial type out of the order list
-            self.state = self.order.pop()
+            # get the next trial type from the order
+            self.state = self.order.next()
 
             # if the next trial type is gain, then set the strings in a gain frame
             if self.state == 'Gain':
@@ -216,18 +242,6 @@ class ARTTParticipant(participant.Participant):
         # return prompt
         return prompt
 
-    def engineupdate(self, response):
-        """
-        Updates the engine with the response from the participant
-        :param response: 1 or 0 based on if the participant chose the risk/ambiguous trial or not
-        """
-
-        # Update engine with the response and current design
-        self.engine.update(self.design, response)
-
-        # Generate new optimal design based on previous design and response
-        self.design = self.engine.get_design('optimal')
-
     def updateoutput(self, trial, onset, time, response=3):
         """
         Records the stats
@@ -240,27 +254,23 @@ class ARTTParticipant(participant.Participant):
         """
 
         # make dictionary of trial data
-        df_simultrial = {
-            'trial': [trial],
-            'cond': [self.state],
+        dict_simultrial = {
+            'trial': trial,
+            'cond': self.state,
             'Proportion Ambiguous': float(self.design['a_var']),
-            'Proportion Risky': [float(self.design['p_var'])],
-            'Fixed Reward': [self.design['r_fix']],
-            'Variable Reward': [self.design['r_var']],
-            'onset': [onset],
-            'response': [response],
-            'reaction time': [time],
-            'mean_alpha': [self.engine.post_mean[0]],
-            'mean_beta': [self.engine.post_mean[1]],
-            'mean_gamma': [self.engine.post_mean[2]],
-            'sd_alpha': [self.engine.post_sd[0]],
-            'sd_beta': [self.engine.post_sd[1]],
-            'sd_gamma': [self.engine.post_sd[2]]
+            'Proportion Risky': float(self.design['p_var']),
+            'Fixed Reward': self.design['r_fix'],
+            'Variable Reward': self.design['r_var'],
+            'onset': onset,
+            'response': response,
+            'reaction time': time
         }
 
-        # turn dictionary into dataframe and then attach to the rest of the trial info via set_performance
-        df_simultrial = pd.DataFrame(data=df_simultrial)
-        self.set_performance(df_simultrial)
+        # add the latest posterior from the engine
+        dict_simultrial.update(self.get_posteriordata())
+
+        # use set_performance to add the trial to the overall trial data
+        self.set_performance(dict_simultrial)
 
         # only do the following if the user wanted a random reward/loss at the end
         if (self.outcomeopt == 'Yes') & (response != 3):
@@ -437,17 +447,29 @@ class ARTTParticipant(participant.Participant):
         return inst
 
 
-class RAParticipant(participant.Participant):
+class RAParticipant(adopyp.AdoParticipant):
 
     def __init__(self, expid, trials, session, outdir, task, minimum, maximum, outcome, money, rounds, buttonbox,
-                 eyetracking, fmri):
-        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, fmri)
+                 eyetracking, fmri, adaptive='No', precision='Single', stoprule='None', stopthreshold='10',
+                 warmstart='No', priorweight=priors.WEIGHT, snapshotformat='No', seed=None):
+
+        # the stopping rule, warm start, and snapshots only mean something with the engine
+        if adaptive != 'Yes':
+            stoprule, warmstart, snapshotformat = 'None', 'No', 'No'
+
+        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, fmri, stoprule, stopthreshold,
+                         warmstart, priorweight, snapshotformat, seed=seed)
 
         # set variables from the user input
         self.rounds = int(rounds)
         self.startmoney = money
         self.outcomeopt = outcome
 
+        # whether the designs come from an ADOPy engine ('Yes') or are picked at random ('No'), and the precision of the
+        # engine tables and posterior (a key of enginecache.PRECISIONS)
+        self.adaptive = adaptive
+        self.precision = precision
+
         # make an empty list for the trial text
         self.trialtext = []
 
@@ -457,15 +479,36 @@ class RAParticipant(participant.Participant):
         # create the stimuli using the user's minimum and maximum
         self.create_stim(minimum, maximum)
 
+        # create the adopy engine and compute the design for the first trial
+        if self.adaptive == 'Yes':
+            self.start_engine(self.create_ra_engine())
+
         # Experiment settingsguis output dataframe
         dict_simulsettings = {'Minimum Reward': [minimum],
                               'Maximum Reward': [maximum],
-                              'Blocks': [rounds]
+                              'Blocks': [rounds],
+                              'Adaptive design': [adaptive],
+                              'Precision': [precision]
                               }
 
         # attach the task-specific settings to the task general settings
         self.set_settings(dict_simulsettings)
 
+        # declare the trial data columns and their types so the trial store can set them up ahead of time
+        self.set_schema({
+            'trial': int,
+            'gain': str,
+            'loss': str,
+            'certain': int,
+            'onset': float,
+            'response': int,
+            'reaction time': float
+        })
+
+        # the posterior after every trial and where the design came from, with the adaptive design
+        if self.adaptive == 'Yes':
+            self.set_schema(self.get_posteriorschema())
+
     def create_stim(self, minimum, maximum):
         """
         Uses the parameters from the settingsguis input and makes a set of dictionaries for gamble probabilities and
@@ -484,14 +527,55 @@ class RAParticipant(participant.Participant):
         # calls set design text so that there will be something for the first round
         self.set_design_text()
 
+    def create_ra_engine(self):
+        """
+        creates the ADOPy engine for the risk aversion task, with gains over the same range as the random designs and
+        losses that are the gains times the same multipliers
+        :return: adopy engine object
+        """
+
+        # whole dollar gains from the minimum to the maximum (not included, like the random designs)
+        gains = np.unique(np.round(np.linspace(self.gainamounts[0], self.gainamounts[-1], RAGAINS)))
+
+        # every gain goes with every multiplier, so the gain and loss are one design variable together
+        grid_design = {
+            ('r_gain', 'r_loss'): np.array([[gain, gain * multiplier] for gain in gains for multiplier in MULTIPLIERS])
+        }
+
+        # set up a dictionary for the model parameters
+        grid_param = {
+            # 13 points on [.3, 1.5] in a linear scale
+            'rho': np.linspace(.3, 1.5, 13),
+
+            # 17 points on [.25, 4] in a log scale
+            'lam': np.logspace(np.log10(.25), np.log10(4), 17, base=10),
+
+            # 10 points on (0, 5] in a linear scale
+            'mu': np.linspace(0, 5, 11)[1:]
+        }
+
+        # set up a dictionary for the possible participant response (1 is the gamble)
+        grid_response = {
+            'choice': [0, 1]
+        }
+
+        # Set up engine, loading the likelihood tables from the cache if these settings were used before, and splitting
+        # the mutual information over the design grid across the cores
+        return parallelmi.ParallelEngine(choicemodels.TaskRA(), choicemodels.ModelRA(), grid_design, grid_param,
+                                         grid_response, dtype=enginecache.PRECISIONS[self.precision])
+
     def set_design_text(self):
         """
         Gets the actual text used in the design. The sure thing is always zero; the gamble has a possible gain equal to
         a random gain amount and a possible loss that is equal to the random gain amount multiplied by the negative
-        multiplier
+        multiplier. With the adaptive design, the engine picks the design instead (in the background, when the response
+        comes in)
         :return: Creates self.trialdesign
         """
 
+        if self.adaptive == 'Yes':
+            return
+
         self.gainint = random.choice(self.gainamounts)
         self.lossfloat = self.gainint * random.choice(self.multiplieramounts)
 
@@ -501,6 +585,14 @@ class RAParticipant(participant.Participant):
         :return: gain text, loss text for the gamble, as a list
         """
 
+        # with the adaptive design, pick up the design that the engine worked out during the iti
+        if self.adaptive == 'Yes':
+
+            self.collectdesign()
+
+            self.gainint = round(float(self.design['r_gain']), 2)
+            self.lossfloat = round(float(self.design['r_loss']), 2)
+
         # Set up the left string for sure value
         gainstring = '50% chance to win $' + str('{:.2f}'.format(self.gainint))
 
@@ -542,19 +634,22 @@ class RAParticipant(participant.Participant):
         """
 
         # make a dictionary of trial info
-        df_simultrial = {
-            'trial': [trial],
-            'gain': [str('{:.2f}'.format(self.gainint))],
-            'loss': [str('{:.2f}'.format(self.lossfloat))],
-            'certain': [0],
-            'onset': [onset],
-            'response': [response],
-            'reaction time': [time]
+        dict_simultrial = {
+            'trial': trial,
+            'gain': str('{:.2f}'.format(self.gainint)),
+            'loss': str('{:.2f}'.format(self.lossfloat)),
+            'certain': 0,
+            'onset': onset,
+            'response': response,
+            'reaction time': time
         }
 
-        # turns the dictionary into a dataframe and then attaches it to the other trial info via set_performance
-        df_simultrial = pd.DataFrame(data=df_simultrial)
-        self.set_performance(df_simultrial)
+        # add the latest posterior from the engine
+        if self.adaptive == 'Yes':
+            dict_simultrial.update(self.get_posteriordata())
+
+        # use set_performance to add the trial to the overall trial data
+        self.set_performance(dict_simultrial)
 
         # only do the following if the user wanted a random reward/loss at the end
         if (self.outcomeopt == 'Yes') & (response != 3):
@@ -622,21 +717,33 @@ class RAParticipant(participant.Participant):
         return inst
 
 
-class FrameParticipant(participant.Participant):
+class FrameParticipant(adopyp.AdoParticipant):
 
     def __init__(self, expid, trials, session, outdir, task, minimum, maximum, design, ftt, outcome, money, rounds,
-                 buttonbox, eyetracking, fmri):
-        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, fmri)
+                 buttonbox, eyetracking, fmri, adaptive='No', precision='Single', stoprule='None', stopthreshold='10',
+                 warmstart='No', priorweight=priors.WEIGHT, snapshotformat='No', seed=None):
+
+        # the stopping rule, warm start, and snapshots only mean something with the engine
+        if adaptive != 'Yes':
+            stoprule, warmstart, snapshotformat = 'None', 'No', 'No'
+
+        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, fmri, stoprule, stopthreshold,
+                         warmstart, priorweight, snapshotformat, seed=seed)
 
         # set variables from the user input
         self.rounds = int(rounds)
         self.startmoney = float(money)
         self.outcomeopt = outcome
-        self.design = design
+        self.structure = design
         self.ftt = ftt
         self.maxrew = float(maximum)
         self.minrew = float(minimum)
 
+        # whether the designs come from an ADOPy engine ('Yes') or are picked at random ('No'), and the precision of the
+        # engine tables and posterior (a key of enginecache.PRECISIONS)
+        self.adaptive = adaptive
+        self.precision = precision
+
         # make an empty list for the order of trials
         self.order = []
 
@@ -649,23 +756,46 @@ class FrameParticipant(participant.Participant):
         # call the function to set the order of the trials
         self.set_order()
 
+        # create the adopy engine and compute the design for the first trial (the order has to be made first, since the
+        # design has to be in the first trial's frame)
+        if self.adaptive == 'Yes':
+            self.start_engine(self.create_frame_engine())
+
         # Experiment settingsguis output dataframe
         dict_simulsettings = {'Design': [design],
                               'FTT': [ftt],
                               'Minimum Reward': [minimum],
-                              'Maximum Reward': [maximum]
+                              'Maximum Reward': [maximum],
+                              'Adaptive design': [adaptive],
+                              'Precision': [precision]
                               }
 
         # attach the task-specific settings to the task general settings
         self.set_settings(dict_simulsettings)
 
+        # declare the trial data columns and their types so the trial store can set them up ahead of time
+        self.set_schema({
+            'trial': int,
+            'cond': str,
+            'SureAmount': str,
+            'RiskyAmount': str,
+            'RiskyProbability': float,
+            'onset': float,
+            'response': int,
+            'reaction time': float
+        })
+
+        # the posterior after every trial and where the design came from, with the adaptive design
+        if self.adaptive == 'Yes':
+            self.set_schema(self.get_posteriorschema())
+
     def set_order(self):
         """
         sets the structure for the trials depending on if the user wanted the original CogED task or the full one
         """
 
         # if the user wanted gains and losses and the ftt truncations
-        if (self.design == 'Gains and Losses') & (self.ftt == 'Yes'):
+        if (self.structure == 'Gains and Losses') & (self.ftt == 'Yes'):
 
             # divide the number of trials by 6 because there are 6 types of trials
             multnum = int(self.get_trials() / 6)
@@ -681,12 +811,8 @@ class FrameParticipant(participant.Participant):
                          ['Verbatim', 'Loss'],
                          ['Verbatim', 'Gain']]
 
-            # the lists are multiplied so that you end up with a list of lists of strings. Each list appears one sixth
-            # of the trials
-            self.order = sum([[s] * n for s, n in zip(fttglcond, multiplier)], [])
-
-            # randomize the order of things in the list
-            random.shuffle(self.order)
+            # make a random order of the lists of strings. Each list appears one sixth of the trials
+            self.order = schedule.Order(self.schedule.sequence(fttglcond, multiplier))
 
         # if the user wanted FTT tuncations
         elif self.ftt == 'Yes':
@@ -700,12 +826,11 @@ class FrameParticipant(participant.Participant):
             # list composed of 3 strings for the 3 types of trials
             fttcond = ['Gist', 'Mixed', 'Verbatim']
 
-            # the strings are multiplied so that you end up with a list of strings. Each string appears one third of the
-            # time
-            self.order = sum([[s] * n for s, n in zip(fttcond, multiplier)], [])
+            # make a random order of the strings. Each string appears one third of the time
+            self.order = schedule.Order(self.schedule.sequence(fttcond, multiplier))
 
         # if the user didn't want ftt truncations but did want gains and losses
-        elif self.design == 'Gains and Losses':
+        elif self.structure == 'Gains and Losses':
 
             # divide the number of trials by 2 because there are 2 types of trials
             multnum = int(self.get_trials() / 2)
@@ -716,30 +841,101 @@ class FrameParticipant(participant.Participant):
             # list composed of 2 strings for the 2 types of trials
             gainlosscond = ['Gain', 'Loss']
 
-            # the strings are multiplied so that you end up with a list of strings. Each string appears half of the time
-            self.order = sum([[s] * n for s, n in zip(gainlosscond, multiplier)], [])
+            # make a random order of the strings. Each string appears half of the time
+            self.order = schedule.Order(self.schedule.sequence(gainlosscond, multiplier))
 
         # if the user didn't want ftt truncations and only wanted gains
-        elif self.design == 'Gains only':
+        elif self.structure == 'Gains only':
 
-            # multiply the list containing the "gain" string by how many trials there are
-            self.order = ['Gain'] * self.get_trials()
+            # every trial is a "gain" trial
+            self.order = schedule.Order(self.schedule.sequence(['Gain'], [self.get_trials()]))
 
         # if the user didn't want ftt truncations and only wanted losses
         else:
 
-            # multiply the list containing the "loss" string by how many trials there are
-            self.order = ['Loss'] * self.get_trials()
+            # every trial is a "loss" trial
+            self.order = schedule.Order(self.schedule.sequence(['Loss'], [self.get_trials()]))
+
+    def create_frame_engine(self):
+        """
+        creates the ADOPy engine for the framing task. Like the random designs, the sure amount always has the same
+        expected value as the gamble. The framing bias can only be told apart with both gains and losses, so it is kept
+        at 0 otherwise
+        :return: adopy engine object
+        """
+
+        # gamble amounts from the minimum to the maximum, kept to the half dollar
+        amounts = np.unique(np.round(np.linspace(self.minrew, self.maxrew, FRAMEREWARDS) * 2) / 2)
+
+        # the sure amount, gamble amount, and gamble probability are one design variable together, since the sure
+        # amount comes from the other two
+        grid_design = {
+            ('r_sure', 'r_risky', 'p_risky'): np.array([[amount * prob, amount, prob] for amount in amounts
+                                                        for prob in PROBABILITIES]),
+            'frame': [1, -1] if self.structure == 'Gains and Losses' else [1 if self.structure == 'Gains only' else -1]
+        }
+
+        # set up a dictionary for the model parameters
+        grid_param = {
+            # 10 points on [.2, 2] in a linear scale
+            'alpha': np.linspace(.2, 2, 10),
+
+            # 13 points on [-3, 3] in a linear scale, or just 0 without both frames
+            'beta': np.linspace(-3, 3, 13) if self.structure == 'Gains and Losses' else [0],
+
+            # 10 points on (0, 5] in a linear scale
+            'gamma': np.linspace(0, 5, 11)[1:]
+        }
+
+        # set up a dictionary for the possible participant response (1 is the gamble)
+        grid_response = {
+            'choice': [0, 1]
+        }
+
+        # Set up engine, loading the likelihood tables from the cache if these settings were used before, and splitting
+        # the mutual information over the design grid across the cores
+        return parallelmi.ParallelEngine(choicemodels.TaskFrame(), choicemodels.ModelFrame(), grid_design, grid_param,
+                                         grid_response, dtype=enginecache.PRECISIONS[self.precision])
 
-        # randomly shuffle the order
-        random.shuffle(self.order)
+    def get_frame(self, state):
+        """
+        :param state: the trial type from the order
+        :return: 1 for a gain trial or -1 for a loss trial
+        """
+
+        if self.structure == 'Gains and Losses':
+
+            # with the ftt truncations, the trial type is the truncation and the frame
+            if self.ftt == 'Yes':
+                state = state[1]
+
+            return 1 if state == 'Gain' else -1
+
+        return 1 if self.structure == 'Gains only' else -1
+
+    def get_nextframe(self):
+        """
+        With both gains and losses, the engine has to pick the next design out of the next trial's frame
+        :return: 1 or -1 for the frame of the next trial, or None if all of the trials are in the same frame
+        """
+
+        if self.structure != 'Gains and Losses':
+            return None
+
+        state = self.order.peek()
+
+        return None if state is None else self.get_frame(state)
 
     def set_design_text(self):
         """
-        Gets the actual text used in the design
+        Gets the actual text used in the design. With the adaptive design, the engine picks the design instead (in the
+        background, when the response comes in)
         :return: Creates self.trialdesign
         """
 
+        if self.adaptive == 'Yes':
+            return
+
         # pick a random probability ranging from .01 to .99 (inclusive)
         gambleprob = random.uniform(.01, .99)
 
@@ -760,10 +956,19 @@ class FrameParticipant(participant.Participant):
         """
 
         # get the next trial type from the order
-        self.state = self.order.pop()
+        self.state = self.order.next()
+
+        # with the adaptive design, pick up the design that the engine worked out during the iti (in this trial's frame)
+        if self.adaptive == 'Yes':
+
+            self.collectdesign(self.get_frame(self.state))
+
+            # (rounded, since the single precision grid isn't exact)
+            self.trialdesign = [round(float(self.design['r_sure']), 2), round(float(self.design['p_risky']), 2),
+                                round(float(self.design['r_risky']), 2)]
 
         # if you use gains and losses and ftt truncations
-        if (self.design == 'Gains and Losses') & (self.ftt == 'Yes'):
+        if (self.structure == 'Gains and Losses') & (self.ftt == 'Yes'):
 
             # match the trial type that was popped
             match self.state:
@@ -842,7 +1047,7 @@ class FrameParticipant(participant.Participant):
                     rightbottomstring = 'oh'
 
         # if you use ftt truncations but only losses
-        elif (self.ftt == 'Yes') & (self.design == 'Losses only'):
+        elif (self.ftt == 'Yes') & (self.structure == 'Losses only'):
 
             # if it's a gist trial
             if self.state == 'Gist':
@@ -880,7 +1085,7 @@ class FrameParticipant(participant.Participant):
                                     str('{:.2f}'.format(self.trialdesign[2]))
 
         # if you use ftt truncations but only gains
-        elif (self.ftt == 'Yes') & (self.design == 'Gains only'):
+        elif (self.ftt == 'Yes') & (self.structure == 'Gains only'):
 
             # if it's a gist trial
             if self.state == 'Gist':
@@ -979,20 +1184,23 @@ class FrameParticipant(participant.Participant):
         """
 
         # make a dictionary of trial info
-        df_simultrial = {
-            'trial': [trial],
-            'cond': [str(self.state)],
-            'SureAmount': [str('{:.2f}'.format(self.trialdesign[0]))],
-            'RiskyAmount': [str('{:.2f}'.format(self.trialdesign[2]))],
-            'RiskyProbability': [self.trialdesign[1]],
-            'onset': [onset],
-            'response': [response],
-            'reaction time': [time]
+        dict_simultrial = {
+            'trial': trial,
+            'cond': str(self.state),
+            'SureAmount': str('{:.2f}'.format(self.trialdesign[0])),
+            'RiskyAmount': str('{:.2f}'.format(self.trialdesign[2])),
+            'RiskyProbability': self.trialdesign[1],
+            'onset': onset,
+            'response': response,
+            'reaction time': time
         }
 
-        # turn that dictionary into a dataframe and use set_performance to add it to the overall dataframe
-        df_simultrial = pd.DataFrame(data=df_simultrial)
-        self.set_performance(df_simultrial)
+        # add the latest posterior from the engine
+        if self.adaptive == 'Yes':
+            dict_simultrial.update(self.get_posteriordata())
+
+        # use set_performance to add the trial to the overall trial data
+        self.set_performance(dict_simultrial)
 
         # only do the following if the user wanted a random reward/loss at the end
         if (self.outcomeopt == 'Yes') & (response != 'None'):
@@ -1002,13 +1210,13 @@ class FrameParticipant(participant.Participant):
             if response == 0:
 
                 # if they only have gains...
-                if self.design == 'Gains only':
+                if self.structure == 'Gains only':
 
                     # then add the fixed gain to the list
                     self.outcomelist.append('$' + str('{:.2f}'.format(float(self.trialdesign[0]))))
 
                 # if they only have losses...
-                elif self.design == 'Losses only':
+                elif self.structure == 'Losses only':
 
                     # then add the fixed loss to the list
                     self.outcomelist.append('-$' + str('{:.2f}'.format(float(self.trialdesign[0]))))
@@ -1030,7 +1238,7 @@ class FrameParticipant(participant.Participant):
                 actualprob = random.uniform(0.0, 1.0)
 
                 # if they only have gains...
-                if self.design == 'Gains only':
+                if self.structure == 'Gains only':
 
                     # if they win, add the reward
                     if actualprob > float(self.trialdesign[1]):
@@ -1041,7 +1249,7 @@ class FrameParticipant(participant.Participant):
                         self.outcomelist.append(self.outcomelist.append('$0.00'))
 
                 # if they only have losses...
-                elif self.design == 'Losses only':
+                elif self.structure == 'Losses only':
 
                     # if they lose, add the loss
                     if actualprob < float(self.trialdesign[1]):
@@ -0,0 +1,252 @@
+from Participants import trialstore
+
+import numpy as np
+import pandas as pd
+
+import argparse
+import json
+import logging
+import os
+import queue
+import threading
+import xlsxwriter
+
+# the kinds of journal records that aren't trials but get their own sheet of the output (scanner pulses, per-trial
+# gaze summaries, and the intended and actual times of the timer events), and the name of that sheet
+EXTRASHEETS = {'pulse': 'Pulses', 'gaze': 'Gaze', 'timer': 'Timers'}
+
+
+class TrialJournal(object):
+    """
+    Append-only record of a session that is written while the task runs, so that a crash doesn't lose the data. Each
+    line of the file is one JSON record (the settings, the types of newly declared trial columns, or one trial). Records are handed to a background thread that
+    writes and flushes them, so adding a trial never waits on the disk
+    """
+
+    def __init__(self, path):
+
+        # where the journal is written
+        self.path = path
+
+        # records waiting to be written; None tells the writer to stop
+        self.records = queue.Queue()
+
+        # start the background writer
+        self.writer = threading.Thread(target=self.writeloop, daemon=True)
+        self.writer.start()
+
+        # the thread that builds the xlsx output once the journal is closed, if it is
+        self.converter = None
+
+    def write(self, kind, data):
+        """
+        Hands a record to the background writer
+        :param kind: string for the type of record ('settings', 'schema', 'trial', 'end', or one of EXTRASHEETS)
+        :param data: a dictionary with the contents of the record
+        """
+
+        self.records.put({'type': kind, 'data': data})
+
+    def writeloop(self):
+        """
+        Runs in the background thread. Writes records as they come in and flushes them to the disk whenever the queue
+        is empty
+        """
+
+        with open(self.path, 'a', encoding='utf-8') as file:
+
+            while True:
+
+                record = self.records.get()
+
+                # stop once the journal is closed
+                if record is None:
+                    break
+
+                file.write(json.dumps(record, default=tojson) + '\n')
+
+                # only go to the disk once everything that is waiting has been written
+                if self.records.empty():
+
+                    file.flush()
+                    os.fsync(file.fileno())
+
+    def close(self, settings, outputname=None):
+        """
+        Writes the final settings and an end record. With an output name, the xlsx output is then built from the
+        closed journal in another background thread, so the task doesn't wait for it (wait says when it is done).
+        Without one, this waits for the writer to finish
+        :param settings: a dictionary of the session settings
+        :param outputname: string for the path of the xlsx file to build, or None
+        """
+
+        self.write('settings', settings)
+        self.write('end', {})
+
+        self.records.put(None)
+
+        if outputname is None:
+
+            self.writer.join()
+
+            return
+
+        # not a daemon thread, so the program doesn't quit before the output is written
+        self.converter = threading.Thread(target=self.convertloop, args=(outputname,))
+        self.converter.start()
+
+    def convertloop(self, outputname):
+        """
+        Runs in the converting thread. Waits for the last records to be written and builds the xlsx output from them
+        :param outputname: string for the path of the xlsx file
+        """
+
+        self.writer.join()
+
+        try:
+            convert(self.path, outputname)
+
+        except (OSError, ValueError) as err:
+
+            logging.exception(err, exc_info=True)
+            logging.info('Could not write ' + outputname + ', but the journal ' + self.path + ' has the session')
+
+    def wait(self):
+        """
+        Waits for the journal to be written and, if it is being converted, for the xlsx output
+        """
+
+        self.writer.join()
+
+        if self.converter is not None:
+            self.converter.join()
+
+
+def tojson(value):
+    """
+    Converts the values json doesn't know about (e.g., numpy numbers or the adopy task objects)
+    :param value: the value to convert
+    :return: a value json can write
+    """
+
+    if isinstance(value, np.generic):
+        return value.item()
+
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+
+    return str(value)
+
+
+def write_workbook(outputname, df_settings, df_performance, extras=None):
+    """
+    Writes the settings to the first sheet and the trial data to the second sheet of an xlsx file, plus a sheet for
+    each of the extra records there are (e.g., scanner pulses)
+    :param outputname: string for the name of the xlsx file
+    :param df_settings: dataframe of the session settings
+    :param df_performance: dataframe of the trial data
+    :param extras: dictionary of sheet names and lists of record dictionaries, or None
+    """
+
+    # Name an excel file and open it
+    writer = pd.ExcelWriter(outputname, engine='xlsxwriter')
+
+    # Write each dataframe to a different worksheet.
+    df_settings.to_excel(writer, sheet_name='Sheet1')
+    df_performance.to_excel(writer, sheet_name='Sheet2')
+
+    for sheet, records in (extras or {}).items():
+
+        if records:
+            pd.DataFrame(records).to_excel(writer, sheet_name=sheet)
+
+    # Close the Pandas Excel writer and output the Excel file.
+    writer.save()
+
+
+def read_journal(path):
+    """
+    Reads a journal, skipping a last line that was cut off by a crash. The trials go into a trial store in the order
+    they were written, with the columns declared as they were during the task, so the trial data has the same column
+    types and order as the task's own trial store
+    :param path: string for the path to the journal
+    :return: a dictionary of the latest settings, a trial store with the trials, whether the journal was closed, and a
+    dictionary of sheet names and lists of the extra records
+    """
+
+    settings = {}
+    trials = trialstore.TrialStore()
+    complete = False
+    extras = {sheet: [] for sheet in EXTRASHEETS.values()}
+
+    with open(path, encoding='utf-8') as file:
+
+        for line in file:
+
+            try:
+                record = json.loads(line)
+
+            # a line that was only partly written when the task crashed
+            except ValueError:
+                continue
+
+            if record['type'] == 'settings':
+                settings = record['data']
+
+            elif record['type'] == 'schema':
+                trials.declare({name: trialstore.TYPES[kind] for name, kind in record['data'].items()})
+
+            elif record['type'] == 'trial':
+                trials.append(record['data'])
+
+            elif record['type'] in EXTRASHEETS:
+                extras[EXTRASHEETS[record['type']]].append(record['data'])
+
+            elif record['type'] == 'end':
+                complete = True
+
+    return settings, trials, complete, extras
+
+
+def convert(path, outputname, note=False):
+    """
+    Builds the xlsx output from a journal
+    :param path: string for the path to the journal
+    :param outputname: string for the name of the xlsx file
+    :param note: whether to add a setting that says if the journal was closed (for recovered sessions)
+    """
+
+    settings, trials, complete, extras = read_journal(path)
+
+    # add a note on whether the session finished
+    if note:
+        settings['Journal complete'] = complete
+
+    write_workbook(outputname, pd.DataFrame({name: [value] for name, value in settings.items()}),
+                   trials.to_dataframe(), extras)
+
+
+def recover(path, outputname=None):
+    """
+    Rebuilds the xlsx output from a journal, e.g., after the program crashed before the task was over
+    :param path: string for the path to the journal
+    :param outputname: string for the name of the xlsx file. By default, the journal name ending in _recovered.xlsx
+    :return: the name of the xlsx file that was written
+    """
+
+    if outputname is None:
+        outputname = os.path.splitext(path)[0] + '_recovered.xlsx'
+
+    convert(path, outputname, True)
+
+    return outputname
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Rebuild the xlsx output of a session from its trial journal.')
+    parser.add_argument('journal', help='path to the _journal.jsonl file')
+    parser.add_argument('output', nargs='?', default=None, help='name of the xlsx file to write')
+    args = parser.parse_args()
+
+    print('Wrote ' + recover(args.journal, args.output))
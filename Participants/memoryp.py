@@ -1,14 +1,13 @@
 from Participants import participant
 
-import pandas as pd
 import random
 import string
 
 
 class PrParticipant(participant.Participant):
 
-    def __init__(self, expid, trials, session, outdir, task, design, stt, eyetracking):
-        super().__init__(expid, trials, session, outdir, task, eyetracking)
+    def __init__(self, expid, trials, session, outdir, task, design, stt, eyetracking, seed=None):
+        super().__init__(expid, trials, session, outdir, task, eyetracking, seed=seed)
 
         # if the user requested an STT design
         if stt == 'Yes':
@@ -145,13 +144,13 @@ class PrParticipant(participant.Participant):
 
     def updateoutput(self):
         """
-        this function just makes a dataframe of the word pairs and updates the corresponding existing dataframe
+        this function just makes a row out of the word pairs and adds it to the trial data
         :return:
         """
 
-        df_simultrial = pd.DataFrame(data=self.expwordpairs)
+        dict_simultrial = {word: pair[0] for word, pair in self.expwordpairs.items()}
 
-        self.set_performance(df_simultrial)
+        self.set_performance(dict_simultrial)
 
     def get_instructions(self, instint):
         """
@@ -240,8 +239,8 @@ class PrParticipant(participant.Participant):
 
 class NbParticipant(participant.Participant):
 
-    def __init__(self, expid, trials, session, outdir, task, rounds, buttonbox, eyetracking):
-        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking)
+    def __init__(self, expid, trials, session, outdir, task, rounds, buttonbox, eyetracking, seed=None):
+        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, seed=seed)
 
         # extract the number of blocks from user input
         self.rounds = int(rounds)
@@ -262,6 +261,16 @@ class NbParticipant(participant.Participant):
         # attach the task-specific settings to the task general settings
         self.set_settings(dict_simulsettings)
 
+        # declare the trial data columns and their types so the trial store can set them up ahead of time
+        self.set_schema({
+            'trial': int,
+            'letter': str,
+            'onset': float,
+            'response': int,
+            'reaction time': float,
+            'correct': int
+        })
+
     def nextround(self, roundsdone):
 
         # calculate how well the participant did by dividing total score by total trials
@@ -383,18 +392,17 @@ class NbParticipant(participant.Participant):
         self.roundsumcorrect += correct
 
         # make a dictionary of trial info
-        df_simultrial = {
-            'trial': [trial],
-            'letter': [self.backlist[-1]],
-            'onset': [onset],
-            'response': [response],
-            'reaction time': [time],
-            'correct': [correct]
+        dict_simultrial = {
+            'trial': trial,
+            'letter': self.backlist[-1],
+            'onset': onset,
+            'response': response,
+            'reaction time': time,
+            'correct': correct
         }
 
-        # turn that dictionary into a dataframe and use set_performance to add it to the overall dataframe
-        df_simultrial = pd.DataFrame(data=df_simultrial)
-        self.set_performance(df_simultrial)
+        # use set_performance to add the trial to the overall trial data
+        self.set_performance(dict_simultrial)
 
     def get_instructions(self, instint):
         """
@@ -1,17 +1,16 @@
-from Participants import participant
+from Participants import participant, schedule
 
-import pandas as pd
 import random
 
 
 class NACTParticipant(participant.Participant):
 
-    def __init__(self, expid, session, outdir, task, hightrials, lowtrials, money, buttonbox, eyetracking):
+    def __init__(self, expid, session, outdir, task, hightrials, lowtrials, money, buttonbox, eyetracking, seed=None):
 
         # the total number of trials is equal to the sum of the low and high trials
         trials = lowtrials + hightrials
 
-        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking)
+        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, seed=seed)
 
         # either green or red is chosen as the high-value color
         self.highcolor = random.choice(['Green', 'Red'])
@@ -32,6 +31,9 @@ class NACTParticipant(participant.Participant):
         # set the variable for how much starting money the participant has
         self.startmoney = float(money)
 
+        # the next trial's pictures, value color, and signal, if they were made ahead of time (None otherwise)
+        self.nexttrial = None
+
         # call the set_design function with the number of low and high trials
         self.set_design(hightrials, lowtrials)
 
@@ -47,6 +49,19 @@ class NACTParticipant(participant.Participant):
         # send the task-specific dictionary to be added to the generic task settings
         self.set_settings(dict_simulsettings)
 
+        # declare the trial data columns and their types so the trial store can set them up ahead of time
+        self.set_schema({
+            'trial': int,
+            'onset time': float,
+            'part': int,
+            'value color': str,
+            'signal': str,
+            'response': int,
+            'reaction time': float,
+            'correct': int,
+            'money remaining': float
+        })
+
     def set_design(self, high, low):
         """
         takes in the number of high and low trials and creates a list of strings that represents which trials are high-
@@ -61,15 +76,12 @@ class NACTParticipant(participant.Participant):
         # list composed of the number of high-value trials and number of low-value trials
         multiplier = [high, low]
 
-        # the strings are multiplied so that you end up with a list of strings. The name of the low-value color appears
-        # however many low-value trials were requested, and vice versa
-        self.piclist = sum([[s] * n for s, n in zip(trialtypes, multiplier)], [])
+        # make a random order of the trial types for both parts. The name of the low-value color appears however many
+        # low-value trials were requested, and vice versa
+        self.picorder = schedule.Order(self.schedule.table(trialtypes, multiplier, 2))
 
-        # copy this list to a new variable so that it can be copied again in the future
-        self.picorder = list(self.piclist)
-
-        # randomize the order of things in the list
-        random.shuffle(self.picorder)
+        # pick how long each trial lasts, between 1.2 and 1.5 seconds
+        self.jitters = schedule.Order(self.schedule.integers(1200, 1500, (2, high + low)))
 
     def nextround(self):
         """
@@ -88,9 +100,9 @@ class NACTParticipant(participant.Participant):
         # otherwise...
         else:
 
-            # grab the list of pictures and then randomize the order
-            self.picorder = list(self.piclist)
-            random.shuffle(self.picorder)
+            # move on to this part's order of trial types and trial lengths
+            self.picorder.startblock(self.part - 1)
+            self.jitters.startblock(self.part - 1)
 
             # tell the participant to wait for instruction
             prompt = 'Please wait for the researcher to read you the instructions'
@@ -98,12 +110,38 @@ class NACTParticipant(participant.Participant):
         # return the prompt
         return prompt
 
+    def get_jitter(self):
+        """
+        Get how long the next trial lasts
+        :return: integer for the length of the trial in milliseconds
+        """
+
+        return self.jitters.next()
+
     def get_trial_pic(self):
         """
-        technically a setter and getter. depending on the part of the task, you'll generate something different
+        technically a setter and getter. Starts the next trial with the pictures that were made ahead of time (or makes
+        them now if they weren't)
         :return: randomized list of picture strings to the gui so that the pictures appear on screen
         """
 
+        # make the trial now if the gui didn't ask for it ahead of time
+        if self.nexttrial is None:
+            self.prepare_trial()
+
+        # the value color and signal of the trial are now the ones the participant is seeing
+        pics, self.trialvalue, self.signalnumber = self.nexttrial
+        self.nexttrial = None
+
+        return pics
+
+    def prepare_trial(self):
+        """
+        Makes the next trial ahead of time (so the gui can put its pictures together during the iti) without changing
+        the trial that is on screen. depending on the part of the task, you'll generate something different
+        :return: randomized list of picture strings for the next trial
+        """
+
         # have a list of all possible colors (not including the high and low value colors)
         colors = ['White', 'Purple', 'Yellow', 'Orange', 'Teal', 'Blue']
 
@@ -116,11 +154,11 @@ class NACTParticipant(participant.Participant):
         # set a string that is equal to the prefix for all pictures
         prefix = 'NACT_'
 
-        # pop the value, which determines whether the trial will include the high or low value color
-        self.trialvalue = self.picorder.pop()
+        # get the next value, which determines whether the trial will include the high or low value color
+        trialvalue = self.picorder.next()
 
         # randomly pick whether the signal will have a horizontal or vertical line
-        self.signalnumber = random.randint(1, 2)
+        signalnumber = random.randint(1, 2)
 
         if self.part == 1:
             # In part one, we need everything to be circles, and the high or low value color will always be the
@@ -138,7 +176,7 @@ class NACTParticipant(participant.Participant):
             random.shuffle(pics)
 
             # get a string to represent the signal picture
-            signalstring = prefix + 's' + self.trialvalue + 'Cir' + str(self.signalnumber)
+            signalstring = prefix + 's' + trialvalue + 'Cir' + str(signalnumber)
 
             # generate a random integer that will be used to pic a random distractor so that you can...
             signalplace = random.randint(0, 5)
@@ -178,7 +216,7 @@ class NACTParticipant(participant.Participant):
                 signalshape = 'Cir'
 
             # get a string to represent the signal picture
-            signalstring = prefix + 's' + signalcolor + signalshape + str(self.signalnumber)
+            signalstring = prefix + 's' + signalcolor + signalshape + str(signalnumber)
 
             # generate a random integer that will be used to pic a random distractor so that you can...
             signalplace = random.randint(0, 4)
@@ -188,12 +226,15 @@ class NACTParticipant(participant.Participant):
 
             # add in a distractor that has the high or low value color
             valuedistractornumber = str(random.randint(1, 2))
-            valuedistractorstring = prefix + 'd' + self.trialvalue + shape + valuedistractornumber
+            valuedistractorstring = prefix + 'd' + trialvalue + shape + valuedistractornumber
             pics.append(valuedistractorstring)
 
         # shuffle the list of picture strings
         random.shuffle(pics)
 
+        # hold on to the trial until it is started
+        self.nexttrial = [pics, trialvalue, signalnumber]
+
         # return the pictures
         return pics
 
@@ -266,23 +307,20 @@ class NACTParticipant(participant.Participant):
             feedbackstring = '+'
 
         # create a dictionary of the trial info so that you can update the overall performance dataframe
-        df_simultrial = {
-            'trial': [trial],
-            'onset time': [onset],
-            'part': [self.part],
-            'value color': [self.trialvalue],
-            'signal': [stimstring],
-            'response': [response],
-            'reaction time': [rt],
-            'correct': [correct],
-            'money remaining': [self.startmoney]
+        dict_simultrial = {
+            'trial': trial,
+            'onset time': onset,
+            'part': self.part,
+            'value color': self.trialvalue,
+            'signal': stimstring,
+            'response': response,
+            'reaction time': rt,
+            'correct': correct,
+            'money remaining': self.startmoney
         }
 
-        # turn the dictionary into a dataframe
-        df_simultrial = pd.DataFrame(data=df_simultrial)
-
-        # update the overall performance dataframe
-        self.set_performance(df_simultrial)
+        # use set_performance to add the trial to the overall trial data
+        self.set_performance(dict_simultrial)
 
         # return the string for the iti
         return feedbackstring
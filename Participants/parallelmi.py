@@ -0,0 +1,276 @@
+from Participants import enginecache
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from scipy.special import logsumexp
+
+import numpy as np
+
+import os
+import weakref
+
+# how many workers split up the design grid (every core by default) and which kind of pool they are in. Threads share
+# the tables for free and numpy lets go of the GIL for the heavy parts; processes get the tables through shared memory
+WORKERS = os.cpu_count() or 1
+BACKEND = 'thread'
+
+# grids with fewer cells than this (designs x parameters x responses) are done in one go, since splitting them up costs
+# more than it saves
+MINSIZE = 200000
+
+# the pools, made the first time they are needed and shared by every engine, keyed by backend and number of workers
+POOLS = {}
+
+# in the worker processes, the tables they have already attached to, keyed by the shared memory name or file
+ATTACHED = {}
+
+
+def get_pool(backend, workers):
+    """
+    Gets the pool for a backend and number of workers, making it if it doesn't exist yet
+    :param backend: string, 'thread' or 'process'
+    :param workers: integer for the number of workers
+    :return: the pool
+    """
+
+    key = (backend, workers)
+
+    if key not in POOLS:
+
+        if backend == 'process':
+            POOLS[key] = ProcessPoolExecutor(max_workers=workers)
+
+        else:
+            POOLS[key] = ThreadPoolExecutor(max_workers=workers)
+
+    return POOLS[key]
+
+
+def get_chunks(count, workers):
+    """
+    Splits the rows of the design grid into one chunk per worker
+    :param count: integer for the number of designs
+    :param workers: integer for the number of workers
+    :return: list of (start, stop) tuples
+    """
+
+    edges = np.linspace(0, count, min(workers, count) + 1).astype(int)
+
+    return [(start, stop) for start, stop in zip(edges[:-1], edges[1:]) if stop > start]
+
+
+def marginal_chunk(log_lik, log_post, start, stop):
+    """
+    The marginal log likelihood of each response for some of the designs, the same way the engine does it for all of them
+    :param log_lik: the log likelihood table (designs x parameters x responses)
+    :param log_post: the log posterior of each parameter value
+    :param start: integer for the first design
+    :param stop: integer for the design after the last one
+    :return: array of designs x responses
+    """
+
+    return logsumexp(log_lik[start:stop] + log_post.reshape(1, -1, 1), axis=1)
+
+
+def conditional_chunk(ent, post, start, stop):
+    """
+    The conditional entropy for some of the designs, the same way the engine does it for all of them
+    :param ent: the entropy table (designs x parameters)
+    :param post: the posterior of each parameter value
+    :param start: integer for the first design
+    :param stop: integer for the design after the last one
+    :return: array with one value per design
+    """
+
+    return np.einsum('p,dp->d', post, ent[start:stop])
+
+
+def attach(source):
+    """
+    Runs in a worker process. Gets the tables of an engine without copying them: memory-mapped cache files are opened
+    again, and tables in shared memory are attached to by name
+    :param source: dictionary from SharedTables.get_source
+    :return: dictionary with the log likelihood and entropy tables
+    """
+
+    key = source['key']
+
+    if key not in ATTACHED:
+
+        tables = {}
+
+        for name, info in source['tables'].items():
+
+            if info['kind'] == 'file':
+                tables[name] = np.load(info['path'], mmap_mode='r')
+
+            else:
+
+                block = shared_memory.SharedMemory(name=info['name'])
+                tables[name] = np.ndarray(info['shape'], dtype=info['dtype'], buffer=block.buf)
+
+                # keep the block open for as long as the array is used
+                tables[name + ' block'] = block
+
+        ATTACHED[key] = tables
+
+    return ATTACHED[key]
+
+
+def marginal_process(source, log_post, start, stop):
+    """
+    Runs in a worker process: marginal_chunk on the shared log likelihood table
+    """
+
+    return marginal_chunk(attach(source)['log_lik'], log_post, start, stop)
+
+
+def conditional_process(source, post, start, stop):
+    """
+    Runs in a worker process: conditional_chunk on the shared entropy table
+    """
+
+    return conditional_chunk(attach(source)['ent'], post, start, stop)
+
+
+class SharedTables(object):
+    """
+    Makes an engine's tables available to worker processes. Tables that are memory-mapped from the engine cache are
+    shared through the file (the operating system keeps one copy in memory for every process); anything else is copied
+    once into a shared memory block
+    """
+
+    def __init__(self, tables):
+
+        self.source = {'key': None, 'tables': {}}
+        self.blocks = []
+
+        for name, table in tables.items():
+
+            if isinstance(table, np.memmap) and (table.filename is not None):
+                self.source['tables'][name] = {'kind': 'file', 'path': table.filename}
+
+            else:
+
+                table = np.ascontiguousarray(table)
+
+                block = shared_memory.SharedMemory(create=True, size=max(table.nbytes, 1))
+                np.ndarray(table.shape, dtype=table.dtype, buffer=block.buf)[...] = table
+
+                self.blocks.append(block)
+                self.source['tables'][name] = {'kind': 'memory', 'name': block.name, 'shape': table.shape,
+                                               'dtype': table.dtype.str}
+
+        self.source['key'] = repr(sorted((name, sorted(info.items())) for name, info in self.source['tables'].items()))
+
+        # free the shared memory once these tables are gone
+        self.finalizer = weakref.finalize(self, SharedTables.release, self.blocks)
+
+    @staticmethod
+    def release(blocks):
+        """
+        Closes and frees shared memory blocks
+        :param blocks: list of shared memory blocks
+        """
+
+        for block in blocks:
+
+            block.close()
+            block.unlink()
+
+
+def marginal(engine, log_post):
+    """
+    The marginal log likelihood for every design under a posterior, split across the engine's workers if it has them
+    :param engine: adopy engine object
+    :param log_post: the log posterior of each parameter value
+    :return: array of designs x responses
+    """
+
+    if not isinstance(engine, ParallelEngine):
+        return marginal_chunk(engine.log_lik, log_post, 0, engine.n_d)
+
+    return engine.split(marginal_chunk, marginal_process, engine.log_lik, log_post)
+
+
+def conditional(engine, post):
+    """
+    The conditional entropy for every design under a posterior, split across the engine's workers if it has them
+    :param engine: adopy engine object
+    :param post: the posterior of each parameter value
+    :return: array with one value per design
+    """
+
+    if not isinstance(engine, ParallelEngine):
+        return conditional_chunk(engine.ent, post, 0, engine.n_d)
+
+    return engine.split(conditional_chunk, conditional_process, engine.ent, post)
+
+
+class ParallelEngine(enginecache.CachedEngine):
+    """
+    Cached ADOPy engine that works out the mutual information of the designs in chunks of the design grid, one chunk per
+    worker. Every chunk is computed exactly the way the engine would compute it, so the designs it picks are the same
+    """
+
+    def __init__(self, task, model, grid_design, grid_param, grid_response, noise_ratio=1e-7, dtype=np.float32,
+                 cachedir=enginecache.CACHEDIR, workers=None, backend=None):
+
+        # set up the workers before the engine computes the mutual information for the first time
+        self.workers = WORKERS if workers is None else workers
+        self.backend = BACKEND if backend is None else backend
+        self.shared = None
+
+        super().__init__(task, model, grid_design, grid_param, grid_response, noise_ratio, dtype, cachedir)
+
+    def split(self, chunkfunction, processfunction, table, vector):
+        """
+        Runs a computation over chunks of the design grid on the workers and puts the chunks back together
+        :param chunkfunction: the function that computes a chunk from the table (for threads)
+        :param processfunction: the function that computes a chunk from the shared tables (for processes)
+        :param table: the table the computation goes over
+        :param vector: the posterior (log or not) that goes with it
+        :return: the result for every design
+        """
+
+        # small grids or a single worker aren't worth splitting up
+        if (self.workers < 2) | (table.size < MINSIZE):
+            return chunkfunction(table, vector, 0, self.n_d)
+
+        pool = get_pool(self.backend, self.workers)
+        chunks = get_chunks(self.n_d, self.workers)
+
+        if self.backend == 'process':
+
+            # share the tables with the worker processes the first time they are needed
+            if self.shared is None:
+                self.shared = SharedTables({'log_lik': self.log_lik, 'ent': self.ent})
+
+            futures = [pool.submit(processfunction, self.shared.source, vector, start, stop) for start, stop in chunks]
+
+        else:
+            futures = [pool.submit(chunkfunction, table, vector, start, stop) for start, stop in chunks]
+
+        return np.concatenate([future.result() for future in futures])
+
+    @property
+    def marg_log_lik(self):
+        """
+        Marginal log likelihood for every design and response, computed in chunks
+        """
+
+        if self._marg_log_lik is None:
+            self._marg_log_lik = marginal(self, self.log_post)
+
+        return self._marg_log_lik
+
+    @property
+    def ent_cond(self):
+        """
+        Conditional entropy for every design, computed in chunks
+        """
+
+        if self._ent_cond is None:
+            self._ent_cond = conditional(self, self.post)
+
+        return self._ent_cond
@@ -1,14 +1,13 @@
-from adopy.tasks.dd import *
-from adopy.tasks.cra import *
+from Participants import trialstore, journal, schedule
 
 import pandas as pd
 
 import os
-import xlsxwriter
 
 
 class Participant(object):
-    def __init__(self, expid, trials, session, outdir, task, buttonbox='No', eyetrack='No', fmri='No'):
+
+    def __init__(self, expid, trials, session, outdir, task, buttonbox='No', eyetrack='No', fmri='No', seed=None):
 
         # set up keys depending on buttonbox option
         if buttonbox == 'Yes':
@@ -28,18 +27,45 @@ class Participant(object):
         self.task = task
         self.session = session
 
+        # the seeded schedule that the trial orders come from; no seed gives a new one every session, and the seed saved
+        # in an earlier output runs the exact same session again
+        self.schedule = schedule.Schedule(seed)
+
         # Experiment settingsguis output dataframe
         self.dict_settings = {
             'Participant ID': [self.expid],
             'Task': [self.task],
             'Session': [self.task],
-            'Number of trials': [self.trials]
+            'Number of trials': [self.trials],
+            'Schedule seed': [self.schedule.seed]
         }
 
         self.df_settings = pd.DataFrame(self.dict_settings)
 
-        # Task Performance
-        self.df_performance = pd.DataFrame()
+        # Task Performance, kept column by column until the output is written
+        self.performance = trialstore.TrialStore()
+
+        # timing info that the gui recorded for the current trial (e.g., key timestamps), added to the trial's row
+        self.timing = {}
+
+        # the scanner pulses that the gui recorded in fmri mode, one dictionary per pulse, the gaze summaries of the
+        # eyetracker, one dictionary per trial, and the timer events, one dictionary per event
+        self.pulses = []
+        self.gaze = []
+        self.timers = []
+
+        # the trial journal, which is started with the first trial (once all of the settings are in), and the journal
+        # that the xlsx output is being built from once the task is over
+        self.journal = None
+        self.closedjournal = None
+
+        # functions that get called with the participant class once the task is over and the output is written (e.g.,
+        # so the battery runner can move on to the next task)
+        self.finished = []
+
+        # functions that get called with the participant class once the task is over, right before the output is
+        # written (e.g., so the last block's gaze summaries make it into the output)
+        self.ending = []
 
     def get_trials(self):
         """
@@ -63,88 +89,256 @@ class Participant(object):
             )
         )
 
+    def set_schema(self, schema):
+        """
+        Takes a dictionary of the task's trial data columns and their types and sets up the trial store with them, so
+        that the columns are allocated once instead of on every trial. The new columns also go in the journal (once it
+        has been started), so the xlsx output built from it gets the same column types and order
+        :param schema: a dictionary with column names as keys and int, float, or str as values
+        """
+
+        new = {name: kind for name, kind in schema.items() if name not in self.performance.columns}
+
+        if not new:
+            return
+
+        self.performance.declare(new)
+
+        if self.journal is not None:
+            self.journal.write('schema', {name: kind.__name__ for name, kind in new.items()})
+
     def set_performance(self, append):
         """
-        Takes a dictionary of trial data, converts it to a pandas dataframe, and then appends it to the existing pandas
-        dataframe that holds the data for all of the trials (and starts out empty)
+        Takes a dictionary of trial data (one value per column) and adds it as a row to the trial store that holds the
+        data for all of the trials (and starts out empty)
         :param append: a dictionary of trial data
         """
 
-        self.df_performance = pd.concat(
-            [
-                self.df_performance, append
-            ]
-        )
+        # add any timing info the gui recorded for this trial and then clear it for the next trial
+        append = {**append, **self.timing}
+        self.timing = {}
 
-    def output(self):
+        self.performance.append(append)
+
+        # write the trial to the journal in the background, starting the journal if needed (there is no journal for
+        # practice sessions or for simulated sessions without an output directory)
+        if (self.session not in ['Practice', 'practice']) & (self.outdir is not None):
+
+            self.startjournal()
+            self.journal.write('trial', append)
+
+    def startjournal(self):
         """
-        First, the function looks to see if this is a practice session. If so, then there's no output from this trial.
-        Next, if this is not a practice session, then we make a string to represent the task, which we will later use
-        when making the string to name the output file. Next, we change directories to where the user chose to save the
-        data and put together the ID, task string, and session name to make the name of the output xlsx file. We then
-        name and open that excel file, put the settings info on the first sheet and the trial data on the second sheet,
-        and then save, close, and output that file.
+        Starts the trial journal with the settings, if it hasn't been started yet
         """
 
-        # If you are in a practice session, skip all of this and don't give any output
-        if self.session not in ['Practice', 'practice']:
+        if self.journal is not None:
+            return
+
+        self.journal = journal.TrialJournal(self.get_journalname())
+        self.journal.write('settings', self.df_settings.iloc[0].to_dict())
+
+        # the trial columns that were declared so far, with their types
+        self.journal.write('schema', {name: kind.__name__ for name, kind in self.performance.types.items()})
+
+        # along with any scanner pulses, gaze summaries, or timer events that came in before the first trial was done
+        for pulse in self.pulses:
+            self.journal.write('pulse', pulse)
+
+        for summary in self.gaze:
+            self.journal.write('gaze', summary)
+
+        for event in self.timers:
+            self.journal.write('timer', event)
+
+    def set_pulse(self, append):
+        """
+        Takes a dictionary of info about a scanner pulse from the gui and keeps it for the pulse sheet of the output
+        (and in the journal, once it has been started)
+        :param append: a dictionary of pulse info
+        """
+
+        self.pulses.append(append)
+
+        if self.journal is not None:
+            self.journal.write('pulse', append)
+
+    def set_gaze(self, summaries):
+        """
+        Takes the gaze summaries of a block's trials from the gui and keeps them for the gaze sheet of the output (and
+        in the journal, once it has been started)
+        :param summaries: a list of dictionaries, one per trial
+        """
+
+        self.gaze.extend(summaries)
+
+        if self.journal is not None:
+
+            for summary in summaries:
+                self.journal.write('gaze', summary)
+
+    def set_timer(self, append):
+        """
+        Takes a dictionary of info about a timer event from the gui (the block and trial it belongs to, and when it was
+        supposed to happen and did) and keeps it for the timer sheet of the output (and in the journal, once it has
+        been started)
+        :param append: a dictionary of timer event info
+        """
+
+        self.timers.append(append)
 
-            # Look at what is in self.task and create an appropriate string to represent the task in the output file
-            match self.task:
+        if self.journal is not None:
+            self.journal.write('timer', append)
 
-                case TaskDD():
-                    taskstr = 'DD'
+    def set_timing(self, append):
+        """
+        Takes a dictionary of timing info for the current trial from the gui and holds on to it until the trial is added
+        with set_performance
+        :param append: a dictionary of timing info, with times in seconds (or milliseconds for raw event timestamps)
+        """
+
+        # make sure the timing columns are float columns, so trials without them (e.g., timeouts) are just left blank
+        self.set_schema({name: float for name in append})
+
+        self.timing.update(append)
+
+    def get_taskstr(self):
+        """
+        Makes a string to represent the task in the names of the output files
+        :return: string for the task
+        """
+
+        # the ADOPy tasks are task objects instead of strings, so go by their class name (that way adopy only gets
+        # imported by the tasks that use it)
+        task = self.task if isinstance(self.task, str) else type(self.task).__name__
+
+        # Look at what is in self.task and create an appropriate string to represent the task in the output file
+        match task:
+
+            case 'TaskDD':
+                taskstr = 'DD'
+
+            case 'Probability Discounting':
+                taskstr = 'PD'
+
+            case 'CogED Task':
+                taskstr = 'CEDT'
 
-                case 'Probability Discounting':
-                    taskstr = 'PD'
+            case 'TaskCRA':
+                taskstr = 'ARTT'
 
-                case 'CogED Task':
-                    taskstr = 'CEDT'
+            case 'Risk Aversion':
+                taskstr = 'RA'
 
-                case TaskCRA():
-                    taskstr = 'ARTT'
+            case 'Framing Task':
+                taskstr = 'Framing'
 
-                case 'Risk Aversion':
-                    taskstr = 'RA'
+            case 'Beads Task':
+                taskstr = 'Beads'
 
-                case 'Framing Task':
-                    taskstr = 'Framing'
+            case 'Perceptual Bias Task':
+                taskstr = 'PBT'
 
-                case 'Beads Task':
-                    taskstr = 'Beads'
+            case 'Negative Attention Capture Task':
+                taskstr = 'NACT'
 
-                case 'Perceptual Bias Task':
-                    taskstr = 'PBT'
+            case 'Stop-Signal Task':
+                taskstr = 'SS'
 
-                case 'Negative Attention Capture Task':
-                    taskstr = 'NACT'
+            case 'Emo Go/No-Go':
+                taskstr = 'EGNG'
 
-                case 'Stop-Signal Task':
-                    taskstr = 'SS'
+            case 'Go/No-Go':
+                taskstr = 'GNG'
 
-                case 'Emo Go/No-Go':
-                    taskstr = 'EGNG'
+            case 'Pair Recall Memory':
+                taskstr = 'PR'
 
-                case 'Go/No-Go':
-                    taskstr = 'GNG'
+            case '1-back':
+                taskstr = self.task
 
-                case 'Pair Recall Memory':
-                    taskstr = 'PR'
+            case '2-back':
+                taskstr = self.task
 
-                case '1-back':
-                    taskstr = self.task
+            case '3-back':
+                taskstr = self.task
 
-                case '2-back':
-                    taskstr = self.task
+            case '4-back':
+                taskstr = self.task
 
-                case '3-back':
-                    taskstr = self.task
+            case _:
+                taskstr = ''
 
-                case '4-back':
-                    taskstr = self.task
+        return taskstr
+
+    def wait_output(self):
+        """
+        Waits for the xlsx output to be built, if it is being built
+        """
+
+        if self.closedjournal is not None:
+            self.closedjournal.wait()
+
+    def get_journalname(self):
+        """
+        Puts together the ID, task string, and session name to make the path of the trial journal. If there is already
+        a journal with that name (e.g., from a run that crashed), a number is added so that it doesn't get added to
+        :return: string for the path of the journal in the output directory
+        """
+
+        return self.get_sessionfile('_journal', '.jsonl')
+
+    def get_gazename(self):
+        """
+        Makes the path of the file the eyetracker's samples are spooled to, numbered like the journal
+        :return: string for the path of the spool file in the output directory, or None if there is no output
+        """
+
+        if (self.session in ['Practice', 'practice']) | (self.outdir is None):
+            return None
+
+        return self.get_sessionfile('_gaze', '.bin.gz')
+
+    def get_sessionfile(self, suffix, extension):
+        """
+        Puts together the ID, task string, and session name to make the path of a file that is written during the
+        session, adding a number if there is already one with that name
+        :param suffix: string for what the file is (e.g., '_journal')
+        :param extension: string for the file extension (e.g., '.jsonl')
+        :return: string for the path of the file in the output directory
+        """
+
+        base = os.path.join(self.outdir, self.expid + '_' + self.get_taskstr() + '_' + self.session + suffix)
+
+        path = base + extension
+        count = 1
+
+        while os.path.exists(path):
+
+            count += 1
+            path = base + str(count) + extension
+
+        return path
+
+    def output(self):
+        """
+        First, the function looks to see if this is a practice session. If so, then there's no output from this trial.
+        Next, if this is not a practice session, then we make a string to represent the task, which we will later use
+        when making the string to name the output file. Next, we change directories to where the user chose to save the
+        data and put together the ID, task string, and session name to make the name of the output xlsx file. We then
+        close the trial journal, which builds the xlsx file from the journal (settings on the first sheet and trial data
+        on the second sheet) in the background, so the end of the task doesn't wait on it. wait_output waits for it.
+        """
+
+        # let anything that still has data for the output add it
+        for callback in self.ending:
+            callback(self)
+
+        # If you are in a practice session, skip all of this and don't give any output
+        if self.session not in ['Practice', 'practice']:
 
-                case _:
-                    taskstr = ''
+            # get a string to represent the task in the output file
+            taskstr = self.get_taskstr()
 
             # change to the output directory
             os.chdir(self.outdir)
@@ -152,12 +346,15 @@ class Participant(object):
             # Make the string to name the output file
             outputname = self.expid + '_' + taskstr + '_' + self.session + '.xlsx'
 
-            # Name an excel file and open it
-            writer = pd.ExcelWriter(outputname, engine='xlsxwriter')
+            # a session that ended before its first trial still gets a journal, so the output always comes from it
+            self.startjournal()
 
-            # Write each dataframe to a different worksheet.
-            self.df_settings.to_excel(writer, sheet_name='Sheet1')
-            self.df_performance.to_excel(writer, sheet_name='Sheet2')
+            # mark the journal as complete and build the excel file from it (settings, trial data, the timer events,
+            # and the scanner pulses and gaze summaries if there were any) in the background
+            self.journal.close(self.df_settings.iloc[0].to_dict(), os.path.join(self.outdir, outputname))
+            self.closedjournal = self.journal
+            self.journal = None
 
-            # Close the Pandas Excel writer and output the Excel file.
-            writer.save()
+        # let anything that is waiting for the task to end know that it is over
+        for callback in self.finished:
+            callback(self)
@@ -1,13 +1,12 @@
-from Participants import participant
+from Participants import participant, schedule
 
-import pandas as pd
 import random
 
 
 class PBTParticipant(participant.Participant):
 
-    def __init__(self, expid, trials, session, outdir, task, rounds, buttonbox, eyetracking):
-        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking)
+    def __init__(self, expid, trials, session, outdir, task, rounds, buttonbox, eyetracking, seed=None):
+        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, seed=seed)
 
         # number of rounds equals what the user put in
         self.rounds = int(rounds)
@@ -27,6 +26,17 @@ class PBTParticipant(participant.Participant):
         # send the task-specific dictionary to be added to the generic task settings
         self.set_settings(dict_simulsettings)
 
+        # declare the trial data columns and their types so the trial store can set them up ahead of time
+        self.set_schema({
+            'trial': int,
+            'block': str,
+            'picture': str,
+            'onset': float,
+            'response': str,
+            'reaction time': float,
+            'correct': int
+        })
+
     def set_design(self, trials):
         """
         takes in the number of trials and creates a list of strings that is then randomized so that you get the final
@@ -43,15 +53,8 @@ class PBTParticipant(participant.Participant):
         # list composed of the 4 strings, one for each picture
         picturenames = ['PBT_DCC.png', 'PBT_DCS.png', 'PBT_DSC.png', 'PBT_DSS.png']
 
-        # the strings are multiplied so that you end up with a list of strings. Each picture appears one quarter of the
-        # trials
-        self.piclist = sum([[s] * n for s, n in zip(picturenames, multiplier)], [])
-
-        # copy this list to a new variable so that it can be copied again in the future
-        self.picorder = list(self.piclist)
-
-        # randomize the order of things in the list
-        random.shuffle(self.picorder)
+        # make a random order of the pictures for every round. Each picture appears one quarter of the trials
+        self.picorder = schedule.Order(self.schedule.table(picturenames, multiplier, self.rounds))
 
     def nextround(self, blocks):
         """
@@ -69,11 +72,8 @@ class PBTParticipant(participant.Participant):
         # if there are still more blocks to do...
         else:
 
-            # set the trial order to the list of pictures
-            self.picorder = list(self.piclist)
-
-            # randomize the order
-            random.shuffle(self.picorder)
+            # move on to this round's order of pictures
+            self.picorder.startblock(blocks)
 
             # if this is not the first block...
             if blocks > 0:
@@ -99,7 +99,7 @@ class PBTParticipant(participant.Participant):
         :return: the picture that was popped
         """
 
-        pic = self.picorder.pop()
+        pic = self.picorder.next()
 
         return pic
 
@@ -153,19 +153,18 @@ class PBTParticipant(participant.Participant):
                     correct = 1
 
         # make a dictionary of trial info
-        df_simultrial = {
-            'trial': [trial],
-            'block': [self.globallocal],
-            'picture': [pic],
-            'onset': [onset],
-            'response': [response],
-            'reaction time': [time],
-            'correct': [correct]
+        dict_simultrial = {
+            'trial': trial,
+            'block': self.globallocal,
+            'picture': pic,
+            'onset': onset,
+            'response': response,
+            'reaction time': time,
+            'correct': correct
         }
 
-        # set the dictionary to a dataframe and use set_performance to attach it to previous trial dataframes
-        df_simultrial = pd.DataFrame(data=df_simultrial)
-        self.set_performance(df_simultrial)
+        # use set_performance to add the trial to the overall trial data
+        self.set_performance(dict_simultrial)
 
     def get_instructions(self, block_type, instint):
         """
@@ -0,0 +1,215 @@
+from Participants import enginecache, engineoptions
+
+import numpy as np
+
+import glob
+import json
+import os
+import time
+
+# the end of the file names of the stored posteriors, which are saved next to the xlsx output
+SUFFIX = '_posterior.npz'
+
+# how much of the last session's posterior goes into the prior by default, as a percent
+WEIGHT = engineoptions.WEIGHT
+
+# how far below the most likely point (in log probability) a point of a new grid can be when a stored posterior is moved
+# onto it, so no part of the new grid is ruled out for good
+FLOOR = 30
+
+
+def get_path(outdir, expid, taskstr, session):
+    """
+    :param outdir: string for the output directory
+    :param expid: string for the participant ID
+    :param taskstr: string for the task in the output file names
+    :param session: string for the session name
+    :return: string for the path of the stored posterior of a session
+    """
+
+    return os.path.join(outdir, expid + '_' + taskstr + '_' + session + SUFFIX)
+
+
+def is_logspaced(levels):
+    """
+    :param levels: sorted array of the different values of a parameter in a grid
+    :return: boolean for whether the values are positive and have the same ratio between neighbours (e.g., k in DD)
+    """
+
+    return (len(levels) > 2) and np.all(levels > 0) and np.allclose(np.diff(np.log(levels)),
+                                                                    np.log(levels[1] / levels[0]))
+
+
+def save(path, engine, expid, taskstr, session):
+    """
+    Stores an engine's posterior compactly: the log posterior in single precision and the parameter grid it is over,
+    compressed. Written to a temporary file first so a crash never leaves half a file behind
+    :param path: string for the file
+    :param engine: adopy engine object
+    :param expid: string for the participant ID
+    :param taskstr: string for the task in the output file names
+    :param session: string for the session name
+    """
+
+    info = {'expid': expid, 'task': taskstr, 'session': session, 'saved': time.time(),
+            'params': list(engine.model.params)}
+
+    tmppath = path + '.' + str(os.getpid()) + '.tmp'
+
+    with open(tmppath, 'wb') as file:
+        np.savez_compressed(file, log_post=np.asarray(engine.log_post, dtype=np.float32),
+                            grid=engine.grid_param[info['params']].values.astype(np.float64), info=json.dumps(info))
+
+    os.replace(tmppath, path)
+
+
+def load(path):
+    """
+    Reads a stored posterior
+    :param path: string for the file
+    :return: dictionary with the log posterior, the parameter grid, and the info about the session it came from
+    """
+
+    with np.load(path) as stored:
+        return {'log_post': stored['log_post'].astype(np.float64), 'grid': stored['grid'],
+                'info': json.loads(str(stored['info']))}
+
+
+def find_previous(outdir, expid, taskstr, session):
+    """
+    Finds the most recent stored posterior of the same participant and task from a different session
+    :param outdir: string for the output directory
+    :param expid: string for the participant ID
+    :param taskstr: string for the task in the output file names
+    :param session: string for the session that is starting (its own file is skipped)
+    :return: string for the path of the stored posterior, or None if there isn't one
+    """
+
+    if (outdir is None) or (not os.path.isdir(outdir)):
+        return None
+
+    found = []
+
+    for path in glob.glob(os.path.join(glob.escape(outdir), glob.escape(expid + '_' + taskstr + '_') + '*' + SUFFIX)):
+
+        try:
+            info = load(path)['info']
+
+        # skip files that are broken or aren't stored posteriors
+        except (OSError, ValueError, KeyError):
+            continue
+
+        # the glob can also match other IDs or tasks with underscores in them, so check what the file says
+        if (info['expid'] == expid) & (info['task'] == taskstr) & (info['session'] != session):
+            found.append([info['saved'], path])
+
+    if len(found) == 0:
+        return None
+
+    return max(found)[1]
+
+
+def get_weights(oldlevels, newlevels):
+    """
+    Works out how the probability on one parameter's stored levels is spread over the new levels. Where the new levels
+    are finer than the stored ones, the probability is interpolated between the stored levels; where they are coarser
+    (e.g., a refined grid going back onto the full grid), each stored level's probability goes to the nearest new level.
+    Log spaced parameters are compared on the log scale
+    :param oldlevels: sorted array of the stored levels
+    :param newlevels: sorted array of the new levels
+    :return: array of new levels x stored levels
+    """
+
+    if (len(oldlevels) == 1) | (len(newlevels) == 1):
+        return np.ones([len(newlevels), len(oldlevels)])
+
+    if is_logspaced(oldlevels) and np.all(newlevels > 0):
+
+        oldlevels = np.log(oldlevels)
+        newlevels = np.log(newlevels)
+
+    weights = np.zeros([len(newlevels), len(oldlevels)])
+
+    # finer: interpolate (the ends of the stored levels carry on past them)
+    if np.median(np.diff(newlevels)) < np.median(np.diff(oldlevels)):
+
+        for index in range(len(oldlevels)):
+            weights[:, index] = np.interp(newlevels, oldlevels, np.eye(len(oldlevels))[index])
+
+    # coarser: move each stored level's probability to the nearest new level
+    else:
+
+        nearest = np.abs(newlevels[:, np.newaxis] - oldlevels[np.newaxis, :]).argmin(axis=0)
+        weights[nearest, np.arange(len(oldlevels))] = 1
+
+    return weights
+
+
+def project(stored, engine):
+    """
+    Puts a stored log posterior on an engine's parameter grid. The grids are usually the same, in which case the values
+    are used as they are. Otherwise (e.g., after the adaptive DD grid was refined), the posterior is moved onto the new
+    grid one parameter at a time with get_weights, and no point is left with less than FLOOR below the most likely one,
+    so that the new session can still move away from the last one
+    :param stored: dictionary from load
+    :param engine: adopy engine object
+    :return: array of log probabilities, one for each point of the engine's parameter grid (not normalized)
+    """
+
+    grid = engine.grid_param[stored['info']['params']].values.astype(np.float64)
+    old = stored['grid']
+
+    if (grid.shape == old.shape) and np.allclose(grid, old):
+        return stored['log_post']
+
+    oldlevels = [np.unique(old[:, column]) for column in range(old.shape[1])]
+    newlevels = [np.unique(grid[:, column]) for column in range(grid.shape[1])]
+
+    # the stored probabilities as an array with one dimension per parameter
+    probabilities = np.zeros([len(levels) for levels in oldlevels])
+    probabilities[tuple(np.searchsorted(oldlevels[column], old[:, column]) for column in range(old.shape[1]))] = \
+        np.exp(stored['log_post'] - stored['log_post'].max())
+
+    # move each dimension onto the new levels
+    for column in range(old.shape[1]):
+
+        weights = get_weights(oldlevels[column], newlevels[column])
+        probabilities = np.moveaxis(np.tensordot(weights, np.moveaxis(probabilities, column, 0), axes=1), 0, column)
+
+    projected = probabilities[tuple(np.searchsorted(newlevels[column], grid[:, column])
+                                    for column in range(grid.shape[1]))]
+
+    with np.errstate(divide='ignore'):
+        projected = np.log(projected)
+
+    return np.maximum(projected, projected.max() - FLOOR)
+
+
+def temper(log_post, weight=WEIGHT):
+    """
+    Turns a stored log posterior into a prior by raising it to a power and normalizing it
+    :param log_post: array of log probabilities on the engine's grid
+    :param weight: how much of the stored posterior to keep, as a percent (100 uses it as it is)
+    :return: array of normalized log probabilities
+    """
+
+    return enginecache.normalize(np.asarray(log_post, dtype=np.float64) * (float(weight) / 100))
+
+
+def set_prior(engine, log_prior):
+    """
+    Starts an engine over from a new prior. Only the tables that depend on the posterior are worked out again, so the
+    likelihood tables are kept
+    :param engine: adopy engine object
+    :param log_prior: array of normalized log probabilities on the engine's parameter grid
+    """
+
+    engine.log_prior = np.asarray(log_prior).astype(engine.dtype)
+    engine.log_post = np.copy(engine.log_prior)
+
+    engine._marg_log_lik = None
+    engine._ent_marg = None
+    engine._ent_cond = None
+    engine._mutual_info = None
+
+    engine._update_mutual_info()
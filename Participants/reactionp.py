@@ -1,13 +1,12 @@
-from Participants import participant
+from Participants import participant, schedule
 
-import pandas as pd
 import random
 
 
 class SSParticipant(participant.Participant):
 
-    def __init__(self, expid, trials, session, outdir, task, maxrt, blocks, buttonbox, eyetracking):
-        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking)
+    def __init__(self, expid, trials, session, outdir, task, maxrt, blocks, buttonbox, eyetracking, seed=None):
+        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, seed=seed)
 
         # set the defaults based on user input
         self.blocks = int(blocks)
@@ -29,9 +28,21 @@ class SSParticipant(participant.Participant):
         # attach the task-specific settings to the task general settings
         self.set_settings(dict_simulsettings)
 
+        # declare the trial data columns and their types so the trial store can set them up ahead of time
+        self.set_schema({
+            'trial': int,
+            'signal': int,
+            'signal timer': int,
+            'left or right': str,
+            'onset': float,
+            'response': int,
+            'reaction time': float,
+            'correct': int
+        })
+
     def set_structure(self):
         """
-        Sets up the main picture list and copies and shuffles that for the first block's order
+        Sets up the picture order and the signal trials for every block ahead of time
         """
 
         # divide the number of trials by 2 because there are 2 types of trials
@@ -43,14 +54,11 @@ class SSParticipant(participant.Participant):
         # list composed of 2 strings for the 2 types of trials
         picturenames = ['SS_LeftArrow.png', 'SS_RightArrow.png']
 
-        # the strings are multiplied so that you end up with a list of strings. Each string appears half of the time
-        self.piclist = sum([[s] * n for s, n in zip(picturenames, multiplier)], [])
-
-        # copy the original picture list to get a new order for the block
-        self.picorder = list(self.piclist)
+        # make a random order of the pictures for each block, with each picture appearing half of the time
+        self.picorder = schedule.Order(self.schedule.table(picturenames, multiplier, self.blocks))
 
-        # shuffle the new order
-        random.shuffle(self.picorder)
+        # pick which trials will be signal trials (each trial has a 50% chance of being one)
+        self.signals = schedule.Order(self.schedule.integers(0, 1, (self.blocks, self.get_trials())))
 
     def nextround(self, blocks):
         """
@@ -67,11 +75,9 @@ class SSParticipant(participant.Participant):
         # if there are still blocks to be completed...
         else:
 
-            # copy the original picture list to get a new order for the block
-            self.picorder = list(self.piclist)
-
-            # shuffle the new order
-            random.shuffle(self.picorder)
+            # move on to the next block's picture order and signal trials
+            self.picorder.startblock(blocks)
+            self.signals.startblock(blocks)
 
             # tell the participant to wait for instructions
             prompt = 'Please wait for the researcher to read you the instructions.'
@@ -81,14 +87,22 @@ class SSParticipant(participant.Participant):
 
     def get_trial_pic(self):
         """
-        Pop a picture name from the overall order
-        :return: the picture that was popped
+        Get the next picture name from the block's order
+        :return: the picture for the trial
         """
 
-        pic = self.picorder.pop()
+        pic = self.picorder.next()
 
         return pic
 
+    def get_signal(self):
+        """
+        Get whether the next trial is a signal trial
+        :return: 1 for a signal trial, 0 otherwise
+        """
+
+        return self.signals.next()
+
     def set_timer(self, signal, correct):
         """
         adjusts the timer for when the signal occurs depending on the performance of the participant on signal trials
@@ -191,20 +205,19 @@ class SSParticipant(participant.Participant):
         picstripped = pic.removeprefix('SS_').removesuffix('Arrow.png')
 
         # make a dictionary of trial info
-        df_simultrial = {
-            'trial': [trial],
-            'signal': [signal],
-            'signal timer': [self.timer],
-            'left or right': [picstripped],
-            'onset': [onset],
-            'response': [response],
-            'reaction time': [time],
-            'correct': [correct]
+        dict_simultrial = {
+            'trial': trial,
+            'signal': signal,
+            'signal timer': self.timer,
+            'left or right': picstripped,
+            'onset': onset,
+            'response': response,
+            'reaction time': time,
+            'correct': correct
         }
 
-        # turn that dictionary into a dataframe and use set_performance to add it to the overall dataframe
-        df_simultrial = pd.DataFrame(data=df_simultrial)
-        self.set_performance(df_simultrial)
+        # use set_performance to add the trial to the overall trial data
+        self.set_performance(dict_simultrial)
 
         # call the set_timer function to adjust the signal timer based on the participant's performance
         self.set_timer(signal, correct)
@@ -273,8 +286,8 @@ class SSParticipant(participant.Participant):
 class EGNGParticipant(participant.Participant):
 
     def __init__(self, expid, trials, session, outdir, task, blocks, happy, sad, angry, fear, buttonbox,
-                 eyetracking):
-        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking)
+                 eyetracking, seed=None):
+        super().__init__(expid, trials, session, outdir, task, buttonbox, eyetracking, seed=seed)
 
         # set how many blocks are needed and set the blocks done to 0
         self.blocks = int(blocks)
@@ -301,11 +314,8 @@ class EGNGParticipant(participant.Participant):
             self.structlist.append('Fearful')
             self.structlist.append('FearfulRev')
 
-        # copy the original list to get an order for the task
-        self.blocktypes = list(self.structlist)
-
-        # shuffle the order
-        random.shuffle(self.blocktypes)
+        # make a random order of the rounds for every block
+        self.blocktypes = schedule.Order(self.schedule.table(self.structlist, [1] * len(self.structlist), self.blocks))
 
         # Experiment settingsguis output dataframe
         dict_simulsettings = {
@@ -316,6 +326,17 @@ class EGNGParticipant(participant.Participant):
         # attach the task-specific settings to the task general settings
         self.set_settings(dict_simulsettings)
 
+        # declare the trial data columns and their types so the trial store can set them up ahead of time
+        self.set_schema({
+            'trial': int,
+            'block type': str,
+            'picture': str,
+            'onset': float,
+            'response': int,
+            'reaction time': float,
+            'correct': int
+        })
+
     def set_structure(self, block):
         """
         Takes in a string to describe the block about to occur and then sets up a list of strings
@@ -380,15 +401,12 @@ class EGNGParticipant(participant.Participant):
         # set a list of integers for the number of trials that the neutral pictures and emotional pictures will get
         multiplier = [neutralnum, emonum]
 
-        # the strings are multiplied so that you end up with a list of strings. Depending on the type of block, one type
-        # of pictures will appear 3/4 of the time; the other, 1/4 of the time
-        self.piclist = sum([[s] * n for s, n in zip(self.piclist, multiplier)], [])
-
-        # copy the original picture list to get a new order for the block
-        self.picorder = list(self.piclist)
+        # make a random order of the pictures. Depending on the type of block, one type of pictures will appear 3/4 of
+        # the time; the other, 1/4 of the time
+        self.picorder = schedule.Order(self.schedule.sequence(self.piclist, multiplier))
 
-        # shuffle the new order
-        random.shuffle(self.picorder)
+        # pick which of the 12 faces is shown on each trial
+        self.facenumbers = schedule.Order(self.schedule.integers(1, 12, self.get_trials()))
 
     def nextround(self):
         """
@@ -405,8 +423,8 @@ class EGNGParticipant(participant.Participant):
         # if there are still rounds to go in this block...
         if len(self.blocktypes) > 0:
 
-            # pop the next round
-            self.blocktype = self.blocktypes.pop()
+            # get the next round
+            self.blocktype = self.blocktypes.next()
 
             # set the structure for that round
             self.set_structure(self.blocktype)
@@ -450,9 +468,8 @@ class EGNGParticipant(participant.Participant):
             # if there are still more blocks to go...
             else:
 
-                # copy the list of rounds to a new list of rounds and then shuffle it
-                self.blocktypes = list(self.structlist)
-                random.shuffle(self.blocktypes)
+                # move on to the next block's order of rounds
+                self.blocktypes.startblock(self.blocksdone)
 
                 # tell the participant that another block is starting
                 prompt = 'You will now repeat the task you just completed.\nPress \"G\".'
@@ -469,11 +486,11 @@ class EGNGParticipant(participant.Participant):
 
     def get_trial_pic(self):
         """
-        Pop a picture name from the overall order
-        :return: the picture that was popped
+        Get the next picture name from the round's order, along with the face number
+        :return: the file name of the picture for the trial
         """
 
-        pic = self.picorder.pop()
+        pic = self.picorder.next() + str(self.facenumbers.next()) + '.png'
 
         return pic
 
@@ -581,19 +598,18 @@ class EGNGParticipant(participant.Participant):
         picstripped = pic.removeprefix('EGNG_')
 
         # make a dictionary of trial info
-        df_simultrial = {
-            'trial': [trial],
-            'block type': [self.blocktype],
-            'picture': [picstripped],
-            'onset': [onset],
-            'response': [response],
-            'reaction time': [time],
-            'correct': [correct]
+        dict_simultrial = {
+            'trial': trial,
+            'block type': self.blocktype,
+            'picture': picstripped,
+            'onset': onset,
+            'response': response,
+            'reaction time': time,
+            'correct': correct
         }
 
-        # turn that dictionary into a dataframe and use set_performance to add it to the overall dataframe
-        df_simultrial = pd.DataFrame(data=df_simultrial)
-        self.set_performance(df_simultrial)
+        # use set_performance to add the trial to the overall trial data
+        self.set_performance(dict_simultrial)
 
     def get_instructions(self, instint):
         """
@@ -0,0 +1,223 @@
+import numpy as np
+
+# how many shuffles are checked at once when an order has a run-length limit, and how many times that is tried
+BATCHSIZE = 64
+BATCHES = 50
+
+
+class Schedule(object):
+    """
+    Makes the trial orders for a session with a seeded numpy random generator, so the whole session is set up front
+    and the same seed always gives the same session. Orders can be limited so that no condition shows up more than a
+    certain number of times in a row
+    """
+
+    def __init__(self, seed=None):
+
+        # if there isn't a seed, make one from the operating system's entropy so it can be saved with the settings
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+    def table(self, conditions, counts, blocks=1, maxrun=None):
+        """
+        Makes a table of conditions with one row per block. Every row has each condition as many times as its count,
+        in a different random order
+        :param conditions: a list of the conditions (strings, numbers, or lists)
+        :param counts: a list of integers for how many times each condition appears in a block
+        :param blocks: integer for the number of blocks (rows)
+        :param maxrun: integer for the most times a condition can appear in a row, or None for no limit
+        :return: a 2d numpy array of conditions
+        """
+
+        # put the conditions into an object array so lists and strings stay as they are
+        labels = np.empty(len(conditions), dtype=object)
+
+        for index, condition in enumerate(conditions):
+            labels[index] = condition
+
+        # one block is the index of each condition repeated as many times as it appears
+        block = np.repeat(np.arange(len(conditions)), counts)
+
+        # make sure the run-length limit can be met at all
+        if (maxrun is not None) & (len(block) > 0):
+
+            largest = max(counts)
+
+            if largest > maxrun * (len(block) - largest + 1):
+                raise ValueError('No order of these conditions has runs of ' + str(maxrun) + ' or less.')
+
+        return labels[np.array([self.shuffle(block, maxrun) for _ in range(blocks)]).reshape(blocks, len(block))]
+
+    def sequence(self, conditions, counts, maxrun=None):
+        """
+        Makes a single random order of conditions
+        :param conditions: a list of the conditions
+        :param counts: a list of integers for how many times each condition appears
+        :param maxrun: integer for the most times a condition can appear in a row, or None for no limit
+        :return: a 1d numpy array of conditions
+        """
+
+        return self.table(conditions, counts, 1, maxrun)[0]
+
+    def integers(self, low, high, shape):
+        """
+        Draws random integers, e.g., for jitters
+        :param low: the lowest integer
+        :param high: the highest integer (inclusive)
+        :param shape: integer or tuple for the shape of the array
+        :return: a numpy array of integers
+        """
+
+        return self.rng.integers(low, high, shape, endpoint=True)
+
+    def shuffle(self, block, maxrun=None):
+        """
+        Shuffles one block. With a run-length limit, a batch of shuffles is made at once and the first one that meets
+        the limit is used
+        :param block: a 1d numpy array of condition indexes
+        :param maxrun: integer for the most times a condition can appear in a row, or None for no limit
+        :return: the shuffled block
+        """
+
+        if (maxrun is None) or (len(block) <= maxrun):
+            return self.rng.permutation(block)
+
+        for _ in range(BATCHES):
+
+            candidates = self.rng.permuted(np.tile(block, (BATCHSIZE, 1)), axis=1)
+            fine = ~longruns(candidates, maxrun)
+
+            if fine.any():
+                return candidates[np.argmax(fine)]
+
+        # tight limits rarely come out of a plain shuffle, so build the order one trial at a time instead
+        return self.build(block, maxrun)
+
+    def build(self, block, maxrun):
+        """
+        Builds an order one trial at a time, picking each trial from the conditions that are left (weighted by how many
+        are left) but skipping any condition that just had a full run
+        :param block: a 1d numpy array of condition indexes
+        :param maxrun: integer for the most times a condition can appear in a row
+        :return: the ordered block
+        """
+
+        counts = np.bincount(block)
+
+        for _ in range(BATCHES * BATCHSIZE):
+
+            left = counts.copy()
+            order = np.empty(len(block), dtype=block.dtype)
+            run = 0
+
+            for position in range(len(block)):
+
+                weights = left.astype(float)
+
+                # don't allow the condition that just had a full run
+                if run == maxrun:
+                    weights[order[position - 1]] = 0
+
+                if weights.sum() == 0:
+                    break
+
+                pick = self.rng.choice(len(weights), p=weights / weights.sum())
+
+                # keep track of how long the current run is
+                if (position > 0) and (order[position - 1] == pick):
+                    run += 1
+
+                else:
+                    run = 1
+
+                order[position] = pick
+                left[pick] -= 1
+
+            else:
+                return order
+
+        raise ValueError('Could not find an order with runs of ' + str(maxrun) + ' or less.')
+
+
+class Order(object):
+    """
+    A schedule table that a participant class steps through. The table has one row per block and the participant asks
+    for the next trial's value (instead of popping items off of a list) and moves to another row when a block starts
+    """
+
+    def __init__(self, table):
+
+        # make sure there is always a block dimension
+        self.table = table.reshape(1, -1) if table.ndim == 1 else table
+
+        # the current block (row) and trial (column)
+        self.block = 0
+        self.position = 0
+
+    def __len__(self):
+        """
+        :return: the number of trials left in the current block
+        """
+
+        return self.table.shape[1] - self.position
+
+    def next(self):
+        """
+        Gets the value for the next trial in the block
+        :return: the value
+        """
+
+        value = self.table[self.block, self.position]
+        self.position += 1
+
+        # give back plain python values
+        if isinstance(value, np.generic):
+            value = value.item()
+
+        return value
+
+    def peek(self):
+        """
+        Looks at the value for the next trial in the block without moving on to it
+        :return: the value, or None if the block is done
+        """
+
+        if self.position >= self.table.shape[1]:
+            return None
+
+        value = self.table[self.block, self.position]
+
+        # give back plain python values
+        if isinstance(value, np.generic):
+            value = value.item()
+
+        return value
+
+    def startblock(self, block):
+        """
+        Moves to the start of a block
+        :param block: integer for the block (row) to start, counting from 0
+        """
+
+        self.block = block
+        self.position = 0
+
+
+def longruns(table, maxrun):
+    """
+    Checks every row of a table for runs that are longer than the limit
+    :param table: a 2d numpy array
+    :param maxrun: integer for the most times a value can appear in a row
+    :return: a 1d boolean array that is True for the rows that have a run longer than maxrun
+    """
+
+    # a run longer than maxrun means maxrun trials in a row that are the same as the trial before them
+    same = table[:, 1:] == table[:, :-1]
+
+    if same.shape[1] < maxrun:
+        return np.zeros(len(table), dtype=bool)
+
+    return np.lib.stride_tricks.sliding_window_view(same, maxrun, axis=1).all(axis=2).any(axis=1)
@@ -0,0 +1,1045 @@
+from adopy.tasks.dd import TaskDD
+from adopy.tasks.cra import TaskCRA
+
+from Participants import adopyp, discountp, enginecache, gamblep, memoryp, nactp, pbtp, reactionp
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import argparse
+import functools
+import random
+import time
+
+
+class Agent(object):
+    """
+    Simulated participant that picks a response and a reaction time for every trial, so that a participant class can
+    be run without a window or a person at the keyboard. This agent picks the left or right key at random; the other
+    agents respond like a model with known parameters, so that the estimates can be checked against the truth
+    """
+
+    def __init__(self, rtmean=0.8, rtsd=0.2, seed=None):
+
+        # reaction times are drawn from a normal distribution (cut off at 100 ms so they are never impossibly fast)
+        self.rtmean = rtmean
+        self.rtsd = rtsd
+
+        # the agent's own random number generator, so that a seed gives the same answers every time
+        self.rng = np.random.default_rng(seed)
+
+    def get_params(self):
+        """
+        :return: a dictionary of the agent's true parameters, which gets added to the simulation results
+        """
+
+        return {}
+
+    def get_rt(self):
+        """
+        Draws a reaction time
+        :return: float for the reaction time in seconds
+        """
+
+        return max(0.1, float(self.rng.normal(self.rtmean, self.rtsd)))
+
+    def respond(self, person, correct=None, go=True):
+        """
+        Picks the response for a trial
+        :param person: the participant class running the task
+        :param correct: 0 or 1 for the correct key, or None if the agent doesn't know (e.g., choice tasks)
+        :param go: whether the trial is one the agent should respond to at all
+        :return: the response (0 for the left key, 1 for the right key, or None for no response) and the reaction time
+        """
+
+        return int(self.rng.integers(0, 2)), self.get_rt()
+
+
+class ModelAgent(Agent):
+    """
+    Agent that makes its choices with the ADOPy model of the participant's engine, using fixed parameters. Used for the
+    tasks that estimate those parameters, so that parameter recovery can be checked
+    """
+
+    def __init__(self, params, rtmean=1.5, rtsd=0.4, seed=None):
+        super().__init__(rtmean, rtsd, seed)
+
+        # dictionary of the model parameters (e.g., {'k': 0.01, 'tau': 1.5})
+        self.params = params
+
+    def get_params(self):
+
+        return {'true_' + name: value for name, value in self.params.items()}
+
+    def choose(self, person):
+        """
+        Uses the model to find the chance of choosing option 1 of the current design and then makes the choice
+        :param person: the participant class, which has the engine and the current design
+        :return: 0 or 1 for the option the model chose
+        """
+
+        # without an engine (e.g., the random designs of the PD, RA, and framing tasks) there is no model to follow, so
+        # answer at random like the base agent
+        if person.engine is None:
+            return int(self.rng.integers(0, 2))
+
+        # just the design variables that the model uses
+        design = {name: float(person.design[name]) for name in person.engine.task.designs}
+
+        # the model gives the log likelihood of a response
+        prob = np.exp(person.engine.model.compute(choice=1, **design, **self.params))
+
+        return int(self.rng.random() < prob)
+
+
+class HyperbolicAgent(ModelAgent):
+    """
+    Delay discounting agent that follows the hyperbolic model with a known k and tau
+    """
+
+    def __init__(self, k=0.01, tau=1.5, rtmean=1.5, rtsd=0.4, seed=None):
+        super().__init__({'k': k, 'tau': tau}, rtmean, rtsd, seed)
+
+    def respond(self, person, correct=None, go=True):
+
+        # 1 means the delayed option, which is on the right when the side integer is 1
+        choice = self.choose(person)
+
+        if (choice == 1) == (person.side == 1):
+
+            response = 1
+
+        else:
+
+            response = 0
+
+        return response, self.get_rt()
+
+
+class CRAAgent(ModelAgent):
+    """
+    Risk and ambiguity agent that follows the linear CRA model with a known alpha, beta, and gamma
+    """
+
+    def __init__(self, alpha=1.0, beta=0.5, gamma=1.5, rtmean=1.5, rtsd=0.4, seed=None):
+        super().__init__({'alpha': alpha, 'beta': beta, 'gamma': gamma}, rtmean, rtsd, seed)
+
+    def respond(self, person, correct=None, go=True):
+
+        # 1 means the variable option, which is always the right key
+        return self.choose(person), self.get_rt()
+
+
+class PDAgent(ModelAgent):
+    """
+    Probability discounting agent that follows the hyperbolic model with a known h and tau
+    """
+
+    def __init__(self, h=1.0, tau=1.5, rtmean=1.5, rtsd=0.4, seed=None):
+        super().__init__({'h': h, 'tau': tau}, rtmean, rtsd, seed)
+
+    def respond(self, person, correct=None, go=True):
+
+        # 1 means the gamble, which is always the right key
+        return self.choose(person), self.get_rt()
+
+
+class RAAgent(ModelAgent):
+    """
+    Risk aversion agent that follows the prospect theory model with a known rho, lam, and mu
+    """
+
+    def __init__(self, rho=0.9, lam=1.5, mu=1.5, rtmean=1.5, rtsd=0.4, seed=None):
+        super().__init__({'rho': rho, 'lam': lam, 'mu': mu}, rtmean, rtsd, seed)
+
+    def respond(self, person, correct=None, go=True):
+
+        # 1 means the gamble, which is always the right key
+        return self.choose(person), self.get_rt()
+
+
+class FrameAgent(ModelAgent):
+    """
+    Framing agent that follows the framing model with a known alpha, beta, and gamma
+    """
+
+    def __init__(self, alpha=0.8, beta=0.0, gamma=1.5, rtmean=1.5, rtsd=0.4, seed=None):
+        super().__init__({'alpha': alpha, 'beta': beta, 'gamma': gamma}, rtmean, rtsd, seed)
+
+    def respond(self, person, correct=None, go=True):
+
+        # 1 means the gamble, which is always the right key
+        return self.choose(person), self.get_rt()
+
+
+class ReactionAgent(Agent):
+    """
+    Agent for the reaction time tasks. It presses the correct key with a fixed accuracy and holds back on no-go trials
+    with a fixed chance
+    """
+
+    def __init__(self, accuracy=0.9, inhibition=0.8, rtmean=0.45, rtsd=0.1, seed=None):
+        super().__init__(rtmean, rtsd, seed)
+
+        self.accuracy = accuracy
+        self.inhibition = inhibition
+
+    def get_params(self):
+
+        return {'true_accuracy': self.accuracy, 'true_inhibition': self.inhibition}
+
+    def respond(self, person, correct=None, go=True):
+
+        # on no-go trials, only respond if holding back fails
+        if (not go) and (self.rng.random() < self.inhibition):
+            return None, self.get_rt()
+
+        # if the agent doesn't know the correct key, guess
+        if correct is None:
+            return int(self.rng.integers(0, 2)), self.get_rt()
+
+        # otherwise, press the correct key as often as the accuracy says
+        if self.rng.random() < self.accuracy:
+            return correct, self.get_rt()
+
+        return 1 - correct, self.get_rt()
+
+
+class StopAgent(ReactionAgent):
+    """
+    Stop-signal agent that follows the race model: on signal trials, it only holds back if the stop process (the
+    signal delay plus the stop-signal reaction time) finishes before its go reaction time
+    """
+
+    def __init__(self, accuracy=0.95, ssrt=0.25, rtmean=0.45, rtsd=0.1, seed=None):
+        super().__init__(accuracy, 0.0, rtmean, rtsd, seed)
+
+        self.ssrt = ssrt
+
+    def get_params(self):
+
+        return {'true_accuracy': self.accuracy, 'true_ssrt': self.ssrt}
+
+    def respond(self, person, correct=None, go=True):
+
+        response, rt = super().respond(person, correct)
+
+        # the stop process wins the race if it finishes first
+        if (not go) and (person.get_timer() / 1000 + self.ssrt < rt):
+            return None, rt
+
+        return response, rt
+
+
+class Simulation(object):
+    """
+    Runs one session of a task with an agent instead of a person. The trials go through the participant class in the
+    same order the experiment windows use, the onsets come from a simulated clock, and the time the participant class
+    spends on each trial is measured
+    """
+
+    def __init__(self, person, agent, iti=1.0, timeout=5.0):
+
+        self.person = person
+        self.agent = agent
+
+        # the simulated session time and the length of the iti and response window, in seconds
+        self.now = 0.0
+        self.iti = iti
+        self.timeout = timeout
+
+        # seconds the participant class took for each trial
+        self.compute = []
+
+    def trial(self, present, record, correct=None, go=True):
+        """
+        Runs a single trial: shows it, gets the agent's response, and records it
+        :param present: function that gets the trial ready in the participant class (e.g., get_design_text)
+        :param record: function that takes the onset, reaction time, and response and sends them to the participant
+        class. It is given None as the response if the agent didn't respond
+        :param correct: 0 or 1 for the correct key, or a function of the participant that returns it, if known
+        :param go: whether the agent should respond, or a function of the participant that returns it
+        """
+
+        start = time.perf_counter()
+        present()
+        spent = time.perf_counter() - start
+
+        # trial info that can only be worked out once the trial is ready
+        if callable(correct):
+            correct = correct(self.person)
+
+        if callable(go):
+            go = go(self.person)
+
+        response, rt = self.agent.respond(self.person, correct, go)
+
+        # no response, or a response that came too late, is a timeout
+        if (response is None) or (rt > self.timeout):
+
+            response = None
+            rt = 9999
+
+        start = time.perf_counter()
+        record(self.now, rt, response)
+        self.compute.append(spent + time.perf_counter() - start)
+
+        # move the clock on to the next trial
+        self.now += (self.timeout if rt == 9999 else rt) + self.iti
+
+    def adotrial(self, number):
+        """
+        Runs a trial of a task with an ADOPy engine, waiting for the engine the way a long enough iti would
+        :param number: the number of the trial in the block
+        """
+
+        def record(onset, rt, response):
+
+            if response is None:
+
+                self.person.updateoutput(number, onset, rt)
+
+            else:
+
+                self.person.updateoutput(number, onset, rt, response)
+                self.person.engineupdate(response)
+
+                # wait for the background worker so the next design is the optimal one
+                self.person.nextdesign.result()
+
+        self.trial(self.person.get_design_text, record)
+
+    def run_dd(self):
+        """
+        Runs a delay discounting or risk and ambiguity session, ending it early if the stopping rule says to
+        """
+
+        for block in range(self.person.rounds):
+
+            for number in range(1, self.person.get_trials() + 1):
+
+                if self.person.stopping():
+                    break
+
+                self.adotrial(number)
+
+            if self.person.stopreason is not None:
+
+                self.person.nextround(self.person.rounds)
+
+                break
+
+            self.person.nextround(block + 1)
+
+    def run_choice(self):
+        """
+        Runs a probability discounting, risk aversion, or framing session. These tasks make the next trial's design
+        during the iti, or with the adaptive design, run like the other ADOPy tasks
+        """
+
+        if self.person.engine is not None:
+
+            self.run_dd()
+
+            return
+
+        for block in range(self.person.rounds):
+
+            for number in range(1, self.person.get_trials() + 1):
+
+                def present():
+                    self.person.set_design_text()
+                    self.person.get_design_text()
+
+                def record(onset, rt, response):
+
+                    if response is None:
+                        self.person.updateoutput(number, onset, rt, 3)
+
+                    else:
+                        self.person.updateoutput(number, onset, rt, response)
+
+                self.trial(present, record)
+
+            self.person.nextround(block + 1)
+
+    def run_ss(self):
+        """
+        Runs a stop-signal session
+        """
+
+        for block in range(self.person.blocks):
+
+            for number in range(1, self.person.get_trials() + 1):
+
+                pic = self.person.get_trial_pic()
+                signal = self.person.get_signal()
+
+                def record(onset, rt, response):
+
+                    if response is None:
+                        self.person.updateoutput(number, pic, onset, rt, signal)
+
+                    else:
+                        self.person.updateoutput(number, pic, onset, rt, signal, response)
+
+                self.trial(lambda: None, record, int(pic == 'SS_RightArrow.png'), signal == 0)
+
+            self.person.nextround(block + 1)
+
+    def run_egng(self):
+        """
+        Runs an emotional go/no-go session
+        """
+
+        while True:
+
+            # get the next round (or the start of the next block, or the end of the task)
+            num = self.person.nextround()[1]
+
+            if self.person.blocksdone == self.person.blocks:
+                break
+
+            if num == 0:
+                continue
+
+            for number in range(1, self.person.get_trials() + 1):
+
+                pic = self.person.get_trial_pic()
+
+                # respond to neutral faces in the reverse rounds and to the emotional faces otherwise
+                go = ('EGNG_Neutral_' in pic) == self.person.blocktype.endswith('Rev')
+
+                def record(onset, rt, response):
+
+                    if response is None:
+                        self.person.updateoutput(number, pic, onset, rt)
+
+                    else:
+                        self.person.updateoutput(number, pic, onset, rt, 1)
+
+                self.trial(lambda: None, record, 0, go)
+
+    def run_pbt(self):
+        """
+        Runs a perceptual bias session
+        """
+
+        for block in range(self.person.rounds):
+
+            self.person.nextround(block)
+
+            # the block has as many trials as its picture order, which only fills whole sets of the four pictures (the
+            # settings window asks for a multiple of 4, but the trials argument doesn't have to be one)
+            for number in range(1, len(self.person.picorder) + 1):
+
+                pic = self.person.get_trial_pic()
+
+                # the large figure (global) is the first letter after the D and the small figures (local) are the second
+                shape = pic[5] if self.person.globallocal == 'Global' else pic[6]
+
+                def record(onset, rt, response):
+
+                    if response is None:
+                        self.person.updateoutput(number, pic, onset, rt, 'None')
+
+                    else:
+                        self.person.updateoutput(number, pic, onset, rt, ['Cross', 'Square'][response])
+
+                self.trial(lambda: None, record, int(shape == 'S'))
+
+        self.person.nextround(self.person.rounds)
+
+    def run_nact(self):
+        """
+        Runs a negative attention capture session (both parts)
+        """
+
+        for part in range(2):
+
+            for number in range(1, self.person.get_trials() + 1):
+
+                def record(onset, rt, response):
+                    self.person.updateoutput(number, onset, rt, 3 if response is None else response)
+
+                # a vertical line (signal number 1) is the left key
+                self.trial(lambda: (self.person.get_trial_pic(), self.person.get_jitter()), record,
+                           lambda person: int(person.signalnumber == 2))
+
+            self.person.nextround()
+
+    def run_nb(self):
+        """
+        Runs an n-back session
+        """
+
+        back = int(self.person.task[0])
+
+        for block in range(self.person.rounds):
+
+            for number in range(1, self.person.get_trials() + 1):
+
+                def record(onset, rt, response):
+
+                    if response is None:
+                        self.person.updateoutput(number, onset, rt)
+
+                    else:
+                        self.person.updateoutput(number, onset, rt, response)
+
+                # the right key means the letter is a target
+                self.trial(self.person.get_trial_text, record,
+                           lambda person: int(person.backlist[-1] == person.backlist[-1 - back]))
+
+            self.person.nextround(block + 1)
+
+
+# how to make the participant class for each task (with the defaults of the settings windows, some of which can be
+# changed with the settings argument of simulate), which agent to use by default, and which simulation method runs it
+TASKS = {
+    'DD': {
+        'make': lambda s: discountp.DdParticipant(s['expid'], s['trials'], s['session'], s['outdir'], TaskDD(),
+                                                  s.get('ss_del', '0'), s.get('ll_shortdel', '1'),
+                                                  s.get('ll_longdel', '52'), s.get('ss_smallrew', '1'),
+                                                  s.get('ll_rew', '250'), s['rounds'], 'No', 'No', 'No',
+                                                  s.get('grid', 'Fixed'), s.get('precision', 'Single'),
+                                                  s.get('stoprule', 'None'), s.get('stopthreshold', '10'),
+                                                  s.get('warmstart', 'No'), s.get('priorweight', '50'),
+                                                  s.get('snapshots', 'No'), seed=s['seed']),
+        'agent': HyperbolicAgent,
+        'run': Simulation.run_dd
+    },
+    'ARTT': {
+        'make': lambda s: gamblep.ARTTParticipant(s['expid'], s['trials'], s['session'], s['outdir'], TaskCRA(),
+                                                  s.get('risklist', [.13, .25, .38, .5, .62, .75, .87]),
+                                                  s.get('amblist', [.25, .5, .75]), s.get('rewmin', '5'),
+                                                  s.get('rewmax', '50'), 'Gains only', 'No', '25', s['rounds'], 'No',
+                                                  'No', 'No', s.get('precision', 'Single'), s.get('stoprule', 'None'),
+                                                  s.get('stopthreshold', '10'), s.get('warmstart', 'No'),
+                                                  s.get('priorweight', '50'), s.get('snapshots', 'No'), seed=s['seed']),
+        'agent': CRAAgent,
+        'run': Simulation.run_dd
+    },
+    'PD': {
+        'make': lambda s: discountp.PdParticipant(s['expid'], s['trials'], s['session'], s['outdir'],
+                                                  'Probability Discounting', s.get('design', 'Gains only'), '1', '250',
+                                                  'No', '25', s['rounds'], 'No', 'No', 'No', s.get('adaptive', 'No'),
+                                                  s.get('precision', 'Single'), s.get('stoprule', 'None'),
+                                                  s.get('stopthreshold', '10'), s.get('warmstart', 'No'),
+                                                  s.get('priorweight', '50'), s.get('snapshots', 'No'), seed=s['seed']),
+        'agent': PDAgent,
+        'run': Simulation.run_choice
+    },
+    'RA': {
+        'make': lambda s: gamblep.RAParticipant(s['expid'], s['trials'], s['session'], s['outdir'], 'Risk Aversion',
+                                                '1', '30', 'No', '25', s['rounds'], 'No', 'No', 'No',
+                                                s.get('adaptive', 'No'), s.get('precision', 'Single'),
+                                                s.get('stoprule', 'None'), s.get('stopthreshold', '10'),
+                                                s.get('warmstart', 'No'), s.get('priorweight', '50'),
+                                                s.get('snapshots', 'No'), seed=s['seed']),
+        'agent': RAAgent,
+        'run': Simulation.run_choice
+    },
+    'Framing': {
+        'make': lambda s: gamblep.FrameParticipant(s['expid'], s['trials'], s['session'], s['outdir'], 'Framing Task',
+                                                   '1', '30', s.get('design', 'Gains only'), 'No', 'No', '25',
+                                                   s['rounds'], 'No', 'No', 'No', s.get('adaptive', 'No'),
+                                                   s.get('precision', 'Single'), s.get('stoprule', 'None'),
+                                                   s.get('stopthreshold', '10'), s.get('warmstart', 'No'),
+                                                   s.get('priorweight', '50'), s.get('snapshots', 'No'),
+                                                   seed=s['seed']),
+        'agent': FrameAgent,
+        'run': Simulation.run_choice
+    },
+    'SS': {
+        'make': lambda s: reactionp.SSParticipant(s['expid'], s['trials'], s['session'], s['outdir'],
+                                                  'Stop-Signal Task', '1500', s['rounds'], 'No', 'No', seed=s['seed']),
+        'agent': StopAgent,
+        'run': Simulation.run_ss
+    },
+    'EGNG': {
+        'make': lambda s: reactionp.EGNGParticipant(s['expid'], s['trials'], s['session'], s['outdir'], 'Emo Go/No-Go',
+                                                    s['rounds'], 'Yes', 'Yes', 'Yes', 'Yes', 'No', 'No',
+                                                    seed=s['seed']),
+        'agent': ReactionAgent,
+        'run': Simulation.run_egng
+    },
+    'PBT': {
+        'make': lambda s: pbtp.PBTParticipant(s['expid'], s['trials'], s['session'], s['outdir'],
+                                              'Perceptual Bias Task', s['rounds'], 'No', 'No', seed=s['seed']),
+        'agent': ReactionAgent,
+        'run': Simulation.run_pbt
+    },
+    'NACT': {
+        'make': lambda s: nactp.NACTParticipant(s['expid'], s['session'], s['outdir'],
+                                                'Negative Attention Capture Task', int(s['trials']) // 2,
+                                                int(s['trials']) - int(s['trials']) // 2, '3', 'No', 'No',
+                                                seed=s['seed']),
+        'agent': ReactionAgent,
+        'run': Simulation.run_nact
+    },
+    'Nb': {
+        'make': lambda s: memoryp.NbParticipant(s['expid'], s['trials'], s['session'], s['outdir'], '2-back',
+                                                s['rounds'], 'No', 'No', seed=s['seed']),
+        'agent': ReactionAgent,
+        'run': Simulation.run_nb
+    }
+}
+
+
+def make_simulation(task, agent=None, trials=20, rounds=1, seed=None, outdir=None, settings=None):
+    """
+    Makes the participant class for a task and the simulation that runs it, without running it yet
+    :param task: string for the task (a key of TASKS)
+    :param agent: the agent that responds, or None for the task's default agent
+    :param trials: integer for the number of trials per block
+    :param rounds: integer for the number of blocks
+    :param seed: integer seed for the session's schedule and the participant class's other random choices
+    :param outdir: string for a folder to write the journal and xlsx output to, or None to not write anything
+    :param settings: dictionary of task settings to use instead of the defaults (e.g., {'ll_rew': '100'} for DD)
+    :return: the simulation
+    """
+
+    if task not in TASKS:
+        raise ValueError('Cannot simulate ' + str(task) + '; the tasks that can be simulated are ' +
+                         ', '.join(TASKS) + '.')
+
+    if agent is None:
+        agent = TASKS[task]['agent'](seed=seed)
+
+    # the settings that the participant classes get from the settings windows
+    dict_settings = {'expid': 'sim' + str(seed), 'trials': str(trials), 'session': 'Simulation', 'outdir': outdir,
+                     'rounds': str(rounds), 'seed': seed, **(settings or {})}
+
+    # seed the schedule and the participant classes' own random choices (e.g., which side an option is on)
+    random.seed(seed)
+    person = TASKS[task]['make'](dict_settings)
+
+    # pick the engine's designs at random from its grid instead of by mutual information (the engine still updates), as
+    # a baseline for the adaptive design
+    if dict_settings.get('designs') == 'Random':
+        person.choose_design = functools.partial(choose_random, person, np.random.default_rng(seed))
+
+    return Simulation(person, agent)
+
+
+def choose_random(person, rng, engine, mutualinfo, frame=None):
+    """
+    Stands in for a participant class's choose_design to pick a random design from the grid (in the frame, if there is
+    one)
+    :param person: the participant class
+    :param rng: numpy random generator
+    :param engine: adopy engine object
+    :param mutualinfo: the mutual information of every design, which is ignored
+    :param frame: 1 or -1 for the frame the design has to be in, or None for any design
+    :return: dictionary of the design
+    """
+
+    return adopyp.AdoParticipant.choose_design(person, engine, rng.random(engine.n_d), frame)
+
+
+def simulate(task, agent=None, trials=20, rounds=1, seed=None, outdir=None, settings=None):
+    """
+    Runs one session of a task with a simulated agent
+    :param task: string for the task (a key of TASKS)
+    :param agent: the agent that responds, or None for the task's default agent
+    :param trials: integer for the number of trials per block
+    :param rounds: integer for the number of blocks
+    :param seed: integer seed for the session's schedule and the participant class's other random choices
+    :param outdir: string for a folder to write the journal and xlsx output to, or None to not write anything
+    :param settings: dictionary of task settings to use instead of the defaults
+    :return: dictionary with the task, seed, agent parameters, posterior summaries (for the ADOPy tasks), the trial
+    dataframe, and the seconds spent in the participant class on each trial
+    """
+
+    simulation = make_simulation(task, agent, trials, rounds, seed, outdir, settings)
+    person = simulation.person
+    agent = simulation.agent
+
+    start = time.perf_counter()
+    TASKS[task]['run'](simulation)
+    elapsed = time.perf_counter() - start
+
+    if outdir is not None:
+
+        person.output()
+        person.wait_output()
+
+    result = {'task': task, 'seed': person.schedule.seed, **agent.get_params(), 'session time': elapsed,
+              'trials': person.performance.to_dataframe(), 'compute': np.array(simulation.compute)}
+
+    # the final posterior means and sds for the tasks with an engine
+    if getattr(person, 'engine', None) is not None:
+
+        postmean, postsd = person.posterior
+
+        for name, mean, sd in zip(person.engine.model.params, postmean, postsd):
+
+            result['mean_' + name] = float(mean)
+            result['sd_' + name] = float(sd)
+
+    if isinstance(person, adopyp.AdoParticipant):
+        person.worker.shutdown()
+
+    return result
+
+
+def runjob(job):
+    """
+    Runs a simulation from a dictionary of simulate arguments. Used by the process pool, which needs a top-level
+    function
+    :param job: dictionary of arguments for simulate
+    :return: the result of simulate
+    """
+
+    return simulate(**job)
+
+
+def simulate_many(jobs, workers=None):
+    """
+    Runs many simulated sessions in a process pool
+    :param jobs: a list of dictionaries of simulate arguments (task, agent, trials, rounds, seed, outdir, settings)
+    :param workers: integer for the number of processes, or None for one per cpu
+    :return: a list of simulation results, in the same order as the jobs
+    """
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(runjob, jobs))
+
+
+def summarize(results):
+    """
+    Makes one row per session out of simulation results, with the true parameters, the estimates, and the per-trial
+    compute cost
+    :param results: a list of simulation results
+    :return: dataframe of the summaries
+    """
+
+    rows = []
+
+    for result in results:
+
+        row = {name: value for name, value in result.items() if name not in ['trials', 'compute']}
+
+        row['trial count'] = len(result['trials'])
+        row['compute mean (ms)'] = float(np.mean(result['compute']) * 1000) if len(result['compute']) else np.nan
+        row['compute p95 (ms)'] = float(np.percentile(result['compute'], 95) * 1000) if len(result['compute']) \
+            else np.nan
+
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+# how far apart (in posterior sds of the double precision engine) the posterior means of the single and double precision
+# engines can be before the single precision engine is said not to match
+TOLERANCE = .01
+
+
+def validate_precision(task, agent=None, trials=20, rounds=1, seed=None, settings=None):
+    """
+    Checks the single precision engine against the double precision one. A session is run with the double precision
+    engine, and then every design and response from it is given to a fresh engine of each precision, so that both
+    posteriors see exactly the same data. Only works for the fixed grids, since the adaptive grid changes with the
+    posterior
+    :param task: string for an ADOPy task ('DD' or 'ARTT')
+    :param agent: the agent that responds, or None for the task's default agent
+    :param trials: integer for the number of trials per block
+    :param rounds: integer for the number of blocks
+    :param seed: integer seed for the session
+    :param settings: dictionary of task settings to use instead of the defaults
+    :return: dataframe with one row per update: the posterior means and sds of both engines, the biggest difference in
+    the means (in sds of the double precision posterior), whether both engines picked the same next design, and how long
+    each update took
+    """
+
+    settings = {**(settings or {}), 'grid': 'Fixed'}
+
+    # the session that gives the designs and responses, keeping each one as it goes to the engine
+    simulation = make_simulation(task, agent, trials, rounds, seed, None, {**settings, 'precision': 'Double'})
+    observed = []
+
+    def commitbranch(speculation, ready, design, response, method=simulation.person.commitbranch):
+
+        observed.append([design, response])
+
+        return method(speculation, ready, design, response)
+
+    simulation.person.commitbranch = commitbranch
+
+    TASKS[task]['run'](simulation)
+    simulation.person.worker.shutdown()
+
+    # a fresh engine of each precision
+    engines = {}
+
+    for precision in enginecache.PRECISIONS:
+
+        person = make_simulation(task, None, trials, rounds, seed, None, {**settings, 'precision': precision}).person
+        person.worker.shutdown()
+
+        engines[precision] = person.engine
+
+    rows = []
+
+    for number, (design, response) in enumerate(observed):
+
+        row = {'update': number + 1}
+        picked = {}
+
+        for precision, engine in engines.items():
+
+            start = time.perf_counter()
+            engine.update(design, response)
+            row[precision + ' update (ms)'] = (time.perf_counter() - start) * 1000
+
+            picked[precision] = engine.get_design('optimal')
+
+            for name, mean, sd in zip(engine.model.params, engine.post_mean, engine.post_sd):
+
+                row[precision + ' mean_' + name] = float(mean)
+                row[precision + ' sd_' + name] = float(sd)
+
+        row['mean difference (sd)'] = max(abs(row['Single mean_' + name] - row['Double mean_' + name]) /
+                                          max(row['Double sd_' + name], 1e-12)
+                                          for name in engines['Double'].model.params)
+        row['same design'] = picked['Single'] == picked['Double']
+
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+# how far (in posterior sds of the session that stopped early) the estimates of the full session can be from the ones of
+# the session that stopped early, for the stopping rule to count as keeping the estimates
+STOPTOLERANCE = 2
+
+
+def compare_stopping(task, sessions=10, trials=20, rounds=1, seed=0, stoprule='Posterior SD', stopthreshold=10,
+                     workers=None):
+    """
+    Runs the same simulated sessions with and without a stopping rule, to see how many trials the rule saves and how far
+    its estimates end up from the ones of the full session
+    :param task: string for an ADOPy task ('DD' or 'ARTT')
+    :param sessions: integer for the number of sessions
+    :param trials: integer for the number of trials per block
+    :param rounds: integer for the number of blocks
+    :param seed: integer seed of the first session
+    :param stoprule: string for the stopping rule (one of adopyp.STOPRULES)
+    :param stopthreshold: the rule's threshold as a percent of the prior
+    :param workers: integer for the number of processes, or None for one per cpu
+    :return: dataframe with one row per session: the true parameters, the trials run with and without the rule, and
+    for each parameter both estimates and how far apart they are in posterior sds of the stopped session, and whether
+    every parameter is within STOPTOLERANCE of it
+    """
+
+    rows = []
+    settings = {'stoprule': stoprule, 'stopthreshold': str(stopthreshold)}
+
+    # the same agents and seeds for both runs
+    list_jobs = [{'task': task, 'agent': random_agent(task, seed + session), 'trials': trials, 'rounds': rounds,
+                  'seed': seed + session} for session in range(sessions)]
+
+    list_full = simulate_many(list_jobs, workers)
+    list_stopped = simulate_many([{**job, 'settings': settings} for job in list_jobs], workers)
+
+    for job, full, stopped in zip(list_jobs, list_full, list_stopped):
+
+        row = {'seed': job['seed'], **job['agent'].get_params(), 'full trials': len(full['trials']),
+               'stopped trials': len(stopped['trials'])}
+
+        for name in [name[5:] for name in full if name.startswith('mean_')]:
+
+            row['full mean_' + name] = full['mean_' + name]
+            row['stopped mean_' + name] = stopped['mean_' + name]
+            row['difference_' + name + ' (sd)'] = abs(stopped['mean_' + name] - full['mean_' + name]) / \
+                max(stopped['sd_' + name], 1e-12)
+
+        row['within tolerance'] = all(row[column] <= STOPTOLERANCE for column in row
+                                      if column.startswith('difference_'))
+
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+# how many times as many trials the random designs get in compare_designs, to see where they catch up
+RANDOMFACTOR = 4
+
+
+def compare_designs(task, sessions=10, trials=20, seed=0, settings=None, workers=None):
+    """
+    Runs the same agents with the adaptive design and with random designs from the same grid (the engine still updates,
+    it just doesn't pick the designs), to see how many trials the random designs need to narrow the posterior as much
+    as the adaptive design does
+    :param task: string for an ADOPy task
+    :param sessions: integer for the number of sessions
+    :param trials: integer for the number of trials in the adaptive sessions (the random ones get RANDOMFACTOR times as
+    many)
+    :param seed: integer seed of the first session
+    :param settings: dictionary of task settings to use instead of the defaults
+    :param workers: integer for the number of processes, or None for one per cpu
+    :return: dataframe with one row per session: the true parameters, for each parameter the adaptive and random
+    estimates and sds after the adaptive session's trials, and the trial at which the random designs first had every sd
+    as small as the adaptive session's (NaN if they never did)
+    """
+
+    rows = []
+    settings = {**(settings or {}), 'adaptive': 'Yes'}
+
+    # the same agents and seeds for both runs
+    list_jobs = [{'task': task, 'agent': random_agent(task, seed + session), 'trials': trials, 'seed': seed + session,
+                  'settings': settings} for session in range(sessions)]
+
+    list_adaptive = simulate_many(list_jobs, workers)
+    list_random = simulate_many([{**job, 'trials': trials * RANDOMFACTOR, 'settings': {**settings, 'designs': 'Random'}}
+                                 for job in list_jobs], workers)
+
+    for job, adaptive, randomized in zip(list_jobs, list_adaptive, list_random):
+
+        row = {'seed': job['seed'], **job['agent'].get_params()}
+        names = [name[5:] for name in adaptive if name.startswith('mean_')]
+
+        # the random session's posterior after each trial. A trial's row has the posterior from before its response,
+        # so the posterior after a trial is in the next row (and after the last trial it is the final posterior)
+        df_random = randomized['trials']
+        after = {column + name: np.append(df_random[column + name + adopyp.BEFORE].values[1:], randomized[column + name])
+                 for name in names for column in ['mean_', 'sd_']}
+
+        # the random session after as many trials as the adaptive one
+        same = min(len(adaptive['trials']), len(df_random)) - 1
+
+        for name in names:
+
+            row['adaptive mean_' + name] = adaptive['mean_' + name]
+            row['random mean_' + name] = float(after['mean_' + name][same])
+            row['adaptive sd_' + name] = adaptive['sd_' + name]
+            row['random sd_' + name] = float(after['sd_' + name][same])
+
+        # the first trial where every random sd is as small as the adaptive one
+        caughtup = np.all([after['sd_' + name] <= adaptive['sd_' + name] for name in names], axis=0)
+
+        row['adaptive trials'] = len(adaptive['trials'])
+        row['random trials to match'] = int(np.argmax(caughtup)) + 1 if caughtup.any() else np.nan
+
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def random_agent(task, seed):
+    """
+    Makes the task's default agent with parameters drawn over the range of the task's grid, for parameter recovery
+    :param task: string for the task
+    :param seed: integer seed for the parameters and the agent
+    :return: the agent
+    """
+
+    rng = np.random.default_rng(seed)
+
+    if task == 'DD':
+        return HyperbolicAgent(k=float(10 ** rng.uniform(-4, -0.5)), tau=float(rng.uniform(0.5, 4)), seed=seed)
+
+    if task == 'ARTT':
+        return CRAAgent(alpha=float(rng.uniform(0.3, 2.5)), beta=float(rng.uniform(-2, 2)),
+                        gamma=float(rng.uniform(0.5, 4)), seed=seed)
+
+    if task == 'PD':
+        return PDAgent(h=float(10 ** rng.uniform(-1.5, 1.5)), tau=float(rng.uniform(0.5, 4)), seed=seed)
+
+    if task == 'RA':
+        return RAAgent(rho=float(rng.uniform(0.5, 1.3)), lam=float(10 ** rng.uniform(-0.4, 0.5)),
+                       mu=float(rng.uniform(0.5, 4)), seed=seed)
+
+    if task == 'Framing':
+        return FrameAgent(alpha=float(rng.uniform(0.4, 1.6)), beta=float(rng.uniform(-2, 2)),
+                          gamma=float(rng.uniform(0.5, 4)), seed=seed)
+
+    return TASKS[task]['agent'](seed=seed)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Run simulated sessions of a task and summarize them.')
+    parser.add_argument('task', choices=list(TASKS), help='the task to simulate')
+    parser.add_argument('--sessions', type=int, default=10, help='number of sessions')
+    parser.add_argument('--trials', type=int, default=20, help='trials per block')
+    parser.add_argument('--rounds', type=int, default=1, help='blocks per session')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first session')
+    parser.add_argument('--output', default=None, help='csv file for the session summaries')
+    parser.add_argument('--precision', action='store_true', help='check the single precision engine against double '
+                                                                 'precision instead (DD and ARTT)')
+    parser.add_argument('--stoprule', choices=adopyp.STOPRULES[1:], default=None,
+                        help='compare sessions with and without this stopping rule instead (DD and ARTT)')
+    parser.add_argument('--threshold', type=int, default=10, help='stopping rule threshold (%% of the prior)')
+    parser.add_argument('--compare', action='store_true', help='compare the adaptive design with random designs from '
+                                                               'the same grid instead (PD, RA, and Framing)')
+    parser.add_argument('--design', default=None, help='the gains and losses setting for PD and Framing (e.g., '
+                                                       '"Gains and Losses")')
+    args = parser.parse_args()
+
+    if args.precision:
+
+        for session in range(args.sessions):
+
+            df_check = validate_precision(args.task, random_agent(args.task, args.seed + session), args.trials,
+                                          args.rounds, args.seed + session)
+
+            worst = df_check['mean difference (sd)'].max()
+
+            print('Session ' + str(args.seed + session) + ': posterior means within ' + str(round(worst, 6)) +
+                  ' sds of double precision (' + ('match' if worst <= TOLERANCE else 'DO NOT MATCH') +
+                  '), same design on ' + str(int(df_check['same design'].sum())) + ' of ' + str(len(df_check)) +
+                  ' updates, update ' +
+                  str(round(df_check['Single update (ms)'].median(), 2)) + ' ms in single precision vs ' +
+                  str(round(df_check['Double update (ms)'].median(), 2)) + ' ms in double')
+
+    elif args.compare:
+
+        df_compare = compare_designs(args.task, args.sessions, args.trials, args.seed,
+                                     None if args.design is None else {'design': args.design}, args.workers)
+
+        if args.output is not None:
+            df_compare.to_csv(args.output, index=False)
+
+        print(df_compare.to_string())
+
+        matched = df_compare['random trials to match'].dropna()
+        ratios = matched / df_compare.loc[matched.index, 'adaptive trials']
+
+        if len(matched) > 0:
+            print('Random designs needed a median of ' + str(round(float(ratios.median()), 2)) +
+                  ' times as many trials to narrow the posterior as much')
+
+        print('Random designs never narrowed the posterior as much within ' + str(RANDOMFACTOR) + ' times as many '
+              'trials in ' + str(len(df_compare) - len(matched)) + ' of ' + str(len(df_compare)) + ' sessions')
+
+    elif args.stoprule is not None:
+
+        df_stopping = compare_stopping(args.task, args.sessions, args.trials, args.rounds, args.seed, args.stoprule,
+                                       args.threshold, args.workers)
+
+        if args.output is not None:
+            df_stopping.to_csv(args.output, index=False)
+
+        print(df_stopping.to_string())
+        print(args.stoprule + ' at ' + str(args.threshold) + '%: ' +
+              str(round(100 * (1 - df_stopping['stopped trials'].sum() / df_stopping['full trials'].sum()), 1)) +
+              '% fewer trials, estimates within ' + str(STOPTOLERANCE) + ' sds of the full session in ' +
+              str(int(df_stopping['within tolerance'].sum())) + ' of ' + str(len(df_stopping)) + ' sessions')
+
+    else:
+
+        # every session gets its own seed and, for the ADOPy tasks, its own true parameters
+        list_jobs = [{'task': args.task, 'agent': random_agent(args.task, args.seed + session), 'trials': args.trials,
+                      'rounds': args.rounds, 'seed': args.seed + session} for session in range(args.sessions)]
+
+        df_summary = summarize(simulate_many(list_jobs, args.workers))
+
+        if args.output is not None:
+            df_summary.to_csv(args.output, index=False)
+
+        print(df_summary.to_string())
@@ -0,0 +1,243 @@
+from Participants import engineoptions
+
+import numpy as np
+
+import argparse
+import glob
+import os
+import queue
+import threading
+
+# the ways the posterior can be stored: the whole log posterior in half precision, or only the most likely points of
+# the grid
+FORMATS = engineoptions.FORMATS
+
+# how many points of the grid the top-k format keeps
+TOPK = 64
+
+# how many snapshots go into a chunk before it is written
+CHUNK = 25
+
+
+def get_path(outdir, expid, taskstr, session):
+    """
+    Puts together the path of a session's snapshot folder. If there is already one with that name (e.g., from a run
+    that crashed), a number is added so that it doesn't get added to
+    :param outdir: string for the output directory
+    :param expid: string for the participant ID
+    :param taskstr: string for the task in the output file names
+    :param session: string for the session name
+    :return: string for the path of the snapshot folder
+    """
+
+    base = os.path.join(outdir, expid + '_' + taskstr + '_' + session + '_snapshots')
+
+    path = base
+    count = 1
+
+    while os.path.exists(path):
+
+        count += 1
+        path = base + str(count)
+
+    return path
+
+
+class SnapshotWriter(object):
+    """
+    Keeps the posterior after every update in a folder next to the output. Snapshots are handed to a background thread
+    that converts them and writes them in compressed chunks, so taking a snapshot only costs a copy of the posterior.
+    Every chunk is its own file of arrays that numpy can open (np.load), written under a temporary name and only then
+    renamed, so a crash can't touch the chunks that were already written and only loses the snapshots that weren't.
+    Each grid the engine uses is written once, and each chunk says which grid its snapshots are on (the adaptive DD
+    grid changes during the task)
+    """
+
+    def __init__(self, path, kind='Dense'):
+
+        # where the snapshots are written and how
+        self.path = path
+        self.kind = kind
+
+        os.makedirs(self.path, exist_ok=True)
+
+        # snapshots waiting to be written; None tells the writer to stop
+        self.snapshots = queue.Queue()
+
+        # start the background writer
+        self.writer = threading.Thread(target=self.writeloop, daemon=True)
+        self.writer.start()
+
+    def add(self, update, engine):
+        """
+        Hands the engine's current posterior to the background writer
+        :param update: integer for the number of updates so far (0 for the prior)
+        :param engine: adopy engine object
+        """
+
+        self.snapshots.put([update, engine, np.array(engine.log_post, dtype=np.float32)])
+
+    def writeloop(self):
+        """
+        Runs in the background thread. Collects snapshots into chunks and writes a chunk once it is full, once the grid
+        changes, or once the writer is closed
+        """
+
+        grids = []
+        chunk = []
+        count = 0
+
+        while True:
+
+            snapshot = self.snapshots.get()
+
+            # write what is left when the writer is closed, or when the next snapshot is on a different grid
+            if (len(chunk) > 0) and ((snapshot is None) or (snapshot[1] is not grids[-1])):
+
+                self.writechunk(count, len(grids) - 1, chunk)
+
+                chunk = []
+                count += 1
+
+            if snapshot is None:
+                break
+
+            update, engine, logpost = snapshot
+
+            if (len(grids) == 0) or (engine is not grids[-1]):
+
+                grids.append(engine)
+                self.writegrid(len(grids) - 1, engine)
+
+            chunk.append([update, logpost])
+
+            if len(chunk) == CHUNK:
+
+                self.writechunk(count, len(grids) - 1, chunk)
+
+                chunk = []
+                count += 1
+
+    def writearrays(self, name, arrays):
+        """
+        Writes arrays to their own compressed file in the folder. The file only gets its name once it is complete and on
+        the disk, so there is never a partly written file under it
+        :param name: string for the file, without the extension (e.g., 'chunk0')
+        :param arrays: dictionary of names and arrays
+        """
+
+        path = os.path.join(self.path, name + '.npz')
+
+        with open(path + '.tmp', 'wb') as file:
+
+            np.savez_compressed(file, **arrays)
+
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(path + '.tmp', path)
+
+    def writegrid(self, number, engine):
+        """
+        Writes one of the engine's parameter grids
+        :param number: integer for the grid
+        :param engine: adopy engine object
+        """
+
+        self.writearrays('grid' + str(number), {'grid': engine.grid_param.values.astype(np.float64),
+                                                'params': np.array(engine.grid_param.columns, dtype=str)})
+
+    def writechunk(self, number, grid, chunk):
+        """
+        Writes a chunk of snapshots, converted to the writer's format
+        :param number: integer for the chunk
+        :param grid: integer for the grid the snapshots are on
+        :param chunk: list of [update, log posterior]
+        """
+
+        logpost = np.stack([snapshot[1] for snapshot in chunk])
+
+        # half precision can't go below -65504, which is a probability of 0 anyway
+        arrays = {'updates': np.array([snapshot[0] for snapshot in chunk], dtype=np.int32),
+                  'grid': np.array(grid, dtype=np.int32)}
+
+        if self.kind == 'Top-k':
+
+            keep = min(TOPK, logpost.shape[1])
+            index = np.argpartition(-logpost, keep - 1, axis=1)[:, :keep]
+
+            arrays['index'] = index.astype(np.int32)
+            arrays['log_post'] = np.maximum(np.take_along_axis(logpost, index, axis=1), -65504).astype(np.float16)
+
+        else:
+            arrays['log_post'] = np.maximum(logpost, -65504).astype(np.float16)
+
+        self.writearrays('chunk' + str(number), arrays)
+
+    def close(self):
+        """
+        Writes the snapshots that are left and waits for the writer to finish
+        """
+
+        self.snapshots.put(None)
+        self.writer.join()
+
+
+def read_snapshots(path):
+    """
+    Reads the chunks of a snapshot folder back into full posteriors, in order. Points that the top-k format didn't keep
+    get a log probability of -inf
+    :param path: string for the path to the snapshot folder
+    :return: a list of dictionaries, one for each snapshot in order, with the update number, the parameter grid (a
+    dictionary of parameter names and values for every grid point), and the log posterior in single precision
+    """
+
+    snapshots = []
+    grids = {}
+    chunk = 0
+
+    # the chunks are numbered in the order they were written (a temporary file that a crash left behind is skipped)
+    while os.path.exists(os.path.join(path, 'chunk' + str(chunk) + '.npz')):
+
+        with np.load(os.path.join(path, 'chunk' + str(chunk) + '.npz')) as file:
+
+            grid = int(file['grid'])
+
+            if grid not in grids:
+
+                with np.load(os.path.join(path, 'grid' + str(grid) + '.npz')) as gridfile:
+                    grids[grid] = {param: gridfile['grid'][:, column]
+                                   for column, param in enumerate(gridfile['params'])}
+
+            logpost = file['log_post'].astype(np.float32)
+
+            # put the top-k points back into full posteriors
+            if 'index' in file.files:
+
+                full = np.full([len(logpost), len(next(iter(grids[grid].values())))], -np.inf, dtype=np.float32)
+                np.put_along_axis(full, file['index'], logpost, axis=1)
+                logpost = full
+
+            for update, values in zip(file['updates'], logpost):
+                snapshots.append({'update': int(update), 'grid': grids[grid], 'log_post': values})
+
+        chunk += 1
+
+    return snapshots
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Summarize the posterior snapshots of a session.')
+    parser.add_argument('path', help='the snapshot folder')
+    args = parser.parse_args()
+
+    for snapshot in read_snapshots(args.path):
+
+        post = np.exp(snapshot['log_post'].astype(np.float64))
+        post = post / post.sum()
+
+        print('update {:>4}: '.format(snapshot['update']) + ', '.join(
+            name + ' ' + '{:.4g}'.format(float(np.dot(post, values))) for name, values in snapshot['grid'].items()))
+
+    print(str(sum(os.path.getsize(name) for name in glob.glob(os.path.join(args.path, '*.npz')))) + ' bytes')
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+# the column types by name, for writing a schema somewhere that can't hold the types themselves (e.g., the journal)
+TYPES = {'int': int, 'float': float, 'str': str, 'object': object}
+
+
+class TrialStore(object):
+    """
+    Holds the trial data for a task column by column. Every column is a preallocated numpy array that doubles in size
+    when it fills up, so adding a trial is just writing one value into each column. The data only gets turned into a
+    pandas dataframe when the task is over and the output is written
+    """
+
+    def __init__(self, capacity=256):
+
+        # the number of rows that can be held before the columns need to grow
+        self.capacity = capacity
+
+        # the number of trials that have been added so far
+        self.length = 0
+
+        # dictionaries for the arrays (in the order they were declared), their types, and their fill values
+        self.columns = {}
+        self.types = {}
+        self.fills = {}
+
+    def __len__(self):
+
+        return self.length
+
+    def declare(self, schema):
+        """
+        Takes a dictionary of column names and types and makes an empty array for each column
+        :param schema: a dictionary with column names as keys and int, float, str, or object as values
+        """
+
+        for name, kind in schema.items():
+
+            self.add_column(name, kind)
+
+    def add_column(self, name, kind=object):
+        """
+        Makes an array for one column. Any trials that were already stored get the column's fill value
+        :param name: string for the name of the column
+        :param kind: the type of the column; int, float, str, or object
+        """
+
+        # skip columns that already exist
+        if name in self.columns:
+            return
+
+        # ints are 64-bit integers and default to 0
+        if kind is int:
+            array = np.zeros(self.capacity, dtype=np.int64)
+            fill = 0
+
+        # floats are 64-bit floats and default to nan
+        elif kind is float:
+            array = np.full(self.capacity, np.nan, dtype=np.float64)
+            fill = np.nan
+
+        # strings and anything else are kept as python objects so nothing gets truncated
+        else:
+            kind = object
+            array = np.full(self.capacity, None, dtype=object)
+            fill = None
+
+        self.columns[name] = array
+        self.types[name] = kind
+        self.fills[name] = fill
+
+    def promote(self, name, value):
+        """
+        If a value doesn't fit the type of its column (e.g., 'None' as a response in an int column), the column gets
+        turned into a float column (for numbers) or an object column (for everything else) instead of losing the value
+        :param name: string for the name of the column
+        :param value: the value that didn't fit
+        """
+
+        # ints can become floats without losing anything if the new value is also a number
+        if (self.types[name] is int) & isinstance(value, (float, np.floating)):
+
+            kind = float
+            array = self.columns[name].astype(np.float64)
+
+        # everything else becomes an object column
+        else:
+
+            kind = object
+            array = self.columns[name].astype(object)
+
+        self.columns[name] = array
+        self.types[name] = kind
+
+    def fits(self, name, value):
+        """
+        Checks if a value can be put in a column without changing it
+        :param name: string for the name of the column
+        :param value: the value to check
+        :return: True if the value fits the column's type
+        """
+
+        kind = self.types[name]
+
+        if kind is int:
+            return isinstance(value, (int, np.integer)) & (not isinstance(value, bool))
+
+        if kind is float:
+            return isinstance(value, (int, float, np.integer, np.floating)) & (not isinstance(value, bool))
+
+        return True
+
+    def grow(self):
+        """
+        Doubles the size of every column
+        """
+
+        self.capacity *= 2
+
+        for name, array in self.columns.items():
+
+            # make a bigger array filled with the column's fill value and copy the old values over
+            bigger = np.full(self.capacity, self.fills[name], dtype=array.dtype)
+            bigger[:self.length] = array[:self.length]
+
+            self.columns[name] = bigger
+
+    def append(self, row):
+        """
+        Adds one trial to the store
+        :param row: a dictionary of column names and single values for this trial
+        """
+
+        # make room if all of the rows are used
+        if self.length == self.capacity:
+            self.grow()
+
+        # any column that wasn't declared gets added as an object column
+        for name in row:
+
+            if name not in self.columns:
+                self.add_column(name)
+
+        # write each value into its column, changing the column's type if the value doesn't fit
+        for name, value in row.items():
+
+            if not self.fits(name, value):
+                self.promote(name, value)
+
+            self.columns[name][self.length] = value
+
+        self.length += 1
+
+    def to_dataframe(self):
+        """
+        Turns the stored trials into a pandas dataframe
+        :return: a dataframe with one row per trial and the columns in the order they were declared
+        """
+
+        return pd.DataFrame({name: array[:self.length] for name, array in self.columns.items()})
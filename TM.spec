@@ -3,13 +3,17 @@ import sys
 
 block_cipher = None
 
-hooks = ['Guis/Settings/beads.py', 'Participants/beadsp.py', 'Guis/Experiments/beadsgui.py',
-        'Guis/Settings/discount.py', 'Participants/discountp.py', 'Guis/Experiments/discountgui.py',
-        'Guis/Settings/gamble.py', 'Participants/gamblep.py', 'Guis/Experiments/gamblegui.py',
-        'Guis/Settings/memory.py', 'Participants/memoryp.py', 'Guis/Experiments/memorygui.py', 'Guis/Settings/nact.py',
-        'Participants/nactp.py', 'Guis/Experiments/nactgui.py', 'Guis/Settings/pbt.py', 'Participants/pbtp.py',
-        'Guis/Experiments/pbtgui.py', 'Guis/Settings/reaction.py', 'Participants/reactionp.py',
-        'Guis/Experiments/reactiongui.py' ]
+# the task modules (and the battery runner) are only imported when their button is clicked, so pyinstaller can't see
+# them from cli.py. List them as hidden imports so they get bundled (runtime hooks would run all of them, and adopy and
+# pandas with them, at startup)
+taskmodules = ['Guis.Settings.beads', 'Participants.beadsp', 'Guis.Experiments.beadsgui',
+               'Guis.Settings.discount', 'Participants.discountp', 'Guis.Experiments.discountgui',
+               'Guis.Settings.gamble', 'Participants.gamblep', 'Guis.Experiments.gamblegui',
+               'Guis.Settings.memory', 'Participants.memoryp', 'Guis.Experiments.memorygui',
+               'Guis.Settings.nact', 'Participants.nactp', 'Guis.Experiments.nactgui',
+               'Guis.Settings.pbt', 'Participants.pbtp', 'Guis.Experiments.pbtgui',
+               'Guis.Settings.reaction', 'Participants.reactionp', 'Guis.Experiments.reactiongui',
+               'Guis.battery']
 
 addedfiles = [('assets/', 'assets'),
              ('TM.icns', '.'),
@@ -20,10 +24,10 @@ a = Analysis(
     pathex=['C:/Users/dgara/PycharmProjects/TaskMaster/venv/Lib/site-packages'],
     binaries=[],
     datas=addedfiles,
-    hiddenimports=['numpy', 'scipy', 'pandas', 'xlsxwriter', 'pkg_resources', 'jinja2'],
+    hiddenimports=['numpy', 'scipy', 'pandas', 'xlsxwriter', 'pkg_resources', 'jinja2', 'adopy'] + taskmodules,
     hookspath=[],
     hooksconfig={},
-    runtime_hooks=hooks,
+    runtime_hooks=[],
     excludes=[],
     win_no_prefer_redirects=False,
     win_private_assemblies=False,
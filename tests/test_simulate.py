@@ -0,0 +1,41 @@
+from Participants import adopyp, simulate
+
+import numpy as np
+
+
+def test_artt_posterior_columns():
+    """
+    ARTT's trial data has the posterior from before each response, under the same columns as the other ADOPy tasks
+    """
+
+    result = simulate.simulate('ARTT', trials=3, seed=0)
+
+    for name in ['alpha', 'beta', 'gamma']:
+
+        assert 'mean_' + name + adopyp.BEFORE in result['trials']
+        assert 'sd_' + name + adopyp.BEFORE in result['trials']
+        assert 'mean_' + name not in result['trials']
+
+
+def test_artt_compare_designs():
+    """
+    Comparing the adaptive design with random designs works for ARTT
+    """
+
+    df_compare = simulate.compare_designs('ARTT', sessions=1, trials=3, workers=1)
+
+    assert len(df_compare) == 1
+    assert df_compare['adaptive trials'].iloc[0] == 3
+
+    for name in ['alpha', 'beta', 'gamma']:
+        assert np.isfinite(df_compare['random mean_' + name].iloc[0])
+
+
+def test_pbt_partial_picture_set():
+    """
+    A PBT session whose trials aren't a multiple of 4 runs the whole sets of pictures in each block
+    """
+
+    result = simulate.simulate('PBT', trials=10, rounds=2, seed=0)
+
+    assert result['trials']['trial'].tolist() == list(range(1, 9)) * 2